@@ -18,6 +18,7 @@ __all__ = ['task_clean_all',
            'task_build',
            'task_check',
            'task_test',
+           'task_test_perf',
            'task_docs',
            'task_ui',
            'task_deps',
@@ -30,6 +31,7 @@ src_py_dir = Path('src_py')
 src_js_dir = Path('src_js')
 src_static_dir = Path('src_static')
 pytest_dir = Path('test_pytest')
+perf_dir = Path('test_perf')
 docs_dir = Path('docs')
 schemas_json_dir = Path('schemas_json')
 node_modules_dir = Path('node_modules')
@@ -70,6 +72,7 @@ def task_check():
     """Check with flake8 and eslint"""
     return {'actions': [(run_flake8, [src_py_dir]),
                         (run_flake8, [pytest_dir]),
+                        (run_flake8, [perf_dir]),
                         (run_eslint, [src_js_dir])],
             'task_dep': ['deps']}
 
@@ -82,6 +85,14 @@ def task_test():
             'task_dep': ['json_schema_repo']}
 
 
+def task_test_perf():
+    """Test performance"""
+    return {'actions': [(common.mkdir_p, [ui_dir]),
+                        lambda args: run_pytest(perf_dir, *(args or []))],
+            'pos_arg': 'args',
+            'task_dep': ['json_schema_repo']}
+
+
 def task_docs():
     """Docs"""
 
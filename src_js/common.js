@@ -16,6 +16,10 @@ export const defaultState = {
     settingsDialog: {
         open: false
     },
+    metricsDialog: {
+        open: false,
+        metrics: null
+    },
     pages: {}
 };
 
@@ -46,6 +50,25 @@ export function save() {
 }
 
 
+export async function showMetricsDialog() {
+    r.set('metricsDialog', u.set('open', true, defaultState.metricsDialog));
+    await refreshMetrics();
+}
+
+
+export function hideMetricsDialog() {
+    r.set('metricsDialog', defaultState.metricsDialog);
+}
+
+
+export async function refreshMetrics() {
+    const metrics = await app.rpc.get_metrics();
+    if (!r.get('metricsDialog', 'open'))
+        return;
+    r.set(['metricsDialog', 'metrics'], metrics);
+}
+
+
 export function showAddDialog() {
     r.set('addDialog', u.set('open', true, defaultState.addDialog));
 }
@@ -64,6 +87,7 @@ export async function add(deviceType) {
 
 export function select(deviceId) {
     r.set('deviceId', deviceId);
+    app.rpc.set_view(deviceId ? {[deviceId]: null} : {});
 }
 
 
@@ -96,3 +120,8 @@ export function setAutoStart(deviceId, autoStart) {
 export async function execute(deviceId, action, ...args) {
     return await app.rpc.execute(deviceId, action, ...args);
 }
+
+
+export async function executeBatch(entries) {
+    return await app.rpc.execute_batch(entries);
+}
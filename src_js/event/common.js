@@ -6,6 +6,11 @@ export function setAddress(deviceId, address) {
 }
 
 
+export function setChangesSize(deviceId, changesSize) {
+    common.execute(deviceId, 'set_changes_size', changesSize);
+}
+
+
 export function register(deviceId, text, withSourceTimestamp) {
     common.execute(deviceId, 'register', text, withSourceTimestamp);
 }
@@ -1,9 +1,13 @@
 import r from '@hat-open/renderer';
+import * as u from '@hat-open/util';
+
 import * as datetime from '../../datetime';
 
 
 export function main(deviceId) {
-    const changes = r.get('remote', 'devices', deviceId, 'data', 'changes');
+    const changes = u.toPairs(r.get('remote', 'devices', deviceId, 'data', 'changes') || {})
+        .sort(([id1, _], [id2, __]) => id2 - id1)
+        .map(([_, i]) => i);
 
     return ['div.subpage.changes',
         ['table',
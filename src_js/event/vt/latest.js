@@ -4,7 +4,7 @@ import * as datetime from '../../datetime';
 
 
 export function main(deviceId) {
-    const latest = r.get('remote', 'devices', deviceId, 'data', 'latest') || [];
+    const latest = Object.values(r.get('remote', 'devices', deviceId, 'data', 'latest') || {});
     const eventTree = getEventTree(latest);
 
     return ['div.subpage.latest',
@@ -1,4 +1,5 @@
 import r from '@hat-open/renderer';
+import * as u from '@hat-open/util';
 
 import * as common from '../common';
 
@@ -27,9 +28,11 @@ const subpages = [
 function header(deviceId) {
     const subpagePath = ['pages', deviceId, 'subpage'];
     const addressPath = ['remote', 'devices', deviceId, 'data', 'address'];
+    const changesSizePath = ['remote', 'devices', deviceId, 'data', 'changes_size'];
 
     const selectedSubpage = r.get(subpagePath) || 'latest';
     const address = r.get(addressPath);
+    const changesSize = r.get(changesSizePath);
 
     return ['div.header',
         ['div.menu', subpages.map(([subpage, title]) =>
@@ -53,6 +56,20 @@ function header(deviceId) {
                 on: {
                     change: evt => common.setAddress(deviceId, evt.target.value)
                 }
+            }],
+            ['label', 'Changes size'],
+            ['input', {
+                props: {
+                    type: 'number',
+                    value: changesSize
+                },
+                on: {
+                    change: evt => {
+                        const value = u.strictParseInt(evt.target.value);
+                        if (!Number.isNaN(value))
+                            common.setChangesSize(deviceId, value);
+                    }
+                }
             }]
         ]
     ];
@@ -23,6 +23,36 @@ export async function sendCommand(deviceId, cmd) {
 }
 
 
+export function addInterrogation(deviceId) {
+    return common.execute(deviceId, 'add_interrogation');
+}
+
+
+export function removeInterrogation(deviceId, interrogationId) {
+    common.execute(deviceId, 'remove_interrogation', interrogationId);
+}
+
+
+export function changeInterrogation(deviceId, interrogationId, path, value) {
+    common.execute(deviceId, 'change_interrogation', interrogationId, path, value);
+}
+
+
+export function resetInterrogationStats(deviceId) {
+    common.execute(deviceId, 'reset_interrogation_stats');
+}
+
+
+export function changeLoad(deviceId, path, value) {
+    common.execute(deviceId, 'change_load', path, value);
+}
+
+
+export function clearPoints(deviceId) {
+    common.execute(deviceId, 'clear_points');
+}
+
+
 export async function addData(deviceId) {
     const dataId = await common.execute(deviceId, 'add_data');
     r.set(['pages', deviceId, 'selected'], ['data', dataId]);
@@ -44,6 +74,18 @@ export function notifyData(deviceId, dataId) {
 }
 
 
+export function setGenerator(deviceId, dataId, generator) {
+    common.execute(deviceId, 'set_generator', dataId, generator);
+}
+
+
+export async function importPoints(deviceId, file) {
+    const fileFormat = file.name.toLowerCase().endsWith('.csv') ? 'csv' : 'jsonl';
+    const text = await file.text();
+    await common.execute(deviceId, 'import_points', text, fileFormat);
+}
+
+
 export async function addCommand(deviceId) {
     const commandId = await common.execute(deviceId, 'add_command');
     r.set(['pages', deviceId, 'selected'], ['command', commandId]);
@@ -65,6 +65,9 @@ const commandActions = ['EXECUTE', 'SELECT', 'CANCEL'];
 
 const freezeValues = ['READ', 'FREEZE', 'FREEZE_AND_RESET', 'RESET'];
 
+const generatorTypes = ['none', 'random_walk', 'sine', 'ramp', 'toggle',
+                        'counter'];
+
 
 export function master() {
     const deviceId = r.get('deviceId');
@@ -103,7 +106,9 @@ function properties(deviceId) {
         formEntryNumber('Supervisory timeout', properties.supervisory_timeout, onChange('supervisory_timeout')),
         formEntryNumber('Test timeout', properties.test_timeout, onChange('test_timeout')),
         formEntryNumber('Send window', properties.send_window_size, onChange('send_window_size')),
-        formEntryNumber('Receive window', properties.receive_window_size, onChange('receive_window_size'))
+        formEntryNumber('Receive window', properties.receive_window_size, onChange('receive_window_size')),
+        (u.isNil(properties.history_size) ? [] :
+            formEntryNumber('History size', properties.history_size, onChange('history_size')))
     ];
 }
 
@@ -117,7 +122,9 @@ function masterControl(deviceId) {
         ['div.header',
             [['interrogate', 'Interrogate'],
              ['counterInterrogate', 'Counter interrogate'],
-             ['command', 'Command']
+             ['command', 'Command'],
+             ['periodic', 'Periodic interrogation'],
+             ['load', 'Load']
             ].map(([type, label]) => ['div', {
                 class: {
                     selected: selectedType == type
@@ -131,7 +138,9 @@ function masterControl(deviceId) {
         {
             'interrogate': masterControlInterrogate,
             'counterInterrogate': masterControlCounterInterrogate,
-            'command': masterControlCommand
+            'command': masterControlCommand,
+            'periodic': masterControlPeriodic,
+            'load': masterControlLoad
         }[selectedType](deviceId)
     ];
 }
@@ -185,6 +194,201 @@ function masterControlCounterInterrogate(deviceId) {
 }
 
 
+function masterControlPeriodic(deviceId) {
+    const selectedPath = ['pages', deviceId, 'control', 'periodic', 'selected'];
+
+    const interrogations = r.get('remote', 'devices', deviceId, 'data', 'interrogations') || {};
+    const stats = r.get('remote', 'devices', deviceId, 'data', 'interrogation_stats') || {};
+    const selected = r.get(selectedPath);
+    const selectedInterrogation = (u.isNil(selected) ? null : interrogations[selected]);
+
+    const val = x => u.isNil(x) ? '' : String(x);
+    const avg = (x, scale) => (!x || !x.count) ? '' : (x.sum / x.count * scale).toFixed(1);
+
+    const onChange = u.curry((property, value) =>
+        common.changeInterrogation(deviceId, selected, property, value)
+    );
+
+    return ['div.content.periodic',
+        ['table',
+            ['thead',
+                ['tr',
+                    ['th.col-bool', 'Enabled'],
+                    ['th.col-str', 'Type'],
+                    ['th.col-int', 'ASDU'],
+                    ['th.col-int', 'Period'],
+                    ['th.col-int', 'Count'],
+                    ['th.col-int', 'Failures'],
+                    ['th.col-int', 'Timeouts'],
+                    ['th.col-int', 'Overruns'],
+                    ['th.col-long', 'Duration avg [ms]'],
+                    ['th.col-long', 'Objects avg'],
+                    ['th', 'Last result'],
+                    ['th.col-remove']
+                ]
+            ],
+            ['tbody', Array.from(Object.entries(interrogations), ([id, i]) => {
+                const stat = stats[id] || {};
+                return ['tr', {
+                    class: {
+                        selected: selected == id
+                    },
+                    on: {
+                        click: _ => r.set(selectedPath, id)
+                    }},
+                    ['td.col-bool', (i.enabled ? 'yes' : 'no')],
+                    ['td.col-str', val(i.type)],
+                    ['td.col-int', val(i.asdu)],
+                    ['td.col-int', val(i.period)],
+                    ['td.col-int', val(stat.count)],
+                    ['td.col-int', val(stat.failures)],
+                    ['td.col-int', val(stat.timeouts)],
+                    ['td.col-int', val(stat.overruns)],
+                    ['td.col-long', avg(stat.duration, 1000)],
+                    ['td.col-long', avg(stat.object_count, 1)],
+                    ['td', val(stat.last_result)],
+                    ['td.col-remove',
+                        ['button', {
+                            on: {
+                                click: evt => {
+                                    evt.stopPropagation();
+                                    common.removeInterrogation(deviceId, id);
+                                }
+                            }},
+                            ['span.fa.fa-times']
+                        ]
+                    ]
+                ];
+            })]
+        ],
+        (!selectedInterrogation ? [] : ['div.form',
+            formEntryCheckbox('Enabled', selectedInterrogation.enabled, onChange('enabled')),
+            formEntrySelect('Type', selectedInterrogation.type,
+                            ['interrogate', 'counter_interrogate'], onChange('type')),
+            formEntryNumber('ASDU', selectedInterrogation.asdu, onChange('asdu')),
+            (selectedInterrogation.type != 'counter_interrogate' ? [] :
+                formEntrySelect('Freeze', selectedInterrogation.freeze,
+                                freezeValues, onChange('freeze'))),
+            formEntryNumber('Period', selectedInterrogation.period, onChange('period')),
+            formEntryNumber('Timeout', selectedInterrogation.timeout, onChange('timeout'))
+        ]),
+        ['div.buttons',
+            ['button', {
+                on: {
+                    click: _ => common.resetInterrogationStats(deviceId)
+                }},
+                ['span.fa.fa-undo'],
+                ' Reset statistics'
+            ],
+            ['button', {
+                on: {
+                    click: async _ => {
+                        const id = await common.addInterrogation(deviceId);
+                        r.set(selectedPath, id);
+                    }
+                }},
+                ['span.fa.fa-plus'],
+                ' Add periodic interrogation'
+            ]
+        ]
+    ];
+}
+
+
+function masterControlLoad(deviceId) {
+    const load = r.get('remote', 'devices', deviceId, 'data', 'load');
+    const stats = r.get('remote', 'devices', deviceId, 'data', 'load_stats');
+    const cmd = r.get('pages', deviceId, 'control', 'command');
+    if (!load)
+        return [];
+
+    const val = x => u.isNil(x) ? '' : String(x);
+    const rate = x => u.isNil(x) ? '' : x.toFixed(1);
+    const ms = x => u.isNil(x) ? '' : (x * 1000).toFixed(1);
+
+    const onChange = u.curry((property, value) =>
+        common.changeLoad(deviceId, property, value)
+    );
+
+    const requestStats = (label, x) => ['tr',
+        ['td', label],
+        ['td.col-long', val(x.count)],
+        ['td.col-long', rate(x.rate)],
+        ['td.col-long', val(x.failures)],
+        ['td.col-long', val(x.timeouts)],
+        ['td.col-long', ms(x.latency.p50)],
+        ['td.col-long', ms(x.latency.p90)],
+        ['td.col-long', ms(x.latency.p99)],
+        ['td.col-long', ms(x.latency.max)]
+    ];
+
+    return ['div.content.load',
+        ['div.form',
+            formEntryCheckbox('Enabled (restart required)', load.enabled, onChange('enabled')),
+            formEntryNumber('Connections', load.connection_count, onChange('connection_count')),
+            formEntryNumber('Port count', load.port_count, onChange('port_count')),
+            formEntryNumber('Connect concurrency', load.connect_concurrency, onChange('connect_concurrency')),
+            formEntryNumber('Reconnect delay', load.reconnect_delay, onChange('reconnect_delay')),
+            formEntryNumber('Interrogation ASDU', load.asdu, onChange('asdu')),
+            formEntryNumber('Interrogation period', load.interrogation_period, onChange('interrogation_period')),
+            formEntryNumber('Command period', load.command_period, onChange('command_period')),
+            formEntryNumber('Timeout', load.timeout, onChange('timeout')),
+            ['label.label', 'Command'],
+            ['span', (load.command ?
+                `${load.command.type} (asdu: ${load.command.asdu}, io: ${load.command.io})` :
+                'none')]
+        ],
+        ['div.buttons',
+            ['button', {
+                props: {
+                    disabled: !load.command
+                },
+                on: {
+                    click: _ => onChange('command', null)
+                }},
+                'Clear command'
+            ],
+            ['button', {
+                props: {
+                    disabled: !cmd
+                },
+                on: {
+                    click: _ => onChange('command', cmd)
+                }},
+                'Use command from Command tab'
+            ]
+        ],
+        (!stats ? [] : [
+            ['div.stats',
+                `Connections: ${stats.connections} ` +
+                `(connects: ${stats.connects}, failures: ${stats.connect_failures}) - ` +
+                `received ASDUs: ${stats.received_asdus} (${rate(stats.received_asdus_rate)}/s) - ` +
+                `received data: ${stats.received_data} (${rate(stats.received_data_rate)}/s)`
+            ],
+            ['table',
+                ['thead',
+                    ['tr',
+                        ['th'],
+                        ['th.col-long', 'Count'],
+                        ['th.col-long', 'Rate [1/s]'],
+                        ['th.col-long', 'Failures'],
+                        ['th.col-long', 'Timeouts'],
+                        ['th.col-long', 'p50 [ms]'],
+                        ['th.col-long', 'p90 [ms]'],
+                        ['th.col-long', 'p99 [ms]'],
+                        ['th.col-long', 'max [ms]']
+                    ]
+                ],
+                ['tbody',
+                    requestStats('Interrogations', stats.interrogations),
+                    requestStats('Commands', stats.commands)
+                ]
+            ]
+        ])
+    ];
+}
+
+
 function masterControlCommand(deviceId) {
     const cmdPath = ['pages', deviceId, 'control', 'command'];
 
@@ -250,14 +454,61 @@ function masterControlCommandValue(deviceId, cmd) {
 
 
 function masterData(deviceId) {
-    const data = r.get('remote', 'devices', deviceId, 'data', 'data') || [];
+    const selectedViewPath = ['pages', deviceId, 'view'];
+
+    const selectedView = r.get(selectedViewPath) || 'history';
+
+    const table = (selectedView == 'points' ?
+        masterDataPoints(deviceId) :
+        masterDataHistory(deviceId));
 
     return ['div.data',
-        tableData(iter.map(i => [null, i], data), true)
+        table,
+        ['div.control',
+            [['history', 'History'],
+             ['points', 'Current values']
+            ].map(([view, label]) => ['label',
+                ['input', {
+                    props: {
+                        type: 'radio',
+                        checked: selectedView == view
+                    },
+                    on: {
+                        change: _ => r.set(selectedViewPath, view)
+                    }
+                }],
+                ` ${label}`
+            ]),
+            (selectedView != 'points' ? [] : ['button', {
+                on: {
+                    click: _ => common.clearPoints(deviceId)
+                }},
+                ['span.fa.fa-times'],
+                ' Clear'
+            ])
+        ]
     ];
 }
 
 
+function masterDataHistory(deviceId) {
+    const data = u.toPairs(r.get('remote', 'devices', deviceId, 'data', 'data') || {})
+        .sort(([id1, _], [id2, __]) => id2 - id1)
+        .map(([_, i]) => i);
+
+    return tableData(iter.map(i => [null, i], data), true);
+}
+
+
+function masterDataPoints(deviceId) {
+    const points = u.toPairs(r.get('remote', 'devices', deviceId, 'data', 'points') || {})
+        .map(([_, i]) => i)
+        .sort((i1, i2) => (i1.asdu - i2.asdu) || (i1.io - i2.io));
+
+    return tableData(iter.map(i => [null, i], points), true, null, null, null, true);
+}
+
+
 function slaveData(deviceId) {
     const selectedPath = ['pages', deviceId, 'selected'];
 
@@ -277,7 +528,8 @@ function slaveData(deviceId) {
                 }},
                 ['span.fa.fa-plus'],
                 ' Add data'
-            ]
+            ],
+            importButton(deviceId)
         ]
     ];
 }
@@ -302,12 +554,35 @@ function slaveCommands(deviceId) {
                 }},
                 ['span.fa.fa-plus'],
                 ' Add command'
-            ]
+            ],
+            importButton(deviceId)
         ]
     ];
 }
 
 
+function importButton(deviceId) {
+    return ['label.import',
+        ['input', {
+            props: {
+                type: 'file',
+                accept: '.csv,.jsonl,.json'
+            },
+            on: {
+                change: evt => {
+                    const file = evt.target.files[0];
+                    evt.target.value = null;
+                    if (file)
+                        common.importPoints(deviceId, file);
+                }
+            }
+        }],
+        ['span.fa.fa-upload'],
+        ' Import'
+    ];
+}
+
+
 function slavePanel(deviceId) {
     const [selectedType, selectedId] = r.get('pages', deviceId, 'selected') || [];
 
@@ -339,7 +614,8 @@ function slavePanelData(deviceId, selectedDataId) {
             slavePanelDataQuality(deviceId, selectedDataId),
             timeFormEntries(selectedData.time, onChange('time')),
             formEntrySelect('Cause', selectedData.cause, dataCauses, onChange('cause')),
-            formEntryCheckbox('Is test', selectedData.is_test, onChange('is_test'))
+            formEntryCheckbox('Is test', selectedData.is_test, onChange('is_test')),
+            slavePanelDataGenerator(deviceId, selectedDataId)
         ],
         ['button', {
             on: {
@@ -435,6 +711,31 @@ function slavePanelDataValue(deviceId, dataId) {
 }
 
 
+function slavePanelDataGenerator(deviceId, dataId) {
+    const generator = r.get('remote', 'devices', deviceId, 'data', 'data', dataId, 'generator');
+
+    const onTypeChange = type => common.setGenerator(
+        deviceId, dataId, (type == 'none' ? null : {type: type}));
+
+    const onParamChange = u.curry((param, value) =>
+        common.setGenerator(deviceId, dataId, u.set(param, value, generator))
+    );
+
+    if (!generator)
+        return [
+            formEntrySelect('Generator', 'none', generatorTypes, onTypeChange)
+        ];
+
+    return [
+        formEntrySelect('Generator', generator.type, generatorTypes, onTypeChange),
+        Object.keys(generator).filter(i => i != 'type').map(param =>
+            formEntryNumber(`Generator - ${param}`, generator[param],
+                            onParamChange(param))
+        )
+    ];
+}
+
+
 function slavePanelDataQuality(deviceId, dataId) {
     const quality = r.get('remote', 'devices', deviceId, 'data', 'data', dataId, 'quality');
 
@@ -556,7 +857,7 @@ function timeFormEntries(time, onChange) {
 }
 
 
-function tableData(data, showTimestamp, isSelected=null, onClick=null, onRemove=null) {
+function tableData(data, showTimestamp, isSelected=null, onClick=null, onRemove=null, showUpdates=false) {
     return ['table',
         ['thead',
             ['tr',
@@ -581,6 +882,8 @@ function tableData(data, showTimestamp, isSelected=null, onClick=null, onRemove=
                 ['th.col-bool.hidden'],   // time-summer_time
                 ['th.col-str.hidden'],    // cause
                 ['th.col-bool.hidden'],   // is_test
+                (!showUpdates ? [] : ['th.col-long.hidden']),  // updates
+                (!showUpdates ? [] : ['th.col-long.hidden']),  // rate
                 (!onRemove ? [] : ['th.col-remove.hidden'])
             ],
             ['tr',
@@ -593,6 +896,8 @@ function tableData(data, showTimestamp, isSelected=null, onClick=null, onRemove=
                 ['th', {props: {colSpan: 9}}, 'Time'],
                 ['th', {props: {rowSpan: 2}}, 'Cause'],
                 ['th', {props: {rowSpan: 2}}, 'Test'],
+                (!showUpdates ? [] : ['th', {props: {rowSpan: 2}}, 'Updates']),
+                (!showUpdates ? [] : ['th', {props: {rowSpan: 2}}, 'Rate']),
                 (!onRemove ? [] : ['th', {props: {rowSpan: 2}}, 'Remove'])
             ],
             ['tr',
@@ -653,6 +958,10 @@ function tableData(data, showTimestamp, isSelected=null, onClick=null, onRemove=
                 ['td.col-bool', val('time', 'summer_time')],
                 ['td.col-str', val('cause')],
                 ['td.col-bool', val('is_test')],
+                (!showUpdates ? [] : ['td.col-long', val('updates')]),
+                (!showUpdates ? [] : ['td.col-long',
+                    (u.isNil(i.rate) ? '' : i.rate.toFixed(2))
+                ]),
                 (!onRemove ? [] : ['td.col-remove',
                     ['button', {
                         on: {
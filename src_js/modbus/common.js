@@ -1,4 +1,5 @@
 import r from '@hat-open/renderer';
+import * as u from '@hat-open/util';
 
 import * as common from '../common';
 
@@ -18,9 +19,38 @@ export function write(deviceId, modbusDeviceId, dataType, startAddress, values)
 }
 
 
+export async function addPollGroup(deviceId) {
+    const groupId = await common.execute(deviceId, 'add_poll_group');
+    r.set(['pages', deviceId, 'selectedPollGroup'], groupId);
+}
+
+
+export function removePollGroup(deviceId, groupId) {
+    common.execute(deviceId, 'remove_poll_group', groupId);
+}
+
+
+export function changePollGroup(deviceId, groupId, path, value) {
+    common.execute(deviceId, 'change_poll_group', groupId, path, value);
+}
+
+
+export function resetPollStats(deviceId) {
+    common.execute(deviceId, 'reset_poll_stats');
+}
+
+
+export function changeLoad(deviceId, path, value) {
+    common.execute(deviceId, 'change_load', path, value);
+}
+
+
 export async function addData(deviceId) {
     const dataId = await common.execute(deviceId, 'add_data');
-    r.set(['pages', deviceId, 'selected'], ['data', dataId]);
+    r.change(['pages', deviceId], u.pipe(
+        u.set('selected', dataId),
+        u.set('selectedGenerator', null)
+    ));
 }
 
 
@@ -32,3 +62,27 @@ export function removeData(deviceId, dataId) {
 export function changeData(deviceId, dataId, path, value) {
     common.execute(deviceId, 'change_data', dataId, path, value);
 }
+
+
+export function setGenerator(deviceId, dataId, generator) {
+    common.execute(deviceId, 'set_generator', dataId, generator);
+}
+
+
+export async function addRangeGenerator(deviceId) {
+    const generatorId = await common.execute(deviceId, 'add_range_generator');
+    r.change(['pages', deviceId], u.pipe(
+        u.set('selected', null),
+        u.set('selectedGenerator', generatorId)
+    ));
+}
+
+
+export function removeRangeGenerator(deviceId, generatorId) {
+    common.execute(deviceId, 'remove_range_generator', generatorId);
+}
+
+
+export function changeRangeGenerator(deviceId, generatorId, path, value) {
+    common.execute(deviceId, 'change_range_generator', generatorId, path, value);
+}
@@ -11,6 +11,8 @@ const modbusTypes = ['TCP', 'RTU', 'ASCII'];
 
 const dataTypes = ['COIL', 'DISCRETE_INPUT', 'HOLDING_REGISTER', 'INPUT_REGISTER', 'QUEUE'];
 
+const generatorTypes = ['none', 'random_walk', 'sine', 'ramp', 'toggle', 'counter'];
+
 
 export function master() {
     const deviceId = r.get('deviceId');
@@ -18,6 +20,9 @@ export function master() {
     return ['div.page.modbus.master',
         properties(deviceId),
         masterAction(deviceId),
+        masterPollGroups(deviceId),
+        masterPollGroupPanel(deviceId),
+        masterLoad(deviceId),
         masterData(deviceId)
     ];
 }
@@ -29,6 +34,7 @@ export function slave() {
     return ['div.page.modbus.slave',
         properties(deviceId),
         slaveData(deviceId),
+        slaveGenerators(deviceId),
         slavePanel(deviceId)
     ];
 }
@@ -49,7 +55,9 @@ function properties(deviceId) {
         (properties.link_type != 'SERIAL' ? [] : [
             formEntryText('Serial port', properties.serial_port, onChange('serial_port')),
             formEntryNumber('Silent interval', properties.serial_silent_interval, onChange('serial_silent_interval'))
-        ])
+        ]),
+        (u.isNil(properties.history_size) ? [] :
+            formEntryNumber('History size', properties.history_size, onChange('history_size')))
     ];
 }
 
@@ -101,7 +109,9 @@ function masterAction(deviceId) {
 
 
 function masterData(deviceId) {
-    const data = r.get('remote', 'devices', deviceId, 'data', 'data') || [];
+    const data = u.toPairs(r.get('remote', 'devices', deviceId, 'data', 'data') || {})
+        .sort(([id1, _], [id2, __]) => id2 - id1)
+        .map(([_, i]) => i);
 
     const val = x => u.isNil(x) ? '' : String(x);
 
@@ -134,6 +144,163 @@ function masterData(deviceId) {
 }
 
 
+function masterPollGroups(deviceId) {
+    const selectedPath = ['pages', deviceId, 'selectedPollGroup'];
+
+    const pollGroups = r.get('remote', 'devices', deviceId, 'data', 'poll_groups') || {};
+    const pollStats = r.get('remote', 'devices', deviceId, 'data', 'poll_stats') || {};
+    const selected = r.get(selectedPath);
+
+    const val = x => u.isNil(x) ? '' : String(x);
+    const ms = x => u.isNil(x) ? '' : (x * 1000).toFixed(1);
+
+    return ['div.data.poll-groups',
+        ['table',
+            ['thead',
+                ['tr',
+                    ['th.col-bool', 'Enabled'],
+                    ['th.col-int', 'Device ID'],
+                    ['th.col-str', 'Data type'],
+                    ['th.col-int', 'Start address'],
+                    ['th.col-int', 'Quantity'],
+                    ['th.col-int', 'Period'],
+                    ['th.col-int', 'Count'],
+                    ['th.col-int', 'Errors'],
+                    ['th.col-int', 'Failures'],
+                    ['th.col-int', 'Timeouts'],
+                    ['th.col-int', 'Overruns'],
+                    ['th.col-int', 'Cycle avg [ms]'],
+                    ['th.col-int', 'Jitter max [ms]'],
+                    ['th.col-int', 'Duration avg [ms]'],
+                    ['th', 'Last result'],
+                    ['th.col-remove']
+                ]
+            ],
+            ['tbody', Array.from(Object.entries(pollGroups), ([id, i]) => {
+                const stats = pollStats[id] || {};
+                return ['tr', {
+                    class: {
+                        selected: selected == id
+                    },
+                    on: {
+                        click: _ => r.set(selectedPath, id)
+                    }},
+                    ['td.col-bool', (i.enabled ? 'yes' : 'no')],
+                    ['td.col-int', val(i.device_id)],
+                    ['td.col-str', val(i.data_type)],
+                    ['td.col-int', val(i.start_address)],
+                    ['td.col-int', val(i.quantity)],
+                    ['td.col-int', val(i.period)],
+                    ['td.col-int', val(stats.count)],
+                    ['td.col-int', val(stats.errors)],
+                    ['td.col-int', val(stats.failures)],
+                    ['td.col-int', val(stats.timeouts)],
+                    ['td.col-int', val(stats.overruns)],
+                    ['td.col-int', ms(u.get(['cycle', 'avg'], stats))],
+                    ['td.col-int', ms(u.get(['jitter', 'max'], stats))],
+                    ['td.col-int', ms(u.get(['duration', 'avg'], stats))],
+                    ['td', val(stats.last_result)],
+                    ['td.col-remove',
+                        ['button', {
+                            on: {
+                                click: evt => {
+                                    evt.stopPropagation();
+                                    common.removePollGroup(deviceId, id);
+                                }
+                            }},
+                            ['span.fa.fa-times']
+                        ]
+                    ]
+                ];
+            })]
+        ],
+        ['div.control',
+            ['button', {
+                on: {
+                    click: _ => common.resetPollStats(deviceId)
+                }},
+                ['span.fa.fa-undo'],
+                ' Reset statistics'
+            ],
+            ['button', {
+                on: {
+                    click: _ => common.addPollGroup(deviceId)
+                }},
+                ['span.fa.fa-plus'],
+                ' Add poll group'
+            ]
+        ]
+    ];
+}
+
+
+function masterPollGroupPanel(deviceId) {
+    const groupId = r.get('pages', deviceId, 'selectedPollGroup');
+    if (u.isNil(groupId))
+        return [];
+
+    const pollGroup = r.get('remote', 'devices', deviceId, 'data', 'poll_groups', groupId);
+    if (!pollGroup)
+        return [];
+
+    const onChange = u.curry((property, value) =>
+        common.changePollGroup(deviceId, groupId, property, value)
+    );
+
+    return ['div.panel',
+        formEntryCheckbox('Enabled', pollGroup.enabled, onChange('enabled')),
+        formEntryNumber('Device ID', pollGroup.device_id, onChange('device_id')),
+        formEntrySelect('Data type', pollGroup.data_type, dataTypes, onChange('data_type')),
+        formEntryNumber('Start address', pollGroup.start_address, onChange('start_address')),
+        formEntryNumber('Quantity', pollGroup.quantity, onChange('quantity')),
+        formEntryNumber('Period', pollGroup.period, onChange('period')),
+        formEntryNumber('Timeout', pollGroup.timeout, onChange('timeout'))
+    ];
+}
+
+
+function masterLoad(deviceId) {
+    const load = r.get('remote', 'devices', deviceId, 'data', 'load');
+    const stats = r.get('remote', 'devices', deviceId, 'data', 'load_stats');
+    if (!load)
+        return [];
+
+    const val = x => u.isNil(x) ? '' : String(x);
+    const ms = x => u.isNil(x) ? '' : (x * 1000).toFixed(1);
+
+    const onChange = u.curry((property, value) => common.changeLoad(deviceId, property, value));
+
+    const onRequestsChange = value => {
+        try {
+            onChange('requests', JSON.parse(value));
+        } catch (e) {
+            return;
+        }
+    };
+
+    return ['div.load',
+        ['div.form',
+            formEntryCheckbox('Load mode (restart required)', load.enabled, onChange('enabled')),
+            formEntryNumber('Connections', load.connection_count, onChange('connection_count')),
+            formEntryNumber('Connect concurrency', load.connect_concurrency, onChange('connect_concurrency')),
+            formEntryNumber('Reconnect delay', load.reconnect_delay, onChange('reconnect_delay')),
+            formEntryNumber('Rate [1/s]', load.rate, onChange('rate')),
+            formEntryNumber('Timeout', load.timeout, onChange('timeout')),
+            formEntryText('Requests', JSON.stringify(load.requests), onRequestsChange)
+        ],
+        (!stats ? [] : ['div.stats',
+            `Connections: ${val(stats.connections)} ` +
+            `(connects: ${val(stats.connects)}, failures: ${val(stats.connect_failures)}) - ` +
+            `requests: ${val(stats.requests)} (${stats.rate.toFixed(1)}/s) - ` +
+            `errors: ${val(stats.errors)} - timeouts: ${val(stats.timeouts)} - ` +
+            `overruns: ${val(stats.overruns)} - ` +
+            `latency p50/p90/p99/max [ms]: ${ms(stats.latency.p50)} / ` +
+            `${ms(stats.latency.p90)} / ${ms(stats.latency.p99)} / ${ms(stats.latency.max)}`
+        ])
+    ];
+}
+
+
 function slaveData(deviceId) {
     const selectedPath = ['pages', deviceId, 'selected'];
 
@@ -159,7 +326,10 @@ function slaveData(deviceId) {
                         selected: selected == id
                     },
                     on: {
-                        click: _ => r.set(selectedPath, id)
+                        click: _ => r.change(['pages', deviceId], u.pipe(
+                            u.set('selected', id),
+                            u.set('selectedGenerator', null)
+                        ))
                     }},
                     ['td.col-int', val(i.device_id)],
                     ['td.col-str', val(i.data_type)],
@@ -192,7 +362,74 @@ function slaveData(deviceId) {
 }
 
 
+function slaveGenerators(deviceId) {
+    const selectedPath = ['pages', deviceId, 'selectedGenerator'];
+
+    const generators = r.get('remote', 'devices', deviceId, 'data', 'generators') || {};
+    const selected = r.get(selectedPath);
+
+    const val = x => u.isNil(x) ? '' : String(x);
+
+    return ['div.data.generators',
+        ['table',
+            ['thead',
+                ['tr',
+                    ['th.col-int', 'Device ID'],
+                    ['th.col-str', 'Data type'],
+                    ['th.col-int', 'Start address'],
+                    ['th.col-int', 'Quantity'],
+                    ['th', 'Generator'],
+                    ['th.col-remove']
+                ]
+            ],
+            ['tbody', Array.from(Object.entries(generators), ([id, i]) =>
+                ['tr', {
+                    class: {
+                        selected: selected == id
+                    },
+                    on: {
+                        click: _ => r.change(['pages', deviceId], u.pipe(
+                            u.set('selected', null),
+                            u.set('selectedGenerator', id)
+                        ))
+                    }},
+                    ['td.col-int', val(i.device_id)],
+                    ['td.col-str', val(i.data_type)],
+                    ['td.col-int', val(i.start_address)],
+                    ['td.col-int', val(i.quantity)],
+                    ['td', val(u.get('type', i.generator))],
+                    ['td.col-remove',
+                        ['button', {
+                            on: {
+                                click: evt => {
+                                    evt.stopPropagation();
+                                    common.removeRangeGenerator(deviceId, id);
+                                }
+                            }},
+                            ['span.fa.fa-times']
+                        ]
+                    ]
+                ]
+            )]
+        ],
+        ['div.control',
+            ['button', {
+                on: {
+                    click: _ => common.addRangeGenerator(deviceId)
+                }},
+                ['span.fa.fa-plus'],
+                ' Add range generator'
+            ]
+        ]
+    ];
+}
+
+
 function slavePanel(deviceId) {
+    const generatorId = r.get('pages', deviceId, 'selectedGenerator');
+    if (!u.isNil(generatorId))
+        return slavePanelGenerator(deviceId, generatorId);
+
     const dataId = r.get('pages', deviceId, 'selected');
     if (u.isNil(dataId))
         return [];
@@ -207,7 +444,50 @@ function slavePanel(deviceId) {
         formEntryNumber('Device ID', data.device_id, onChange('device_id')),
         formEntrySelect('Data type', data.data_type, dataTypes, onChange('data_type')),
         formEntryNumber('Address', data.address, onChange('address')),
-        formEntryNumber('Value', data.value, onChange('value'))
+        formEntryNumber('Value', data.value, onChange('value')),
+        generatorFormEntries(data.generator, true,
+                             generator => common.setGenerator(deviceId, dataId, generator))
+    ];
+}
+
+
+function slavePanelGenerator(deviceId, generatorId) {
+    const generator = r.get('remote', 'devices', deviceId, 'data', 'generators', generatorId);
+    if (!generator)
+        return [];
+
+    const onChange = u.curry((property, value) =>
+        common.changeRangeGenerator(deviceId, generatorId, property, value)
+    );
+
+    return ['div.panel',
+        formEntryNumber('Device ID', generator.device_id, onChange('device_id')),
+        formEntrySelect('Data type', generator.data_type, dataTypes, onChange('data_type')),
+        formEntryNumber('Start address', generator.start_address, onChange('start_address')),
+        formEntryNumber('Quantity', generator.quantity, onChange('quantity')),
+        generatorFormEntries(generator.generator, false, onChange('generator'))
+    ];
+}
+
+
+function generatorFormEntries(generator, nullable, onChange) {
+    const types = (nullable ? generatorTypes : generatorTypes.slice(1));
+
+    const onTypeChange = type => onChange(type == 'none' ? null : {type: type});
+
+    const onParamChange = u.curry((param, value) =>
+        onChange(u.set(param, value, generator))
+    );
+
+    if (!generator)
+        return formEntrySelect('Generator', 'none', types, onTypeChange);
+
+    return [
+        formEntrySelect('Generator', generator.type, types, onTypeChange),
+        Object.keys(generator).filter(i => i != 'type').map(param =>
+            formEntryNumber(`Generator - ${param}`, generator[param],
+                            onParamChange(param))
+        )
     ];
 }
 
@@ -244,6 +524,25 @@ function formEntryNumber(label, value, onChange) {
 }
 
 
+function formEntryCheckbox(label, value, onChange) {
+    return [
+        ['span'],
+        ['label',
+            ['input', {
+                props: {
+                    type: 'checkbox',
+                    checked: value
+                },
+                on: {
+                    change: evt => onChange(evt.target.checked)
+                }
+            }],
+            ` ${label}`
+        ]
+    ];
+}
+
+
 function formEntrySelect(label, selected, values, onChange) {
     return [
         ['label.label', label],
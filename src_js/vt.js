@@ -54,7 +54,8 @@ export function main() {
         logResizer(),
         log(),
         addDialog(),
-        settingsDialog()
+        settingsDialog(),
+        metricsDialog()
     ];
 }
 
@@ -68,6 +69,13 @@ function globalHeader() {
             ['span.fa.fa-cog'],
             ' Settings'
         ],
+        ['button', {
+            on: {
+                click: common.showMetricsDialog
+            }},
+            ['span.fa.fa-bar-chart'],
+            ' Metrics'
+        ],
         ['button', {
             on: {
                 click: common.save
@@ -148,7 +156,7 @@ function sidebar() {
                         selected: selected
                     },
                     on: {
-                        click: _ => r.set('deviceId', deviceId)
+                        click: _ => common.select(deviceId)
                     }},
                     ['span.status.fa.fa-circle', {
                         class: {
@@ -235,7 +243,9 @@ function logResizer() {
 
 
 function log() {
-    const items = r.get('remote', 'log') || [];
+    const items = u.toPairs(r.get('remote', 'log') || {})
+        .sort(([id1, _], [id2, __]) => id2 - id1)
+        .map(([_, i]) => i);
     return ['div.log',
         ['table',
             ['thead',
@@ -296,6 +306,10 @@ function settingsDialog() {
         return [];
 
     const settings = r.get('remote', 'settings');
+    const metrics = settings.metrics || {
+        enabled: false,
+        address: 'http://127.0.0.1:23025'
+    };
 
     return ['div.overlay', {
         on: {
@@ -319,6 +333,30 @@ function settingsDialog() {
                     change: evt => common.setSettings(['ui', 'address'], evt.target.value)
                 }
             }],
+            ['span.title', 'Metrics'],
+            ['span'],
+            ['label',
+                ['input', {
+                    props: {
+                        type: 'checkbox',
+                        checked: metrics.enabled
+                    },
+                    on: {
+                        change: evt => common.setSettings('metrics', u.set('enabled', evt.target.checked, metrics))
+                    }
+                }],
+                ' Enabled*'
+            ],
+            ['label.label', 'Address*'],
+            ['input', {
+                props: {
+                    type: 'text',
+                    value: metrics.address
+                },
+                on: {
+                    change: evt => common.setSettings('metrics', u.set('address', evt.target.value, metrics))
+                }
+            }],
             ['span.title', 'Log'],
             ['label.label', 'Level*'],
             ['select', {
@@ -382,3 +420,77 @@ function settingsDialog() {
         ]
     ];
 }
+
+
+function metricsDialog() {
+    const open = r.get('metricsDialog', 'open');
+    if (!open)
+        return [];
+
+    const metrics = r.get('metricsDialog', 'metrics');
+    const devices = r.get('remote', 'devices') || {};
+
+    const metricsRows = (source, items) => items.map(metric => ['tr',
+        ['td.col.source', source],
+        ['td.col.name', {
+            props: {
+                title: metric.description
+            }},
+            metric.name
+        ],
+        ['td.col.labels', Object.entries(metric.labels).map(
+            ([k, v]) => `${k}=${v}`
+        ).join(', ')],
+        ['td.col.value', metricValueToString(metric)]
+    ]);
+
+    return ['div.overlay', {
+        on: {
+            click: evt => {
+                evt.stopPropagation();
+                common.hideMetricsDialog();
+            }
+        }},
+        ['div.dialog.metrics', {
+            on: {
+                click: evt => evt.stopPropagation()
+            }},
+            ['div.toolbar',
+                ['button', {
+                    on: {
+                        click: common.refreshMetrics
+                    }},
+                    ['span.fa.fa-refresh'],
+                    ' Refresh'
+                ]
+            ],
+            (!metrics ? [] : ['table',
+                ['thead',
+                    ['tr',
+                        ['th.col.source', 'Source'],
+                        ['th.col.name', 'Name'],
+                        ['th.col.labels', 'Labels'],
+                        ['th.col.value', 'Value']
+                    ]
+                ],
+                ['tbody',
+                    metricsRows('server', metrics.server),
+                    Object.entries(metrics.devices).map(
+                        ([deviceId, items]) => metricsRows(
+                            u.get([deviceId, 'name'], devices) || deviceId,
+                            items))
+                ]
+            ])
+        ]
+    ];
+}
+
+
+function metricValueToString(metric) {
+    if (metric.type != 'histogram')
+        return String(metric.value);
+
+    const {count, sum} = metric.value;
+    const avg = count ? sum / count : 0;
+    return `count: ${count}, avg: ${avg.toPrecision(3)}`;
+}
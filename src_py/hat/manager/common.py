@@ -2,6 +2,15 @@
 
 from pathlib import Path
 import abc
+import asyncio
+import bisect
+import collections
+import contextlib
+import heapq
+import itertools
+import math
+import random
+import time
 import typing
 
 from hat import aio
@@ -66,11 +75,21 @@ def get_log_conf(settings: json.Data) -> json.Data:
 
 
 default_settings: json.Data = {'ui': {'address': 'http://127.0.0.1:23024'},
+                               'metrics': {
+                                   'enabled': False,
+                                   'address': 'http://127.0.0.1:23025'},
                                'log': {'level': 'INFO',
                                        'syslog': {'enabled': False,
                                                   'host': '127.0.0.1',
                                                   'port': 6514},
-                                       'console': {'enabled': False}}}
+                                       'console': {'enabled': False},
+                                       'history': {
+                                           'size': 100,
+                                           'file': {
+                                               'enabled': False,
+                                               'path': 'manager.log',
+                                               'max_size': 1024 * 1024,
+                                               'backup_count': 5}}}}
 """Default settings (``hat-manager://main.yaml#/definitions/settings``)"""
 
 default_conf: json.Data = {
@@ -81,6 +100,21 @@ default_conf: json.Data = {
 """Default configuration (``hat-manager://main.yaml#``)"""
 
 
+def with_defaults(data: typing.Optional[json.Data],
+                  defaults: json.Data
+                  ) -> json.Data:
+    """Get object with all `defaults` properties overridden by `data`
+    properties"""
+    return {**defaults, **(data or {})}
+
+
+def get_sorted_values(data: typing.Dict[str, json.Data]
+                      ) -> typing.List[json.Data]:
+    """Get values of object with integer identifiers as keys, sorted by
+    identifiers"""
+    return [data[i] for i in sorted(data.keys(), key=int)]
+
+
 class Logger:
     """Message logger
 
@@ -102,38 +136,881 @@ class Logger:
         return self._log_cbs.register(cb)
 
 
+class DataChange(typing.NamedTuple):
+    """Data change record
+
+    Path is always flattened list of data keys and indexes. If data is
+    removed, `new_value` is ``None`` and `removed` is ``True``.
+
+    """
+    path: typing.List[typing.Union[str, int]]
+    old_value: json.Data
+    new_value: json.Data
+    removed: bool
+
+
 class DataStorage:
     """Data storage
 
     Helper class representing observable JSON data state manipulated with
-    path based set/remove functions.
+    path based get/set/remove functions.
+
+    Each modification notifies change callbacks with new data and changes
+    callbacks with list of change records describing modified paths.
+    Modifications done inside `transaction` context are notified only once,
+    after outermost transaction context exits.
+
+    Data is internally kept as persistent structure where objects with many
+    entries are represented as hash array mapped tries. Modification of
+    single element has logarithmic complexity and shares all unmodified parts
+    with previous data. Plain JSON data is created lazily (and cached) only
+    when `data` is accessed, so reading parts of data with `get` should be
+    preferred to accessing `data`. Order of entries in large objects is
+    not preserved.
+
+    If `metrics` is provided, number of modifications (``set`` and
+    ``remove`` calls), number of callback notifications and duration of
+    notifying all registered callbacks are registered as metrics.
 
     """
 
-    def __init__(self, data: json.Data = None):
-        self._data = data
-        self._change_cbs = util.CallbackRegistry()
+    def __init__(self,
+                 data: json.Data = None,
+                 metrics: typing.Optional['Metrics'] = None):
+        self._root = data
+        self._changes_cbs = util.CallbackRegistry()
+        self._transaction_depth = 0
+        self._transaction_changes = []
+        self._modifications_counters = None
+        self._notifications_counter = None
+        self._notify_histogram = None
+
+        if metrics is not None:
+            self._modifications_counters = {
+                operation: metrics.counter(
+                    'data_modifications_total',
+                    'number of data storage modifications',
+                    {'operation': operation})
+                for operation in ['set', 'remove']}
+            self._notifications_counter = metrics.counter(
+                'data_notifications_total',
+                'number of data storage change notifications')
+            self._notify_histogram = metrics.histogram(
+                'data_notify_duration_seconds',
+                'duration of data storage change callbacks')
 
     @property
     def data(self) -> json.Data:
         """Data"""
-        return self._data
+        return _node_to_json(self._root)
 
     def register_change_cb(self,
                            cb: typing.Callable[[json.Data], None]
                            ) -> util.RegisterCallbackHandle:
         """Register data change callback"""
-        return self._change_cbs.register(cb)
+        return self._changes_cbs.register(lambda _: cb(self.data))
+
+    def register_changes_cb(self,
+                            cb: typing.Callable[[typing.List[DataChange]],
+                                                None]
+                            ) -> util.RegisterCallbackHandle:
+        """Register data changes callback"""
+        return self._changes_cbs.register(cb)
+
+    def get(self,
+            path: json.Path,
+            default: json.Data = None
+            ) -> json.Data:
+        """Get data referenced by path"""
+        node = _node_get(self._root, _flatten_path(path), _missing)
+        return default if node is _missing else _node_to_json(node)
 
     def set(self, path: json.Path, value: json.Data):
         """Set data"""
-        self._data = json.set_(self._data, path, value)
-        self._change_cbs.notify(self._data)
+        path = _flatten_path(path)
+        old_value = self.get(path)
+        self._root = _node_set(self._root, path, value)
+        if self._modifications_counters is not None:
+            self._modifications_counters['set'].inc()
+        self._notify([DataChange(path, old_value, value, False)])
 
     def remove(self, path: json.Path):
         """Remove data"""
-        self._data = json.remove(self._data, path)
-        self._change_cbs.notify(self._data)
+        path = _flatten_path(path)
+        old_value = self.get(path)
+        self._root = _node_remove(self._root, path)
+        if self._modifications_counters is not None:
+            self._modifications_counters['remove'].inc()
+        self._notify([DataChange(path, old_value, None, True)])
+
+    def apply(self,
+              changes: typing.Iterable[DataChange],
+              path: json.Path = []):
+        """Apply change records to data referenced by path
+
+        Change records are usually obtained from other data storage's changes
+        callback, enabling propagation of only modified parts of data.
+
+        """
+        with self.transaction():
+            for change in changes:
+                change_path = [path, change.path]
+                if change.removed:
+                    self.remove(change_path)
+                else:
+                    self.set(change_path, change.new_value)
+
+    @contextlib.contextmanager
+    def transaction(self) -> typing.Iterator[None]:
+        """Transaction context
+
+        Modifications are applied immediately, but registered callbacks are
+        notified with all change records only when outermost transaction
+        context exits. Transactions can be nested.
+
+        """
+        self._transaction_depth += 1
+        try:
+            yield
+
+        finally:
+            self._transaction_depth -= 1
+            if not self._transaction_depth and self._transaction_changes:
+                changes = self._transaction_changes
+                self._transaction_changes = []
+                self._notify_changes_cbs(changes)
+
+    def _notify(self, changes):
+        if self._transaction_depth:
+            self._transaction_changes.extend(changes)
+        else:
+            self._notify_changes_cbs(changes)
+
+    def _notify_changes_cbs(self, changes):
+        if self._notify_histogram is None:
+            self._changes_cbs.notify(changes)
+            return
+
+        start = time.monotonic()
+        try:
+            self._changes_cbs.notify(changes)
+
+        finally:
+            self._notifications_counter.inc()
+            self._notify_histogram.observe(time.monotonic() - start)
+
+
+class History:
+    """Bounded history
+
+    Ring buffer of at most `size` latest entries, published in data storage
+    as object referenced by `path`. Each entry is identified with unique
+    key (string representation of increasing integer), so appending entry
+    modifies only appended and evicted keys instead of rewriting all
+    entries.
+
+    Args:
+        data: data storage
+        path: path of published entries
+        size: maximum number of entries
+
+    """
+
+    def __init__(self,
+                 data: DataStorage,
+                 path: json.Path,
+                 size: int):
+        self._data = data
+        self._path = path
+        self._entries = collections.deque(maxlen=max(size, 0))
+        self._next_ids = (str(i) for i in itertools.count(1))
+        self._data.set(path, {})
+
+    @property
+    def size(self) -> int:
+        """Maximum number of entries"""
+        return self._entries.maxlen
+
+    @property
+    def count(self) -> int:
+        """Current number of entries"""
+        return len(self._entries)
+
+    def get(self,
+            offset: int = 0,
+            count: typing.Optional[int] = None
+            ) -> typing.List[json.Data]:
+        """Get entries ordered from newest to oldest"""
+        stop = offset + count if count is not None else None
+        entries = itertools.islice(reversed(self._entries), offset, stop)
+        return [entry for _, entry in entries]
+
+    def append(self, entry: json.Data):
+        """Append entry"""
+        self.extend([entry])
+
+    def extend(self, entries: typing.Iterable[json.Data]):
+        """Append entries ordered from oldest to newest
+
+        All modifications are notified as single data storage transaction.
+        Entries which would be immediately evicted are not published.
+
+        """
+        if not self.size:
+            return
+
+        entries = collections.deque(entries, maxlen=self.size)
+        if not entries:
+            return
+
+        with self._data.transaction():
+            for entry in entries:
+                if len(self._entries) == self.size:
+                    entry_id, _ = self._entries.popleft()
+                    self._data.remove([self._path, entry_id])
+
+                entry_id = next(self._next_ids)
+                self._entries.append((entry_id, entry))
+                self._data.set([self._path, entry_id], entry)
+
+    def resize(self, size: int):
+        """Change maximum number of entries
+
+        If new size is smaller than current number of entries, oldest entries
+        are evicted. Negative size is treated as ``0``.
+
+        Raises:
+            ValueError: size is not integer
+
+        """
+        if not isinstance(size, int) or isinstance(size, bool):
+            raise ValueError('invalid size')
+
+        size = max(size, 0)
+        if size == self.size:
+            return
+
+        with self._data.transaction():
+            while len(self._entries) > size:
+                entry_id, _ = self._entries.popleft()
+                self._data.remove([self._path, entry_id])
+
+            self._entries = collections.deque(self._entries, maxlen=size)
+
+    def clear(self):
+        """Remove all entries"""
+        self._entries.clear()
+        self._data.set(self._path, {})
+
+
+default_histogram_buckets: typing.List[float] = [
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10]
+"""Default histogram bucket upper bounds (in seconds)"""
+
+
+class Counter:
+    """Monotonically increasing metric value"""
+
+    def __init__(self):
+        self._value = 0
+
+    @property
+    def value(self) -> float:
+        """Current value"""
+        return self._value
+
+    def inc(self, value: float = 1):
+        """Increment value"""
+        self._value += value
+
+    def to_json(self) -> json.Data:
+        """Get JSON representation of current value"""
+        return self._value
+
+
+class Gauge:
+    """Arbitrary metric value"""
+
+    def __init__(self):
+        self._value = 0
+
+    @property
+    def value(self) -> float:
+        """Current value"""
+        return self._value
+
+    def set(self, value: float):
+        """Set value"""
+        self._value = value
+
+    def inc(self, value: float = 1):
+        """Increment value"""
+        self._value += value
+
+    def dec(self, value: float = 1):
+        """Decrement value"""
+        self._value -= value
+
+    def to_json(self) -> json.Data:
+        """Get JSON representation of current value"""
+        return self._value
+
+
+class Histogram:
+    """Distribution of observed values
+
+    Each observed value is counted in first bucket whose upper bound is
+    greater or equal to observed value. Values greater than all upper bounds
+    are counted in additional last bucket.
+
+    """
+
+    def __init__(self,
+                 buckets: typing.List[float] = default_histogram_buckets):
+        self._buckets = sorted(buckets)
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._count = 0
+        self._sum = 0
+
+    @property
+    def count(self) -> int:
+        """Number of observed values"""
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """Sum of observed values"""
+        return self._sum
+
+    def observe(self, value: float):
+        """Add observed value"""
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._count += 1
+        self._sum += value
+
+    def to_json(self) -> json.Data:
+        """Get JSON representation of current value
+
+        Representation contains bucket upper bounds (`buckets`),
+        non-cumulative number of values in each bucket (`counts` - with
+        additional last element for values greater than all upper bounds),
+        total number of observed values (`count`) and their sum (`sum`).
+
+        """
+        return {'buckets': list(self._buckets),
+                'counts': list(self._counts),
+                'count': self._count,
+                'sum': self._sum}
+
+
+class Latencies:
+    """Latest latency samples
+
+    At most `size` latest samples are used for calculating percentiles.
+
+    """
+
+    def __init__(self, size: int = 10000):
+        self._samples = collections.deque(maxlen=size)
+
+    def add(self, value: float):
+        """Add sample"""
+        self._samples.append(value)
+
+    def to_json(self) -> json.Data:
+        """Get JSON representation of current percentiles
+
+        Representation contains ``p50``, ``p90``, ``p99`` and ``max``
+        percentiles (``None`` if there are no samples).
+
+        """
+        samples = sorted(self._samples)
+        return {'p50': get_percentile(samples, 0.5),
+                'p90': get_percentile(samples, 0.9),
+                'p99': get_percentile(samples, 0.99),
+                'max': samples[-1] if samples else None}
+
+
+def get_percentile(sorted_values: typing.List[float],
+                   q: float
+                   ) -> typing.Optional[float]:
+    """Get `q` quantile (``0 <= q <= 1``) of sorted values"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(q * len(sorted_values)),
+                             len(sorted_values) - 1)]
+
+
+Metric = typing.Union[Counter, Gauge, Histogram]
+"""Metric"""
+
+
+class Metrics:
+    """Metrics registry
+
+    Metrics are identified by name and labels. Getting metric which is
+    already registered returns existing instance, so metrics can be obtained
+    once and updated without any additional lookups.
+
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self,
+                name: str,
+                description: str = '',
+                labels: typing.Dict[str, str] = {}
+                ) -> Counter:
+        """Get or register counter"""
+        return self._get_metric(Counter, name, description, labels)
+
+    def gauge(self,
+              name: str,
+              description: str = '',
+              labels: typing.Dict[str, str] = {}
+              ) -> Gauge:
+        """Get or register gauge"""
+        return self._get_metric(Gauge, name, description, labels)
+
+    def histogram(self,
+                  name: str,
+                  description: str = '',
+                  labels: typing.Dict[str, str] = {},
+                  buckets: typing.List[float] = default_histogram_buckets
+                  ) -> Histogram:
+        """Get or register histogram"""
+        return self._get_metric(Histogram, name, description, labels,
+                                buckets)
+
+    def to_json(self) -> json.Data:
+        """Get JSON representation of all registered metrics
+
+        Each metric is represented with `name`, `description`, `type`
+        (``counter``, ``gauge`` or ``histogram``), `labels` and current
+        `value`.
+
+        """
+        return [{'name': name,
+                 'description': description,
+                 'type': _metric_types[type(metric)],
+                 'labels': dict(labels),
+                 'value': metric.to_json()}
+                for (name, labels), (description, metric)
+                in self._metrics.items()]
+
+    def _get_metric(self, metric_cls, name, description, labels, *args):
+        key = name, tuple(sorted(labels.items()))
+        entry = self._metrics.get(key)
+        if entry:
+            metric = entry[1]
+            if not isinstance(metric, metric_cls):
+                raise ValueError('metric type mismatch')
+            return metric
+
+        metric = metric_cls(*args)
+        self._metrics[key] = description, metric
+        return metric
+
+
+generator_defaults: json.Data = {
+    'random_walk': {'interval': 1, 'step': 1, 'min': 0, 'max': 100},
+    'sine': {'interval': 1, 'amplitude': 1, 'offset': 0, 'period': 60},
+    'ramp': {'interval': 1, 'step': 1, 'min': 0, 'max': 100},
+    'toggle': {'interval': 1, 'min': 0, 'max': 1},
+    'counter': {'interval': 1, 'step': 1}}
+"""Supported generator types and their default parameters"""
+
+
+class Generator:
+    """Numeric value generator
+
+    Generator configuration is object with `type` (one of
+    `generator_defaults` keys) and optional type specific parameters
+    (missing parameters are set to `generator_defaults`). Each generator
+    has `interval` parameter - time in seconds between two consecutive
+    values. Supported generator types:
+
+        * ``random_walk`` - adds random number in range [-`step`, `step`]
+          limited to [`min`, `max`]
+        * ``sine`` - `offset` + `amplitude` * sin(2 * pi * t / `period`)
+          (`period` must be positive)
+        * ``ramp`` - adds `step`, restarting at `min` after `max` is
+          exceeded
+        * ``toggle`` - alternates between `min` and `max`
+        * ``counter`` - adds `step`
+
+    Raises:
+        ValueError
+
+    """
+
+    def __init__(self,
+                 conf: json.Data,
+                 rand: typing.Optional[random.Random] = None):
+        if not isinstance(conf, dict) or conf.get('type') not in \
+                generator_defaults:
+            raise ValueError('invalid generator type')
+
+        self._type = conf['type']
+        self._rand = rand or random.Random()
+        self._params = dict(generator_defaults[self._type])
+        for k in self._params.keys():
+            v = conf.get(k, self._params[k])
+            if (not isinstance(v, (int, float)) or isinstance(v, bool) or
+                    not math.isfinite(v)):
+                raise ValueError(f'invalid generator parameter {k}')
+            self._params[k] = v
+
+        if self._params['interval'] <= 0:
+            raise ValueError('invalid generator interval')
+
+        if self._type == 'sine' and self._params['period'] <= 0:
+            raise ValueError('invalid generator period')
+
+        if 'min' in self._params and self._params['min'] > self._params['max']:
+            raise ValueError('invalid generator range')
+
+    @property
+    def conf(self) -> json.Data:
+        """Generator configuration with all parameters"""
+        return {'type': self._type, **self._params}
+
+    @property
+    def interval(self) -> float:
+        """Interval between two consecutive values (in seconds)"""
+        return self._params['interval']
+
+    def generate(self,
+                 value: float,
+                 t: float
+                 ) -> float:
+        """Generate new value based on current value and time
+
+        Argument `t` is used only by time dependent generators (``sine``)
+        and should represent wall clock time in seconds.
+
+        """
+        params = self._params
+
+        if self._type == 'random_walk':
+            step = self._rand.uniform(-params['step'], params['step'])
+            return min(max(value + step, params['min']), params['max'])
+
+        if self._type == 'sine':
+            phase = 2 * math.pi * t / params['period']
+            return params['offset'] + params['amplitude'] * math.sin(phase)
+
+        if self._type == 'ramp':
+            value = value + params['step']
+            if value > params['max']:
+                return params['min']
+            if value < params['min']:
+                return params['max']
+            return value
+
+        if self._type == 'toggle':
+            return params['min'] if value == params['max'] else params['max']
+
+        if self._type == 'counter':
+            return value + params['step']
+
+        raise ValueError('unsupported generator type')
+
+
+class GeneratorScheduler:
+    """Generator scheduler
+
+    Generators are identified with arbitrary hashable keys. Generator is due
+    at each multiple of its interval (based on monotonic clock), so all
+    generators with same interval are due at the same time and can be
+    processed as single batch.
+
+    """
+
+    def __init__(self):
+        self._generators = {}
+        self._queue = []
+        self._next_counts = itertools.count()
+        self._changed = asyncio.Event()
+
+    @property
+    def generators(self) -> typing.Dict[typing.Hashable, Generator]:
+        """Scheduled generators"""
+        return self._generators
+
+    def set(self,
+            key: typing.Hashable,
+            generator: typing.Optional[Generator]):
+        """Add, replace or remove (if `generator` is ``None``) generator"""
+        if generator is None:
+            self._generators.pop(key, None)
+            return
+
+        self._generators[key] = generator
+        self._push(key, generator, time.monotonic())
+        self._changed.set()
+
+    def clear(self):
+        """Remove all generators"""
+        self._generators = {}
+        self._queue = []
+
+    async def get_due(self) -> typing.List[typing.Tuple[typing.Hashable,
+                                                        Generator]]:
+        """Wait for and get all due generators"""
+        while True:
+            now = time.monotonic()
+            due = collections.deque()
+            while self._queue and self._queue[0][0] <= now:
+                _, _, key, generator = heapq.heappop(self._queue)
+                if self._generators.get(key) is not generator:
+                    continue
+
+                due.append((key, generator))
+                self._push(key, generator, now)
+
+            if due:
+                return list(due)
+
+            self._changed.clear()
+            if not self._queue:
+                await self._changed.wait()
+                continue
+
+            with contextlib.suppress(asyncio.TimeoutError):
+                await aio.wait_for(self._changed.wait(),
+                                   self._queue[0][0] - now)
+
+    def _push(self, key, generator, now):
+        t = (math.floor(now / generator.interval) + 1) * generator.interval
+        heapq.heappush(self._queue, (t, next(self._next_counts), key,
+                                     generator))
+
+
+class PeriodicStats:
+    """Periodic job statistics
+
+    Derived classes can extend statistics by overriding `reset`, `add_*`
+    methods and `to_json`.
+
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Reset statistics"""
+        self.count = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.overruns = 0
+        self.last_result = None
+
+    def add_start(self, jitter: float, cycle: typing.Optional[float]):
+        """Add execution start
+
+        `jitter` is deviation from scheduled start time and `cycle` is time
+        elapsed since previous execution start (``None`` for first
+        execution).
+
+        """
+
+    def add_result(self, duration: float, result: typing.Any):
+        """Add successful execution"""
+        self.count += 1
+        self.last_result = 'OK'
+
+    def add_failure(self, duration: float, e: Exception):
+        """Add execution resulting with exception"""
+        self.count += 1
+        self.failures += 1
+        self.last_result = f'ERROR ({e})'
+
+    def add_timeout(self, duration: float):
+        """Add timed out execution"""
+        self.count += 1
+        self.timeouts += 1
+        self.last_result = 'TIMEOUT'
+
+    def add_overruns(self, count: int):
+        """Add skipped cycles"""
+        self.overruns += count
+
+    def to_json(self) -> json.Data:
+        """Get JSON representation of current statistics"""
+        return {'count': self.count,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'overruns': self.overruns,
+                'last_result': self.last_result}
+
+
+class PeriodicJobs:
+    """Periodically executed jobs
+
+    Each job is identified with job identifier and runs in its own subgroup
+    of provided async group. Job is executed at multiples of its period
+    (fixed rate) - if execution lasts longer than period, missed cycles are
+    skipped and counted as overruns. Execution lasting longer than timeout
+    is counted as timeout and execution raising exception is counted as
+    failure, with exception of `ConnectionError` which stops job.
+
+    Statistics of each job are kept until job is removed (restarted job
+    continues with existing statistics) and can be published as
+    `stats_path` of `data`. If `metrics` is provided, same measurements are
+    available as metrics prefixed with `metrics_prefix` and labeled with
+    job's labels.
+
+    """
+
+    def __init__(self,
+                 data: DataStorage,
+                 stats_path: json.Path,
+                 logger: Logger,
+                 name: str,
+                 metrics: typing.Optional[Metrics] = None,
+                 metrics_prefix: str = ''):
+        self._data = data
+        self._stats_path = stats_path
+        self._logger = logger
+        self._name = name
+        self._metrics = metrics
+        self._metrics_prefix = metrics_prefix
+        self._subgroups = {}
+        self._stats = {}
+
+    @property
+    def job_ids(self) -> typing.List[typing.Hashable]:
+        """Identifiers of running jobs and jobs with statistics"""
+        return list({**self._stats, **self._subgroups}.keys())
+
+    def start(self,
+              async_group: aio.Group,
+              job_id: typing.Hashable,
+              period: float,
+              timeout: float,
+              fn: typing.Callable[[], typing.Awaitable],
+              stats_factory: typing.Callable[[], PeriodicStats
+                                             ] = PeriodicStats,
+              labels: typing.Dict[str, str] = {}):
+        """(Re)start job
+
+        Job's statistics are created with `stats_factory` only if job
+        doesn't have existing statistics.
+
+        """
+        self.stop(job_id)
+
+        stats = self._stats.get(job_id)
+        if stats is None:
+            stats = stats_factory()
+            self._stats[job_id] = stats
+
+        subgroup = async_group.create_subgroup()
+        subgroup.spawn(self._job_loop, job_id, period, timeout, fn, stats,
+                       labels)
+        self._subgroups[job_id] = subgroup
+
+    def stop(self, job_id: typing.Hashable):
+        """Stop job and keep its statistics"""
+        subgroup = self._subgroups.pop(job_id, None)
+        if subgroup:
+            subgroup.close()
+
+    def remove(self, job_id: typing.Hashable):
+        """Stop job and remove its statistics"""
+        self.stop(job_id)
+        self._stats.pop(job_id, None)
+
+    def reset_stats(self):
+        """Reset and publish statistics of all jobs"""
+        for stats in self._stats.values():
+            stats.reset()
+        self.update_stats()
+
+    def update_stats(self):
+        """Publish statistics of all jobs (if changed)"""
+        stats = {job_id: i.to_json() for job_id, i in self._stats.items()}
+        if stats != self._data.get(self._stats_path):
+            self._data.set(self._stats_path, stats)
+
+    async def stats_loop(self, interval: float):
+        """Periodically publish statistics"""
+        while True:
+            await asyncio.sleep(interval)
+            self.update_stats()
+
+    async def _job_loop(self, job_id, period, timeout, fn, stats, labels):
+        metrics = _PeriodicMetrics(self._metrics, self._metrics_prefix,
+                                   self._name, labels)
+
+        self._logger.log(f'starting {self._name} {job_id}')
+        scheduled = math.ceil(time.monotonic() / period) * period
+        last_start = None
+
+        try:
+            while True:
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                start = time.monotonic()
+                jitter = start - scheduled
+                cycle = start - last_start if last_start is not None else None
+                last_start = start
+                stats.add_start(jitter, cycle)
+                metrics.add_start(jitter, cycle)
+
+                try:
+                    result = await aio.wait_for(fn(), timeout)
+
+                except asyncio.TimeoutError:
+                    stats.add_timeout(time.monotonic() - start)
+                    metrics.timeouts.inc()
+
+                except ConnectionError:
+                    raise
+
+                except Exception as e:
+                    stats.add_failure(time.monotonic() - start, e)
+                    metrics.failures.inc()
+
+                else:
+                    stats.add_result(time.monotonic() - start, result)
+
+                metrics.duration.observe(time.monotonic() - start)
+
+                scheduled += period
+                now = time.monotonic()
+                if scheduled < now:
+                    skipped = math.ceil((now - scheduled) / period)
+                    stats.add_overruns(skipped)
+                    metrics.overruns.inc(skipped)
+                    scheduled += skipped * period
+
+        except ConnectionError:
+            self._logger.log(f'{self._name} {job_id} stopped - '
+                             f'connection closed')
+
+        finally:
+            self._logger.log(f'stopping {self._name} {job_id}')
+
+
+class LoadRunner(aio.Resource):
+    """Load mode resource
+
+    Load is generated by tasks spawned in runner's async group.
+
+    """
+
+    def __init__(self):
+        self._async_group = aio.Group()
+
+    @property
+    def async_group(self) -> aio.Group:
+        """Async group"""
+        return self._async_group
 
 
 class Device(abc.ABC):
@@ -158,3 +1035,481 @@ class Device(abc.ABC):
                       *args: json.Data
                       ) -> json.Data:
         """Execute action"""
+
+    @property
+    def metrics(self) -> typing.Optional[Metrics]:
+        """Device specific metrics"""
+        return None
+
+
+_missing = object()
+
+_metric_types = {Counter: 'counter',
+                 Gauge: 'gauge',
+                 Histogram: 'histogram'}
+
+_map_hamt_size = 32
+_map_max_pending = 1024
+_hamt_bits = 5
+_hamt_mask = (1 << _hamt_bits) - 1
+_hamt_hash_mask = (1 << 64) - 1
+_hamt_max_shift = 60
+
+
+class _PeriodicMetrics:
+
+    def __init__(self, metrics, prefix, name, labels):
+        metrics = metrics or Metrics()
+        self.cycle = metrics.histogram(
+            f'{prefix}_cycle_seconds', f'{name} cycle time', labels)
+        self.jitter = metrics.histogram(
+            f'{prefix}_jitter_seconds', f'{name} start time deviation',
+            labels)
+        self.duration = metrics.histogram(
+            f'{prefix}_duration_seconds', f'{name} duration', labels)
+        self.failures = metrics.counter(
+            f'{prefix}_failures_total', f'number of failed {name} cycles',
+            labels)
+        self.timeouts = metrics.counter(
+            f'{prefix}_timeouts_total', f'number of timed out {name} cycles',
+            labels)
+        self.overruns = metrics.counter(
+            f'{prefix}_overruns_total', f'number of skipped {name} cycles',
+            labels)
+
+    def add_start(self, jitter, cycle):
+        self.jitter.observe(jitter)
+        if cycle is not None:
+            self.cycle.observe(cycle)
+
+
+def _flatten_path(path):
+    if isinstance(path, list):
+        return [i for subpath in path for i in _flatten_path(subpath)]
+
+    return [path]
+
+
+def _node_to_json(node):
+    if isinstance(node, (_Map, _List)):
+        return node.to_json()
+
+    return node
+
+
+def _node_get(node, path, default):
+    for i in path:
+        if isinstance(i, str):
+            if isinstance(node, dict):
+                node = node.get(i, default)
+
+            elif isinstance(node, _Map):
+                node = node.get(i, default)
+
+            else:
+                return default
+
+        elif isinstance(i, int) and not isinstance(i, bool):
+            if isinstance(node, (list, _List)):
+                try:
+                    node = node[i]
+                except IndexError:
+                    return default
+
+            else:
+                return default
+
+        else:
+            raise ValueError('invalid path')
+
+        if node is default:
+            return default
+
+    return node
+
+
+def _node_set(node, path, value):
+    if not path:
+        return value
+
+    i, path = path[0], path[1:]
+
+    if isinstance(i, str):
+        if isinstance(node, dict):
+            node = _Map.from_dict(node)
+
+        elif not isinstance(node, _Map):
+            node = _Map.from_dict({})
+
+        child = node.get(i, None)
+
+    elif isinstance(i, int) and not isinstance(i, bool):
+        if isinstance(node, list):
+            node = _List.from_list(node)
+
+        elif not isinstance(node, _List):
+            node = _List.from_list([])
+
+        try:
+            child = node[i]
+        except IndexError:
+            child = None
+
+    else:
+        raise ValueError('invalid path')
+
+    return node.set(i, _node_set(child, path, value))
+
+
+def _node_remove(node, path):
+    if not path:
+        return None
+
+    i, path = path[0], path[1:]
+    child = _node_get(node, [i], _missing)
+    if child is _missing:
+        return node
+
+    if isinstance(node, dict):
+        node = _Map.from_dict(node)
+
+    elif isinstance(node, list):
+        node = _List.from_list(node)
+
+    if not path:
+        return node.remove(i)
+
+    new_child = _node_remove(child, path)
+    if new_child is child:
+        return node
+
+    return node.set(i, new_child)
+
+
+class _Map:
+    """Persistent JSON object
+
+    Objects with small number of entries are represented as plain
+    dictionaries copied on each modification. Larger objects are represented
+    as hash array mapped tries. Plain JSON representation of large object is
+    created by copying last created plain JSON representation and applying
+    only keys modified in the meantime.
+
+    """
+
+    __slots__ = ('_entries', '_hamt', '_json', '_base', '_pending')
+
+    def __init__(self, entries, hamt, json_data, base=None, pending=None):
+        self._entries = entries
+        self._hamt = hamt
+        self._json = json_data
+        self._base = base
+        self._pending = pending
+
+    @classmethod
+    def from_dict(cls, data):
+        if len(data) < _map_hamt_size:
+            return cls(data, None, data)
+
+        return cls(None, _hamt_from_dict(data), data)
+
+    def get(self, key, default):
+        if self._hamt is None:
+            return self._entries.get(key, default)
+
+        return _hamt_get(self._hamt, hash(key) & _hamt_hash_mask, key,
+                         default)
+
+    def set(self, key, value):
+        if self._hamt is None:
+            if self._entries.get(key, _missing) is value:
+                return self
+
+            entries = dict(self._entries)
+            entries[key] = value
+            if len(entries) < _map_hamt_size:
+                return _Map(entries, None, None)
+
+            return _Map(None, _hamt_from_dict(entries), None)
+
+        hamt = _hamt_set(self._hamt, 0, hash(key) & _hamt_hash_mask, key,
+                         value)
+        if hamt is self._hamt:
+            return self
+
+        return self._derive(hamt, key)
+
+    def remove(self, key):
+        if self._hamt is None:
+            if key not in self._entries:
+                return self
+
+            entries = dict(self._entries)
+            del entries[key]
+            return _Map(entries, None, None)
+
+        hamt = _hamt_remove(self._hamt, 0, hash(key) & _hamt_hash_mask, key)
+        if hamt is self._hamt:
+            return self
+
+        if hamt is None:
+            return _Map({}, None, None)
+
+        return self._derive(hamt, key)
+
+    def to_json(self):
+        if self._json is not None:
+            return self._json
+
+        if self._hamt is None:
+            self._json = {k: _node_to_json(v)
+                          for k, v in self._entries.items()}
+
+        elif self._base is None:
+            self._json = {k: _node_to_json(v)
+                          for k, v in _hamt_items(self._hamt)}
+
+        else:
+            self._json = dict(self._base)
+            keys = set()
+            pending = self._pending
+            while pending:
+                key, pending, _ = pending
+                if key in keys:
+                    continue
+                keys.add(key)
+
+                value = self.get(key, _missing)
+                if value is _missing:
+                    self._json.pop(key, None)
+                else:
+                    self._json[key] = _node_to_json(value)
+
+        self._base = None
+        self._pending = None
+        return self._json
+
+    def _derive(self, hamt, key):
+        if self._json is not None:
+            return _Map(None, hamt, None, self._json, (key, None, 1))
+
+        if self._base is None or self._pending[2] >= _map_max_pending:
+            return _Map(None, hamt, None)
+
+        pending = key, self._pending, self._pending[2] + 1
+        return _Map(None, hamt, None, self._base, pending)
+
+
+class _List:
+    """Persistent JSON array
+
+    Arrays are represented as plain lists copied on each modification.
+
+    """
+
+    __slots__ = ('_items', '_json')
+
+    def __init__(self, items, json_data):
+        self._items = items
+        self._json = json_data
+
+    @classmethod
+    def from_list(cls, data):
+        return cls(data, data)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def set(self, index, value):
+        items = self._items
+        if index >= len(items):
+            items = [*items, *itertools.repeat(None, index - len(items) + 1)]
+
+        elif index < 0 and (-index) > len(items):
+            items = [*itertools.repeat(None, (-index) - len(items)), *items]
+
+        elif items[index] is value:
+            return self
+
+        else:
+            items = list(items)
+
+        items[index] = value
+        return _List(items, None)
+
+    def remove(self, index):
+        items = list(self._items)
+        del items[index]
+        return _List(items, None)
+
+    def to_json(self):
+        if self._json is None:
+            self._json = [_node_to_json(i) for i in self._items]
+
+        return self._json
+
+
+class _HamtNode:
+    """Hash array mapped trie node
+
+    Entries are sorted by hash segment and are represented as ``(key,
+    value)`` tuples or child nodes. Nodes deeper than available hash bits
+    contain only ``(key, value)`` tuples with colliding hashes.
+
+    """
+
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+def _hamt_index(bitmap, bit):
+    return bin(bitmap & (bit - 1)).count('1')
+
+
+def _hamt_from_dict(data):
+    return _hamt_build(0, [(hash(k) & _hamt_hash_mask, k, v)
+                           for k, v in data.items()])
+
+
+def _hamt_build(shift, leaves):
+    if shift > _hamt_max_shift:
+        return _HamtNode(0, tuple((k, v) for _, k, v in leaves))
+
+    buckets = collections.defaultdict(list)
+    for leaf in leaves:
+        buckets[(leaf[0] >> shift) & _hamt_mask].append(leaf)
+
+    bitmap = 0
+    entries = collections.deque()
+    for i in sorted(buckets.keys()):
+        bucket = buckets[i]
+        bitmap |= 1 << i
+        if len(bucket) == 1:
+            entries.append(bucket[0][1:])
+        else:
+            entries.append(_hamt_build(shift + _hamt_bits, bucket))
+
+    return _HamtNode(bitmap, tuple(entries))
+
+
+def _hamt_get(node, h, key, default):
+    shift = 0
+    while shift <= _hamt_max_shift:
+        bit = 1 << ((h >> shift) & _hamt_mask)
+        if not node.bitmap & bit:
+            return default
+
+        entry = node.entries[_hamt_index(node.bitmap, bit)]
+        if type(entry) is tuple:
+            return entry[1] if entry[0] == key else default
+
+        node = entry
+        shift += _hamt_bits
+
+    for k, v in node.entries:
+        if k == key:
+            return v
+
+    return default
+
+
+def _hamt_set(node, shift, h, key, value):
+    if shift > _hamt_max_shift:
+        entries = tuple((k, v) for k, v in node.entries if k != key)
+        return _HamtNode(0, (*entries, (key, value)))
+
+    bit = 1 << ((h >> shift) & _hamt_mask)
+    index = _hamt_index(node.bitmap, bit)
+
+    if not node.bitmap & bit:
+        entries = (*node.entries[:index], (key, value),
+                   *node.entries[index:])
+        return _HamtNode(node.bitmap | bit, entries)
+
+    entry = node.entries[index]
+    if type(entry) is not tuple:
+        new_entry = _hamt_set(entry, shift + _hamt_bits, h, key, value)
+
+    elif entry[0] != key:
+        new_entry = _hamt_merge(shift + _hamt_bits,
+                                hash(entry[0]) & _hamt_hash_mask, entry,
+                                h, (key, value))
+
+    elif entry[1] is value:
+        return node
+
+    else:
+        new_entry = key, value
+
+    entries = (*node.entries[:index], new_entry, *node.entries[index + 1:])
+    return _HamtNode(node.bitmap, entries)
+
+
+def _hamt_merge(shift, h1, entry1, h2, entry2):
+    if shift > _hamt_max_shift:
+        return _HamtNode(0, (entry1, entry2))
+
+    i1 = (h1 >> shift) & _hamt_mask
+    i2 = (h2 >> shift) & _hamt_mask
+
+    if i1 == i2:
+        return _HamtNode(1 << i1, (_hamt_merge(shift + _hamt_bits,
+                                               h1, entry1, h2, entry2),))
+
+    entries = (entry1, entry2) if i1 < i2 else (entry2, entry1)
+    return _HamtNode((1 << i1) | (1 << i2), entries)
+
+
+def _hamt_remove(node, shift, h, key):
+    if shift > _hamt_max_shift:
+        entries = tuple((k, v) for k, v in node.entries if k != key)
+        if len(entries) == len(node.entries):
+            return node
+
+        return _HamtNode(0, entries) if entries else None
+
+    bit = 1 << ((h >> shift) & _hamt_mask)
+    if not node.bitmap & bit:
+        return node
+
+    index = _hamt_index(node.bitmap, bit)
+    entry = node.entries[index]
+
+    if type(entry) is tuple:
+        if entry[0] != key:
+            return node
+
+        new_entry = None
+
+    else:
+        new_entry = _hamt_remove(entry, shift + _hamt_bits, h, key)
+        if new_entry is entry:
+            return node
+
+        if (new_entry is not None and
+                len(new_entry.entries) == 1 and
+                type(new_entry.entries[0]) is tuple):
+            new_entry = new_entry.entries[0]
+
+    if new_entry is not None:
+        entries = (*node.entries[:index], new_entry,
+                   *node.entries[index + 1:])
+        return _HamtNode(node.bitmap, entries)
+
+    if len(node.entries) == 1:
+        return None
+
+    entries = (*node.entries[:index], *node.entries[index + 1:])
+    return _HamtNode(node.bitmap & ~bit, entries)
+
+
+def _hamt_items(node):
+    for entry in node.entries:
+        if type(entry) is tuple:
+            yield entry
+
+        else:
+            yield from _hamt_items(entry)
@@ -1,6 +1,5 @@
 import collections
 import io
-import itertools
 
 from hat import json
 from hat.manager import common
@@ -8,9 +7,8 @@ import hat.event.eventer_client
 import hat.event.common
 
 
-changes_size = 100
-
-default_conf = {'address': 'tcp+sbs://127.0.0.1:23012'}
+default_conf = {'address': 'tcp+sbs://127.0.0.1:23012',
+                'changes_size': 100}
 
 
 class Device(common.Device):
@@ -18,19 +16,33 @@ class Device(common.Device):
     def __init__(self, conf, logger):
         self._logger = logger
         self._client = None
-        self._data = common.DataStorage({'address': conf['address'],
-                                         'latest': [],
-                                         'changes': []})
+        self._data = common.DataStorage({
+            'address': conf['address'],
+            'changes_size': conf.get('changes_size',
+                                     default_conf['changes_size']),
+            'latest': {}})
+        self._changes = common.History(self._data, 'changes',
+                                       self._data.get('changes_size'))
+        self._metrics = common.Metrics()
+        self._received_events_counter = self._metrics.counter(
+            'received_events_total', 'number of received events')
+        self._registered_events_counter = self._metrics.counter(
+            'registered_events_total', 'number of registered events')
 
     @property
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
     def get_conf(self):
-        return {'address': self._data.data['address']}
+        return {'address': self._data.get('address'),
+                'changes_size': self._data.get('changes_size')}
 
     async def create(self):
-        address = self._data.data['address']
+        address = self._data.get('address')
         self._client = await hat.event.eventer_client.connect(
             address, [('*',)])
         self._client.async_group.spawn(self._client_loop, self._client)
@@ -40,6 +52,9 @@ class Device(common.Device):
         if action == 'set_address':
             return self._act_set_address(*args)
 
+        if action == 'set_changes_size':
+            return self._act_set_changes_size(*args)
+
         if action == 'register':
             return self._act_register(*args)
 
@@ -47,33 +62,23 @@ class Device(common.Device):
 
     async def _client_loop(self, client):
         try:
-            latest = []
-            changes = []
-            self._data.set([], dict(self._data.data,
-                                    latest=latest,
-                                    changes=changes))
+            with self._data.transaction():
+                self._data.set('latest', {})
+                self._changes.clear()
 
             events = await client.query(
                 hat.event.common.QueryData(unique_type=True))
             events = [_event_to_json(event) for event in events]
+            self._update_latest(events)
 
-            latest_cache = {}
             while True:
-                if events:
-                    for event in events:
-                        latest_cache[tuple(event['event_type'])] = event
-                    latest = list(latest_cache.values())
-
-                self._data.set([], dict(self._data.data,
-                                        latest=latest,
-                                        changes=changes))
-
                 events = await self._client.receive()
+                self._received_events_counter.inc(len(events))
                 events = [_event_to_json(event) for event in events]
 
-                changes = itertools.chain(reversed(events), changes)
-                changes = itertools.islice(changes, changes_size)
-                changes = list(changes)
+                with self._data.transaction():
+                    self._update_latest(events)
+                    self._changes.extend(events)
 
         except ConnectionError:
             pass
@@ -81,10 +86,21 @@ class Device(common.Device):
         finally:
             client.close()
 
+    def _update_latest(self, events):
+        with self._data.transaction():
+            for event in events:
+                key = json.encode(event['event_type'])
+                self._data.set(['latest', key], event)
+
     def _act_set_address(self, address):
         self._logger.log(f'changing address to {address}')
         self._data.set('address', address)
 
+    def _act_set_changes_size(self, changes_size):
+        self._logger.log(f'changing changes size to {changes_size}')
+        self._changes.resize(changes_size)
+        self._data.set('changes_size', self._changes.size)
+
     def _act_register(self, text, with_source_timestamp):
         source_timestamp = (hat.event.common.now() if with_source_timestamp
                             else None)
@@ -100,6 +116,7 @@ class Device(common.Device):
 
         self._logger.log(f'registering events (count: {len(events)})')
         self._client.register(events)
+        self._registered_events_counter.inc(len(events))
 
 
 def _event_to_json(event):
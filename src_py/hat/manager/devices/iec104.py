@@ -1,9 +1,16 @@
+from pathlib import Path
+import asyncio
 import collections
-import contextlib
+import csv
 import functools
+import io
 import itertools
+import random
 import time
+import typing
 
+from hat import aio
+from hat import json
 from hat import util
 from hat.drivers import iec104
 from hat.manager import common
@@ -15,7 +22,43 @@ default_master_conf = {'properties': {'host': '127.0.0.1',
                                       'supervisory_timeout': 10,
                                       'test_timeout': 20,
                                       'send_window_size': 12,
-                                      'receive_window_size': 8}}
+                                      'receive_window_size': 8,
+                                      'history_size': 100},
+                       'interrogations': [],
+                       'load': {'enabled': False,
+                                'connection_count': 10,
+                                'port_count': 1,
+                                'connect_concurrency': 50,
+                                'reconnect_delay': 1,
+                                'asdu': 0xFFFF,
+                                'interrogation_period': 10,
+                                'command': None,
+                                'command_period': 1,
+                                'timeout': 30}}
+
+interrogation_stats_interval: float = 1
+"""Interval (in seconds) between two consecutive interrogation statistics
+updates"""
+
+interrogation_count_buckets: typing.List[float] = [0, 1, 10, 100, 1000, 10000,
+                                                   100000]
+"""Histogram buckets used for number of interrogated objects"""
+
+point_rate_smoothing: float = 0.1
+"""Smoothing factor of exponentially weighted average of point update
+intervals used for calculation of point update rates"""
+
+load_stats_interval: float = 1
+"""Interval (in seconds) between two consecutive load statistics updates"""
+
+load_latency_samples: int = 10000
+"""Maximum number of latest latencies used for load statistics percentiles"""
+
+import_chunk_size = 1000
+"""Number of imported points applied to slave data in single change"""
+
+max_import_errors = 100
+"""Maximum number of invalid import rows reported in import result"""
 
 default_slave_conf = {'properties': {'host': '127.0.0.1',
                                      'port': 2404,
@@ -27,26 +70,65 @@ default_slave_conf = {'properties': {'host': '127.0.0.1',
                       'data': [],
                       'commands': []}
 
-master_data_size = 100
-
 
 class Master(common.Device):
 
     def __init__(self, conf, logger):
         self._logger = logger
         self._conn = None
-        self._data = common.DataStorage({'properties': conf['properties'],
-                                         'data': []})
+        self._next_interrogation_ids = (str(i) for i in itertools.count(1))
+        self._data = common.DataStorage({
+            'properties': common.with_defaults(
+                conf['properties'], default_master_conf['properties']),
+            'interrogations': {next(self._next_interrogation_ids): i
+                               for i in conf.get('interrogations', [])},
+            'interrogation_stats': {},
+            'load': common.with_defaults(conf.get('load'),
+                                         default_master_conf['load']),
+            'load_stats': None,
+            'points': {}})
+        self._point_intervals = {}
+        self._history = common.History(
+            self._data, 'data', self._data.get(['properties', 'history_size']))
+        self._data.register_changes_cb(self._on_changes)
+        self._metrics = common.Metrics()
+        self._interrogation_jobs = common.PeriodicJobs(
+            self._data, 'interrogation_stats', logger,
+            'periodic interrogation', self._metrics, 'periodic_interrogation')
+        self._received_data_counter = self._metrics.counter(
+            'received_data_total', 'number of received data')
+        self._sent_commands_counter = self._metrics.counter(
+            'sent_commands_total', 'number of sent commands')
+        self._interrogations_counters = {
+            name: self._metrics.counter('interrogations_total',
+                                        'number of sent interrogate requests',
+                                        {'type': name})
+            for name in _interrogation_types}
+        self._interrogation_duration_histograms = {
+            name: self._metrics.histogram('interrogation_duration_seconds',
+                                          'interrogate request duration',
+                                          {'type': name})
+            for name in _interrogation_types}
 
     @property
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
     def get_conf(self):
-        return {'properties': self._data.data['properties']}
+        return {'properties': self._data.get('properties'),
+                'interrogations': common.get_sorted_values(
+                    self._data.get('interrogations')),
+                'load': self._data.get('load')}
 
     async def create(self):
-        properties = self._data.data['properties']
+        if self._data.get(['load', 'enabled']):
+            return self._create_load()
+
+        properties = self._data.get('properties')
         self._conn = await iec104.connect(
             addr=iec104.Address(properties['host'],
                                 properties['port']),
@@ -56,6 +138,9 @@ class Master(common.Device):
             send_window_size=properties['send_window_size'],
             receive_window_size=properties['receive_window_size'])
         self._conn.async_group.spawn(self._connection_loop, self._conn)
+        self._conn.async_group.spawn(self._interrogation_jobs.stats_loop,
+                                     interrogation_stats_interval)
+        self._reset_interrogations()
         return self._conn
 
     async def execute(self, action, *args):
@@ -71,8 +156,199 @@ class Master(common.Device):
         if action == 'send_command':
             return await self._act_send_command(*args)
 
+        if action == 'add_interrogation':
+            return self._act_add_interrogation(*args)
+
+        if action == 'remove_interrogation':
+            return self._act_remove_interrogation(*args)
+
+        if action == 'change_interrogation':
+            return self._act_change_interrogation(*args)
+
+        if action == 'reset_interrogation_stats':
+            return self._act_reset_interrogation_stats(*args)
+
+        if action == 'change_load':
+            return self._act_change_load(*args)
+
+        if action == 'clear_points':
+            return self._act_clear_points(*args)
+
         raise ValueError('invalid action')
 
+    def _on_changes(self, changes):
+        for change in changes:
+            path = change.path
+            if not path or (path[0] == 'interrogations' and len(path) == 1):
+                self._reset_interrogations()
+
+            elif path[0] == 'interrogations':
+                self._update_interrogation(path[1])
+
+    def _reset_interrogations(self):
+        for interrogation_id in self._interrogation_jobs.job_ids:
+            self._update_interrogation(interrogation_id)
+
+        for interrogation_id in (self._data.get('interrogations') or
+                                 {}).keys():
+            self._update_interrogation(interrogation_id)
+
+    def _update_interrogation(self, interrogation_id):
+        interrogation = self._data.get(['interrogations', interrogation_id])
+        if interrogation is None:
+            self._interrogation_jobs.remove(interrogation_id)
+            return
+
+        self._interrogation_jobs.stop(interrogation_id)
+        if (not self._conn or
+                not self._conn.is_open or
+                not isinstance(interrogation, dict) or
+                not interrogation.get('enabled')):
+            return
+
+        try:
+            period = interrogation['period']
+            timeout = interrogation['timeout']
+            asdu = interrogation['asdu']
+            if interrogation['type'] == 'interrogate':
+                name = 'interrogate'
+                fn = functools.partial(self._conn.interrogate, asdu)
+
+            elif interrogation['type'] == 'counter_interrogate':
+                name = 'counter_interrogate'
+                freeze = iec104.FreezeCode[interrogation['freeze']]
+                fn = functools.partial(self._conn.counter_interrogate,
+                                       asdu, freeze)
+
+            else:
+                raise ValueError('invalid interrogation type')
+
+            if not (period > 0 and timeout > 0):
+                raise ValueError('invalid period or timeout')
+
+        except Exception as e:
+            self._logger.log(f'invalid interrogation {interrogation_id}: {e}')
+            return
+
+        labels = {'type': name, 'interrogation': interrogation_id}
+        count_histogram = self._metrics.histogram(
+            'interrogation_object_count', 'number of interrogated objects',
+            labels, interrogation_count_buckets)
+        self._interrogation_jobs.start(
+            self._conn.async_group, interrogation_id, period, timeout,
+            functools.partial(self._periodic_interrogate, count_histogram,
+                              name, fn),
+            _InterrogationStats, labels)
+
+    async def _periodic_interrogate(self, count_histogram, name, fn):
+        data = await self._interrogate(name, fn)
+        count_histogram.observe(len(data))
+        self._add_data(data)
+        return data
+
+    def _create_load(self):
+        properties = self._data.get('properties')
+        load = self._data.get('load')
+        command = (_cmd_from_json(load['command'])
+                   if load['command'] and load['command_period'] > 0
+                   else None)
+
+        connection_count = load['connection_count']
+        if (not isinstance(connection_count, int) or
+                isinstance(connection_count, bool) or
+                connection_count < 0):
+            raise ValueError('invalid connection count')
+
+        port_count = load['port_count']
+        if (not isinstance(port_count, int) or
+                isinstance(port_count, bool) or
+                port_count < 1):
+            raise ValueError('invalid port count')
+
+        if not load['connect_concurrency'] > 0:
+            raise ValueError('invalid connect concurrency')
+
+        stats = _LoadStats()
+        semaphore = asyncio.Semaphore(load['connect_concurrency'])
+        runner = common.LoadRunner()
+        runner.async_group.spawn(self._load_stats_loop, stats)
+
+        self._logger.log(f'starting load (connections: {connection_count})')
+        for i in range(connection_count):
+            addr = iec104.Address(properties['host'],
+                                  properties['port'] + i % port_count)
+            runner.async_group.spawn(self._load_connection_loop, stats,
+                                     semaphore, addr, command)
+
+        return runner
+
+    async def _load_connection_loop(self, stats, semaphore, addr, command):
+        properties = self._data.get('properties')
+        load = self._data.get('load')
+
+        while True:
+            try:
+                async with semaphore:
+                    conn = await iec104.connect(
+                        addr=addr,
+                        response_timeout=properties['response_timeout'],
+                        supervisory_timeout=properties['supervisory_timeout'],
+                        test_timeout=properties['test_timeout'],
+                        send_window_size=properties['send_window_size'],
+                        receive_window_size=properties['receive_window_size'])
+
+            except Exception:
+                stats.connect_failures += 1
+                await asyncio.sleep(load['reconnect_delay'])
+                continue
+
+            stats.connections += 1
+            stats.connects += 1
+            try:
+                conn.async_group.spawn(self._load_receive_loop, stats, conn)
+
+                if load['interrogation_period'] > 0:
+                    conn.async_group.spawn(
+                        _load_request_loop, stats.interrogations,
+                        load['interrogation_period'], load['timeout'],
+                        functools.partial(conn.interrogate, load['asdu']))
+
+                if command:
+                    conn.async_group.spawn(
+                        _load_request_loop, stats.commands,
+                        load['command_period'], load['timeout'],
+                        functools.partial(conn.send_command, command))
+
+                await conn.wait_closing()
+
+            finally:
+                stats.connections -= 1
+                await aio.uncancellable(conn.async_close())
+
+            await asyncio.sleep(load['reconnect_delay'])
+
+    async def _load_receive_loop(self, stats, conn):
+        try:
+            while True:
+                data = await conn.receive()
+                stats.received_asdus += 1
+                stats.received_data += len(data)
+
+        except ConnectionError:
+            pass
+
+        finally:
+            conn.close()
+
+    async def _load_stats_loop(self, stats):
+        try:
+            while True:
+                self._data.set('load_stats', stats.to_json())
+                await asyncio.sleep(load_stats_interval)
+
+        finally:
+            self._logger.log('stopping load')
+
     async def _connection_loop(self, conn):
         try:
             while True:
@@ -88,15 +364,57 @@ class Master(common.Device):
 
     def _act_set_property(self, path, value):
         self._logger.log(f'changing property {path} to {value}')
+        if path == 'history_size':
+            self._history.resize(value)
+            value = self._history.size
+
         self._data.set(['properties', path], value)
 
+    def _act_add_interrogation(self):
+        self._logger.log('creating new periodic interrogation')
+        interrogation_id = next(self._next_interrogation_ids)
+        self._data.set(['interrogations', interrogation_id], {
+            'type': 'interrogate',
+            'asdu': 0xFFFF,
+            'freeze': 'READ',
+            'period': 60,
+            'timeout': 30,
+            'enabled': False})
+        return interrogation_id
+
+    def _act_remove_interrogation(self, interrogation_id):
+        self._logger.log('removing periodic interrogation')
+        self._data.remove(['interrogations', interrogation_id])
+        self._interrogation_jobs.update_stats()
+
+    def _act_change_interrogation(self, interrogation_id, path, value):
+        if self._data.get(['interrogations', interrogation_id]) is None:
+            raise ValueError('invalid interrogation id')
+
+        self._logger.log(f'changing periodic interrogation {path} to {value}')
+        self._data.set(['interrogations', interrogation_id, path], value)
+
+    def _act_reset_interrogation_stats(self):
+        self._logger.log('resetting interrogation statistics')
+        self._interrogation_jobs.reset_stats()
+
+    def _act_clear_points(self):
+        self._logger.log('clearing current values')
+        self._point_intervals = {}
+        self._data.set('points', {})
+
+    def _act_change_load(self, path, value):
+        self._logger.log(f'changing load {path} to {value}')
+        self._data.set(['load', path], value)
+
     async def _act_interrogate(self, asdu):
         if not self._conn or not self._conn.is_open:
             self._logger.log('interrogate failed - not connected')
             return
 
         self._logger.log(f'sending interrogate (asdu: {asdu})')
-        data = await self._conn.interrogate(asdu)
+        data = await self._interrogate('interrogate',
+                                       self._conn.interrogate, asdu)
         self._logger.log(f'received interrogate result (count: {len(data)})')
         self._add_data(data)
 
@@ -107,7 +425,9 @@ class Master(common.Device):
 
         self._logger.log(f'sending counter interrogate (asdu: {asdu})')
         freeze = iec104.FreezeCode[freeze]
-        data = await self._conn.counter_interrogate(asdu, freeze)
+        data = await self._interrogate('counter_interrogate',
+                                       self._conn.counter_interrogate,
+                                       asdu, freeze)
         self._logger.log(f'received counter interrogate result '
                          f'(count: {len(data)})')
         self._add_data(data)
@@ -119,19 +439,164 @@ class Master(common.Device):
 
         self._logger.log('sending command')
         cmd = _cmd_from_json(cmd)
+        self._sent_commands_counter.inc()
         result = await self._conn.send_command(cmd)
         self._logger.log(f'received command result (success: {result})')
         return result
 
+    async def _interrogate(self, name, fn, *args):
+        self._interrogations_counters[name].inc()
+        start = time.monotonic()
+        result = await fn(*args)
+        self._interrogation_duration_histograms[name].observe(
+            time.monotonic() - start)
+        return result
+
     def _add_data(self, data):
-        if not data:
-            return
+        self._received_data_counter.inc(len(data))
         now = time.time()
-        data = itertools.chain((dict(_data_to_json(i), timestamp=now)
-                                for i in reversed(data)),
-                               self._data.data['data'])
-        data = itertools.islice(data, master_data_size)
-        self._data.set('data', list(data))
+        monotonic = time.monotonic()
+        entries = [dict(_data_to_json(i), timestamp=now) for i in data]
+
+        with self._data.transaction():
+            self._history.extend(entries)
+            for entry in entries:
+                self._update_point(entry, monotonic)
+
+    def _update_point(self, entry, monotonic):
+        key = f"{entry['asdu']}:{entry['io']}"
+        point = self._data.get(['points', key])
+        updates = point['updates'] + 1 if point else 1
+        rate = None
+
+        last_monotonic, last_interval = self._point_intervals.get(
+            key, (None, None))
+        interval = (monotonic - last_monotonic
+                    if last_monotonic is not None else None)
+        if interval is not None and last_interval is not None:
+            interval = (point_rate_smoothing * interval +
+                        (1 - point_rate_smoothing) * last_interval)
+        self._point_intervals[key] = monotonic, interval
+
+        if interval:
+            rate = 1 / interval
+
+        self._data.set(['points', key], dict(entry,
+                                             updates=updates,
+                                             rate=rate))
+
+
+class _InterrogationStats(common.PeriodicStats):
+
+    def reset(self):
+        super().reset()
+        self._duration = common.Histogram()
+        self._object_count = common.Histogram(interrogation_count_buckets)
+
+    def add_result(self, duration, data):
+        self.count += 1
+        self.last_result = f'OK (count: {len(data)})'
+        self._duration.observe(duration)
+        self._object_count.observe(len(data))
+
+    def add_failure(self, duration, e):
+        super().add_failure(duration, e)
+        self._duration.observe(duration)
+
+    def add_timeout(self, duration):
+        super().add_timeout(duration)
+        self._duration.observe(duration)
+
+    def to_json(self):
+        return {**super().to_json(),
+                'duration': self._duration.to_json(),
+                'object_count': self._object_count.to_json()}
+
+
+class _LoadStats:
+
+    def __init__(self):
+        self.connections = 0
+        self.connects = 0
+        self.connect_failures = 0
+        self.received_asdus = 0
+        self.received_data = 0
+        self.interrogations = _LoadRequestStats()
+        self.commands = _LoadRequestStats()
+        self._last_time = time.monotonic()
+        self._last_received_asdus = 0
+        self._last_received_data = 0
+
+    def to_json(self):
+        now = time.monotonic()
+        dt = (now - self._last_time) or 1
+        result = {
+            'connections': self.connections,
+            'connects': self.connects,
+            'connect_failures': self.connect_failures,
+            'received_asdus': self.received_asdus,
+            'received_asdus_rate': (self.received_asdus -
+                                    self._last_received_asdus) / dt,
+            'received_data': self.received_data,
+            'received_data_rate': (self.received_data -
+                                   self._last_received_data) / dt,
+            'interrogations': self.interrogations.to_json(dt),
+            'commands': self.commands.to_json(dt)}
+
+        self._last_time = now
+        self._last_received_asdus = self.received_asdus
+        self._last_received_data = self.received_data
+        return result
+
+
+class _LoadRequestStats:
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.latencies = common.Latencies(load_latency_samples)
+        self._last_count = 0
+
+    def to_json(self, dt):
+        result = {'count': self.count,
+                  'failures': self.failures,
+                  'timeouts': self.timeouts,
+                  'rate': (self.count - self._last_count) / dt,
+                  'latency': self.latencies.to_json()}
+
+        self._last_count = self.count
+        return result
+
+
+async def _load_request_loop(stats, period, timeout, fn):
+    scheduled = time.monotonic() + random.uniform(0, period)
+
+    while True:
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        start = time.monotonic()
+        stats.count += 1
+        try:
+            result = await aio.wait_for(fn(), timeout)
+
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+
+        except ConnectionError:
+            break
+
+        except Exception:
+            stats.failures += 1
+
+        else:
+            if result is False:
+                stats.failures += 1
+            stats.latencies.add(time.monotonic() - start)
+
+        scheduled = max(scheduled + period, time.monotonic())
 
 
 class Slave(common.Device):
@@ -148,22 +613,53 @@ class Slave(common.Device):
                      for i in conf['data']},
             'commands': {next(self._next_command_ids): dict(i, value=None)
                          for i in conf['commands']}})
+        self._data_index = _Index(_get_data_key)
+        self._command_index = _Index(_get_command_key)
+        self._data_cache = {}
+        self._interrogate_data_cache = {}
+        self._invalid_data_ids = set()
+        self._generators = common.GeneratorScheduler()
+        self._executor = aio.create_executor(1)
+        self._data_index.reset(self._data.get('data'))
+        self._command_index.reset(self._data.get('commands'))
+        self._reset_generators()
+        self._data.register_changes_cb(self._on_changes)
+        self._metrics = common.Metrics()
+        self._connections_gauge = self._metrics.gauge(
+            'connections', 'number of active connections')
+        self._received_commands_counter = self._metrics.counter(
+            'received_commands_total', 'number of received commands')
+        self._sent_data_counter = self._metrics.counter(
+            'sent_data_total', 'number of sent data')
+        self._generated_data_counter = self._metrics.counter(
+            'generated_data_total', 'number of generated data changes')
+        self._interrogations_counters = {
+            name: self._metrics.counter(
+                'interrogations_total',
+                'number of received interrogate requests',
+                {'type': name})
+            for name in _interrogation_types}
 
     @property
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
     def get_conf(self):
-        return {'properties': self._data.data['properties'],
-                'data': list(self._data.data['data'].values()),
+        commands = common.get_sorted_values(self._data.get('commands'))
+        return {'properties': self._data.get('properties'),
+                'data': common.get_sorted_values(self._data.get('data')),
                 'commands': [{'type': i['type'],
                               'asdu': i['asdu'],
                               'io': i['io'],
                               'success': i['success']}
-                             for i in self._data.data['commands'].values()]}
+                             for i in commands]}
 
     async def create(self):
-        properties = self._data.data['properties']
+        properties = self._data.get('properties')
         srv = await iec104.listen(
             connection_cb=self._connection_loop,
             addr=iec104.Address(properties['host'],
@@ -176,6 +672,7 @@ class Slave(common.Device):
             test_timeout=properties['test_timeout'],
             send_window_size=properties['send_window_size'],
             receive_window_size=properties['receive_window_size'])
+        srv.async_group.spawn(self._generator_loop)
         return srv
 
     async def execute(self, action, *args):
@@ -194,6 +691,9 @@ class Slave(common.Device):
         if action == 'notify_data':
             return self._act_notify_data(*args)
 
+        if action == 'set_generator':
+            return self._act_set_generator(*args)
+
         if action == 'add_command':
             return self._act_add_command(*args)
 
@@ -203,13 +703,20 @@ class Slave(common.Device):
         if action == 'change_command':
             return self._act_change_command(*args)
 
+        if action == 'import_points':
+            return await self._act_import_points(*args)
+
+        if action == 'import_points_file':
+            return await self._act_import_points_file(*args)
+
         raise ValueError('invalid action')
 
     async def _connection_loop(self, conn):
         try:
             self._logger.log('new connection accepted')
+            self._connections_gauge.inc()
             self._data.set('connection_count',
-                           self._data.data['connection_count'] + 1)
+                           self._data.get('connection_count') + 1)
             notify_cb = functools.partial(self._on_data_notify, conn)
             with self._data_notify_cbs.register(notify_cb):
                 while True:
@@ -221,58 +728,166 @@ class Slave(common.Device):
         finally:
             conn.close()
             self._logger.log('connection closed')
+            self._connections_gauge.dec()
             self._data.set('connection_count',
-                           self._data.data['connection_count'] - 1)
+                           self._data.get('connection_count') - 1)
+
+    def _on_changes(self, changes):
+        for change in changes:
+            path = change.path
+            if not path:
+                self._data_index.reset(self._data.get('data'))
+                self._command_index.reset(self._data.get('commands'))
+                self._clear_data_cache()
+                self._reset_generators()
+
+            elif path[0] == 'data':
+                if len(path) == 1:
+                    self._data_index.reset(self._data.get('data'))
+                    self._clear_data_cache()
+                    self._reset_generators()
+                    continue
+
+                if len(path) == 2 or path[2] == 'generator':
+                    self._update_generator(path[1])
+
+                if len(path) == 2 or path[2] in _data_key_fields:
+                    self._data_index.update(
+                        path[1], self._data.get(['data', path[1]]))
+
+                self._data_cache.pop(path[1], None)
+                self._interrogate_data_cache.pop(path[1], None)
+                self._invalid_data_ids.discard(path[1])
+
+            elif path[0] == 'commands':
+                if len(path) == 1:
+                    self._command_index.reset(self._data.get('commands'))
+
+                elif len(path) == 2 or path[2] in _command_key_fields:
+                    self._command_index.update(
+                        path[1], self._data.get(['commands', path[1]]))
 
     def _on_interrogate(self, conn, asdu):
         self._logger.log(f'received interrogate request (asdu: {asdu})')
-        result = collections.deque()
-        for i in self._data.data['data'].values():
-            if i['type'] == 'BinaryCounter':
-                continue
-            if asdu != 0xFFFF and asdu != i['asdu']:
-                continue
-            with contextlib.suppress(Exception):
-                data = _data_from_json(i)
-                data = data._replace(cause=iec104.Cause.INTERROGATED_STATION)
-                result.append(data)
-        return list(result)
+        self._interrogations_counters['interrogate'].inc()
+        return self._get_interrogate_data(
+            False, asdu, iec104.Cause.INTERROGATED_STATION)
 
     def _on_counter_interrogate(self, conn, asdu, freeze):
         self._logger.log(f'received counter interrogate request '
                          f'(asdu: {asdu})')
-        result = collections.deque()
-        for i in self._data.data['data'].values():
-            if i['type'] != 'BinaryCounter':
-                continue
-            if asdu != 0xFFFF and asdu != i['asdu']:
-                continue
-            with contextlib.suppress(Exception):
-                data = _data_from_json(i)
-                data = data._replace(cause=iec104.Cause.INTERROGATED_COUNTER)
-                result.append(data)
-        return list(result)
+        self._interrogations_counters['counter_interrogate'].inc()
+        return self._get_interrogate_data(
+            True, asdu, iec104.Cause.INTERROGATED_COUNTER)
 
     def _on_command(self, conn, cmds):
         self._logger.log(f'received commands {cmds}')
+        self._received_commands_counter.inc(len(cmds))
         success = True
-        for cmd in cmds:
-            value = _value_to_json(cmd.value)
-            key = util.first(value.keys()), cmd.asdu_address, cmd.io_address
-            command_id, command = util.first(
-                self._data.data['commands'].items(),
-                lambda i: (i[1]['type'], i[1]['asdu'], i[1]['io']) == key,
-                (None, None))
-            cmd_success = bool(command['success']) if command else False
-            if cmd_success:
-                self._data.set(['commands', command_id, 'value'], value)
-            else:
-                success = False
+        with self._data.transaction():
+            for cmd in cmds:
+                value = _value_to_json(cmd.value)
+                key = (util.first(value.keys()), cmd.asdu_address,
+                       cmd.io_address)
+                command_id = util.first(self._command_index.get(key))
+                command = (self._data.get(['commands', command_id])
+                           if command_id is not None else None)
+                cmd_success = bool(command['success']) if command else False
+                if cmd_success:
+                    self._data.set(['commands', command_id, 'value'], value)
+                else:
+                    success = False
         self._logger.log(f'sending commands success {success}')
         return success
 
+    def _get_interrogate_data(self, is_counter, asdu, cause):
+        if asdu == 0xFFFF:
+            keys = [key for key in self._data_index.keys()
+                    if key[0] == is_counter]
+        else:
+            keys = [(is_counter, asdu)]
+
+        result = collections.deque()
+        for key in keys:
+            for data_id in self._data_index.get(key):
+                data = self._interrogate_data_cache.get(data_id)
+                if data is None:
+                    data = self._get_data(data_id)
+                    if data is None:
+                        continue
+                    data = data._replace(cause=cause)
+                    self._interrogate_data_cache[data_id] = data
+                result.append(data)
+        self._sent_data_counter.inc(len(result))
+        return list(result)
+
+    def _get_data(self, data_id):
+        data = self._data_cache.get(data_id)
+        if data is not None or data_id in self._invalid_data_ids:
+            return data
+
+        try:
+            data = _data_from_json(self._data.get(['data', data_id]))
+        except Exception:
+            self._invalid_data_ids.add(data_id)
+            return
+
+        self._data_cache[data_id] = data
+        return data
+
+    def _clear_data_cache(self):
+        self._data_cache = {}
+        self._interrogate_data_cache = {}
+        self._invalid_data_ids = set()
+
     def _on_data_notify(self, conn, data):
-        conn.notify_data_change([data])
+        conn.notify_data_change(data)
+        self._sent_data_counter.inc(len(data))
+
+    async def _generator_loop(self):
+        while True:
+            due = await self._generators.get_due()
+            self._generate(due)
+
+    def _generate(self, due):
+        now = time.time()
+        data_ids = collections.deque()
+        with self._data.transaction():
+            for data_id, generator in due:
+                data = self._data.get(['data', data_id])
+                try:
+                    value = _generate_value(generator, data['type'],
+                                            data['value'][data['type']], now)
+                except Exception:
+                    continue
+
+                self._data.set(['data', data_id, 'value', data['type']],
+                               value)
+                data_ids.append(data_id)
+
+        data = collections.deque()
+        for data_id in data_ids:
+            i = self._get_data(data_id)
+            if i is not None:
+                data.append(i._replace(cause=iec104.Cause.SPONTANEOUS))
+
+        self._generated_data_counter.inc(len(data_ids))
+        if data:
+            self._data_notify_cbs.notify(list(data))
+
+    def _reset_generators(self):
+        self._generators.clear()
+        for data_id in (self._data.get('data') or {}).keys():
+            self._update_generator(data_id)
+
+    def _update_generator(self, data_id):
+        data = self._data.get(['data', data_id])
+        conf = data.get('generator') if isinstance(data, dict) else None
+        try:
+            generator = common.Generator(conf) if conf else None
+        except ValueError:
+            generator = None
+        self._generators.set(data_id, generator)
 
     def _act_set_property(self, path, value):
         self._logger.log(f'changing property {path} to {value}')
@@ -285,27 +900,12 @@ class Slave(common.Device):
             'type': 'Single',
             'asdu': None,
             'io': None,
-            'value': {'Single': 'OFF',
-                      'Double': 'OFF',
-                      'StepPosition': {'value': 0,
-                                       'transient': False},
-                      'Bitstring': '00 00 00 00',
-                      'Normalized': 0,
-                      'Scaled': 0,
-                      'Floating': 0,
-                      'BinaryCounter': {'value': 0,
-                                        'sequence': 0,
-                                        'overflow': False,
-                                        'adjusted': False,
-                                        'invalid': False}},
-            'quality': {'invalid': False,
-                        'not_topical': False,
-                        'substituted': False,
-                        'blocked': False,
-                        'overflow': False},
+            'value': _default_data_value,
+            'quality': _default_quality,
             'time': None,
             'cause': 'UNDEFINED',
-            'is_test': False})
+            'is_test': False,
+            'generator': None})
         return data_id
 
     def _act_remove_data(self, data_id):
@@ -317,12 +917,21 @@ class Slave(common.Device):
         self._data.set(['data', data_id, path], value)
 
     def _act_notify_data(self, data_id):
-        try:
-            data = _data_from_json(self._data.data['data'][data_id])
-        except Exception:
+        data = self._get_data(data_id)
+        if data is None:
             return
         self._logger.log('notifying data change')
-        self._data_notify_cbs.notify(data)
+        self._data_notify_cbs.notify([data])
+
+    def _act_set_generator(self, data_id, generator):
+        if self._data.get(['data', data_id]) is None:
+            raise ValueError('invalid data id')
+
+        if generator is not None:
+            generator = common.Generator(generator).conf
+
+        self._logger.log(f'changing data generator to {generator}')
+        self._data.set(['data', data_id, 'generator'], generator)
 
     def _act_add_command(self):
         self._logger.log('creating new command')
@@ -331,12 +940,7 @@ class Slave(common.Device):
             'type': 'Single',
             'asdu': None,
             'io': None,
-            'value': {'Single': 'OFF',
-                      'Double': 'OFF',
-                      'Regulating': 'LOWER',
-                      'Normalized': 0,
-                      'Scaled': 0,
-                      'Floating': 0},
+            'value': _default_command_value,
             'success': True})
         return command_id
 
@@ -348,6 +952,153 @@ class Slave(common.Device):
         self._logger.log(f'changing command {path} to {value}')
         self._data.set(['commands', command_id, path], value)
 
+    async def _act_import_points(self, text, file_format):
+        self._logger.log(f'importing points (format: {file_format})')
+        rows = _get_import_rows(io.StringIO(text), file_format)
+        return await self._import_points(
+            file_format, functools.partial(_get_import_chunk, rows))
+
+    async def _act_import_points_file(self, path, file_format=None):
+        path = Path(path)
+        if file_format is None:
+            file_format = 'csv' if path.suffix.lower() == '.csv' else 'jsonl'
+
+        self._logger.log(f'importing points from {path} '
+                         f'(format: {file_format})')
+        f = await self._executor(open, path, 'r', encoding='utf-8',
+                                 newline='')
+        try:
+            rows = _get_import_rows(f, file_format)
+            return await self._import_points(
+                file_format,
+                functools.partial(self._executor, _get_import_chunk, rows))
+
+        finally:
+            await aio.uncancellable(self._executor(f.close))
+
+    async def _import_points(self, file_format, get_chunk):
+        if file_format not in ('csv', 'jsonl'):
+            raise ValueError('unsupported file format')
+
+        result = {'data': 0,
+                  'commands': 0,
+                  'errors': []}
+
+        while True:
+            chunk = await aio.call(get_chunk)
+            if not chunk:
+                break
+
+            with self._data.transaction():
+                for line, row in chunk:
+                    try:
+                        kind, entry = _import_entry_from_row(file_format,
+                                                             row)
+
+                    except Exception as e:
+                        if len(result['errors']) < max_import_errors:
+                            result['errors'].append({'line': line,
+                                                     'error': str(e)})
+                        continue
+
+                    if kind == 'data':
+                        data_id = next(self._next_data_ids)
+                        self._data.set(['data', data_id], entry)
+                        result['data'] += 1
+
+                    else:
+                        command_id = next(self._next_command_ids)
+                        self._data.set(['commands', command_id], entry)
+                        result['commands'] += 1
+
+            await asyncio.sleep(0)
+
+        self._logger.log(f"imported points (data: {result['data']}; "
+                         f"commands: {result['commands']}; "
+                         f"errors: {len(result['errors'])})")
+        return result
+
+
+_default_data_value = {'Single': 'OFF',
+                       'Double': 'OFF',
+                       'StepPosition': {'value': 0,
+                                        'transient': False},
+                       'Bitstring': '00 00 00 00',
+                       'Normalized': 0,
+                       'Scaled': 0,
+                       'Floating': 0,
+                       'BinaryCounter': {'value': 0,
+                                         'sequence': 0,
+                                         'overflow': False,
+                                         'adjusted': False,
+                                         'invalid': False}}
+
+_default_command_value = {'Single': 'OFF',
+                          'Double': 'OFF',
+                          'Regulating': 'LOWER',
+                          'Normalized': 0,
+                          'Scaled': 0,
+                          'Floating': 0}
+
+_default_quality = {'invalid': False,
+                    'not_topical': False,
+                    'substituted': False,
+                    'blocked': False,
+                    'overflow': False}
+
+_data_key_fields = {'type', 'asdu', 'io'}
+
+_command_key_fields = {'type', 'asdu', 'io'}
+
+_interrogation_types = ['interrogate', 'counter_interrogate']
+
+
+class _Index:
+
+    def __init__(self, key_fn):
+        self._key_fn = key_fn
+        self._keys = {}
+        self._ids = {}
+
+    def keys(self):
+        return self._ids.keys()
+
+    def get(self, key):
+        return self._ids.get(key, {}).keys()
+
+    def reset(self, items):
+        self._keys = {}
+        self._ids = {}
+        for item_id, item in (items or {}).items():
+            self.update(item_id, item)
+
+    def update(self, item_id, item):
+        key = self._keys.pop(item_id, None)
+        if key is not None:
+            ids = self._ids[key]
+            del ids[item_id]
+            if not ids:
+                del self._ids[key]
+
+        key = self._key_fn(item) if isinstance(item, dict) else None
+        if key is None:
+            return
+
+        self._keys[item_id] = key
+        self._ids.setdefault(key, {})[item_id] = None
+
+
+def _get_data_key(data):
+    if data.get('asdu') is None or data.get('io') is None:
+        return
+    return data.get('type') == 'BinaryCounter', data['asdu']
+
+
+def _get_command_key(command):
+    if command.get('asdu') is None or command.get('io') is None:
+        return
+    return command.get('type'), command['asdu'], command['io']
+
 
 def _data_to_json(data):
     value = _value_to_json(data.value)
@@ -449,3 +1200,134 @@ def _value_from_json(data_type, value):
         return iec104.BinaryCounterValue(**value['BinaryCounter'])
 
     raise ValueError('unsupported data type')
+
+
+def _get_import_rows(reader, file_format):
+    if file_format == 'csv':
+        rows = csv.DictReader(reader)
+        for row in rows:
+            yield rows.line_num, row
+
+    elif file_format == 'jsonl':
+        for line, row in enumerate(reader, 1):
+            if row.strip():
+                yield line, row
+
+    else:
+        raise ValueError('unsupported file format')
+
+
+def _get_import_chunk(rows):
+    return list(itertools.islice(rows, import_chunk_size))
+
+
+def _import_entry_from_row(file_format, row):
+    if file_format == 'csv':
+        row = {k.strip(): _parse_csv_cell(v) for k, v in row.items()
+               if k is not None and v is not None and v.strip()}
+        if isinstance(row.get('quality'), str):
+            row['quality'] = row['quality'].split('|')
+
+    else:
+        row = json.decode(row)
+        if not isinstance(row, dict):
+            raise ValueError('invalid row')
+
+    kind = row.get('kind', 'data')
+    if kind not in ('data', 'command'):
+        raise ValueError('invalid kind')
+
+    data_type = row.get('type')
+    if data_type not in (_default_data_value if kind == 'data'
+                         else _default_command_value):
+        raise ValueError('invalid type')
+
+    asdu = row.get('asdu')
+    if (not isinstance(asdu, int) or isinstance(asdu, bool) or
+            not (0 <= asdu <= 0xFFFF)):
+        raise ValueError('invalid asdu')
+
+    io_address = row.get('io')
+    if (not isinstance(io_address, int) or isinstance(io_address, bool) or
+            not (0 <= io_address <= 0xFFFFFF)):
+        raise ValueError('invalid io')
+
+    value = {data_type: row['value']} if 'value' in row else {}
+    value = dict(_default_data_value if kind == 'data'
+                 else _default_command_value, **value)
+    _value_from_json(data_type, value)
+
+    if kind == 'command':
+        success = row.get('success', True)
+        if not isinstance(success, bool):
+            raise ValueError('invalid success')
+
+        return kind, {'type': data_type,
+                      'asdu': asdu,
+                      'io': io_address,
+                      'value': value,
+                      'success': success}
+
+    quality = row.get('quality')
+    if quality is None:
+        quality = _default_quality
+
+    elif isinstance(quality, list):
+        if not set(quality).issubset(_default_quality.keys()):
+            raise ValueError('invalid quality')
+        quality = {k: k in quality for k in _default_quality.keys()}
+
+    elif (not isinstance(quality, dict) or
+            set(quality.keys()) != _default_quality.keys() or
+            not all(isinstance(i, bool) for i in quality.values())):
+        raise ValueError('invalid quality')
+
+    return kind, {'type': data_type,
+                  'asdu': asdu,
+                  'io': io_address,
+                  'value': value,
+                  'quality': quality,
+                  'time': None,
+                  'cause': 'UNDEFINED',
+                  'is_test': False,
+                  'generator': None}
+
+
+def _parse_csv_cell(cell):
+    cell = cell.strip()
+    try:
+        return json.decode(cell)
+    except Exception:
+        return cell
+
+
+def _generate_value(generator, data_type, value, t):
+    if data_type in ('Single', 'Double'):
+        value = generator.generate(1 if value == 'ON' else 0, t)
+        return 'ON' if value >= 0.5 else 'OFF'
+
+    if data_type == 'StepPosition':
+        position = round(generator.generate(value['value'], t))
+        return dict(value, value=min(max(position, -64), 63))
+
+    if data_type == 'Bitstring':
+        value = int.from_bytes((bytes.fromhex(value) + bytes(4))[:4], 'big')
+        value = round(generator.generate(value, t)) & 0xFFFFFFFF
+        return value.to_bytes(4, 'big').hex(' ')
+
+    if data_type == 'Normalized':
+        return min(max(generator.generate(value, t), -1), 1 - 2 ** -15)
+
+    if data_type == 'Scaled':
+        return min(max(round(generator.generate(value, t)), -0x8000), 0x7FFF)
+
+    if data_type == 'Floating':
+        return float(generator.generate(value, t))
+
+    if data_type == 'BinaryCounter':
+        counter = round(generator.generate(value['value'], t))
+        counter = (counter + 0x80000000) % 0x100000000 - 0x80000000
+        return dict(value, value=counter,
+                    sequence=(value['sequence'] + 1) % 32)
+
+    raise ValueError('unsupported data type')
@@ -1,6 +1,14 @@
+import asyncio
+import bisect
+import collections
+import functools
 import itertools
+import math
+import random
 import time
+import typing
 
+from hat import aio
 from hat.drivers import modbus
 from hat.drivers import tcp
 from hat.manager import common
@@ -11,7 +19,21 @@ default_master_conf = {'properties': {'link_type': 'TCP',
                                       'tcp_host': '127.0.0.1',
                                       'tcp_port': 1502,
                                       'serial_port': '/dev/ttyS0',
-                                      'serial_silent_interval': 0.005}}
+                                      'serial_silent_interval': 0.005,
+                                      'history_size': 100},
+                       'poll_groups': [],
+                       'load': {'enabled': False,
+                                'connection_count': 10,
+                                'connect_concurrency': 50,
+                                'reconnect_delay': 1,
+                                'rate': 100,
+                                'timeout': 5,
+                                'requests': [{'weight': 1,
+                                              'action': 'read',
+                                              'device_id': 1,
+                                              'data_type': 'HOLDING_REGISTER',
+                                              'start_address': 0,
+                                              'quantity': 10}]}}
 
 default_slave_conf = {'properties': {'link_type': 'TCP',
                                      'modbus_type': 'TCP',
@@ -19,9 +41,127 @@ default_slave_conf = {'properties': {'link_type': 'TCP',
                                      'tcp_port': 1502,
                                      'serial_port': '/dev/ttyS0',
                                      'serial_silent_interval': 0.005},
-                      'data': []}
+                      'data': [],
+                      'generators': []}
 
-master_data_size = 100
+
+poll_stats_interval: float = 1
+"""Interval (in seconds) between two consecutive poll statistics updates"""
+
+load_stats_interval: float = 1
+"""Interval (in seconds) between two consecutive load statistics updates"""
+
+load_latency_samples: int = 10000
+"""Maximum number of latest latencies used for load statistics percentiles"""
+
+max_read_quantities: typing.Dict[str, int] = {'COIL': 2000,
+                                              'DISCRETE_INPUT': 2000,
+                                              'HOLDING_REGISTER': 125,
+                                              'INPUT_REGISTER': 125,
+                                              'QUEUE': 1}
+"""Maximum number of values read with single request for each data type"""
+
+
+class ReadPoint(typing.NamedTuple):
+    device_id: int
+    data_type: str
+    address: int
+
+
+class ReadRequest(typing.NamedTuple):
+    device_id: int
+    data_type: str
+    start_address: int
+    quantity: int
+
+
+def plan_reads(points: typing.Iterable[ReadPoint],
+               max_gap: int = 0
+               ) -> typing.List[ReadRequest]:
+    """Get minimal list of read requests covering all points
+
+    Points with same device identifier and data type are merged into single
+    request if distance between two consecutive addresses is not greater
+    than `max_gap` + 1 (at most `max_gap` unneeded values are read between
+    two points) and resulting quantity doesn't exceed data type's
+    `max_read_quantities`.
+
+    """
+    if max_gap < 0:
+        raise ValueError('invalid max gap')
+
+    addresses = collections.defaultdict(set)
+    for point in points:
+        if point.data_type not in max_read_quantities:
+            raise ValueError('unsupported data type')
+        addresses[(point.device_id, point.data_type)].add(point.address)
+
+    requests = collections.deque()
+    for (device_id, data_type), i in addresses.items():
+        max_quantity = max_read_quantities[data_type]
+        start = stop = None
+        for address in sorted(i):
+            if (start is not None and
+                    address - stop <= max_gap + 1 and
+                    address - start < max_quantity):
+                stop = address
+                continue
+
+            if start is not None:
+                requests.append(ReadRequest(device_id, data_type, start,
+                                            stop - start + 1))
+            start = stop = address
+
+        if start is not None:
+            requests.append(ReadRequest(device_id, data_type, start,
+                                        stop - start + 1))
+
+    return list(requests)
+
+
+def get_point_values(points: typing.Iterable[ReadPoint],
+                     requests: typing.Iterable[ReadRequest],
+                     results: typing.Iterable[typing.Union[typing.List[int],
+                                                           modbus.Error]]
+                     ) -> typing.Dict[ReadPoint,
+                                      typing.Union[int, modbus.Error]]:
+    """Map results of planned read requests to points
+
+    Each result is list of read values or error associated with request at
+    the same position. Points not covered by requests are omitted.
+
+    """
+    requests_results = collections.defaultdict(list)
+    for request, result in zip(requests, results):
+        requests_results[(request.device_id, request.data_type)].append(
+            (request, result))
+
+    index = {}
+    for key, i in requests_results.items():
+        i.sort(key=lambda x: x[0].start_address)
+        index[key] = [request.start_address for request, _ in i], i
+
+    values = {}
+    for point in points:
+        start_addresses, key_requests_results = index.get(
+            (point.device_id, point.data_type), ([], []))
+
+        pos = bisect.bisect_right(start_addresses, point.address) - 1
+        if pos < 0:
+            continue
+
+        request, result = key_requests_results[pos]
+        offset = point.address - request.start_address
+        if offset >= request.quantity:
+            continue
+
+        if isinstance(result, modbus.Error):
+            values[point] = result
+
+        elif offset < len(result):
+            values[point] = result[offset]
+
+    return values
 
 
 class Master(common.Device):
@@ -29,18 +169,59 @@ class Master(common.Device):
     def __init__(self, conf, logger):
         self._logger = logger
         self._master = None
-        self._data = common.DataStorage({'properties': conf['properties'],
-                                         'data': []})
+        self._next_poll_group_ids = (str(i) for i in itertools.count(1))
+        self._data = common.DataStorage({
+            'properties': common.with_defaults(
+                conf['properties'], default_master_conf['properties']),
+            'poll_groups': {next(self._next_poll_group_ids): i
+                            for i in conf.get('poll_groups', [])},
+            'poll_stats': {},
+            'load': common.with_defaults(conf.get('load'),
+                                         default_master_conf['load']),
+            'load_stats': None})
+        self._history = common.History(
+            self._data, 'data', self._data.get(['properties', 'history_size']))
+        self._data.register_changes_cb(self._on_changes)
+        self._metrics = common.Metrics()
+        self._poll_jobs = common.PeriodicJobs(
+            self._data, 'poll_stats', logger, 'poll group', self._metrics,
+            'poll')
+        self._requests_counters = {
+            action: self._metrics.counter('requests_total',
+                                          'number of sent requests',
+                                          {'action': action})
+            for action in _master_request_actions}
+        self._request_duration_histograms = {
+            action: self._metrics.histogram('request_duration_seconds',
+                                            'request duration',
+                                            {'action': action})
+            for action in _master_request_actions}
+        self._request_errors_counters = {
+            action: self._metrics.counter(
+                'request_errors_total',
+                'number of requests resulting with error',
+                {'action': action})
+            for action in _master_request_actions}
 
     @property
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
     def get_conf(self):
-        return {'properties': self._data.data['properties']}
+        return {'properties': self._data.get('properties'),
+                'poll_groups': common.get_sorted_values(
+                    self._data.get('poll_groups')),
+                'load': self._data.get('load')}
 
     async def create(self):
-        properties = self._data.data['properties']
+        if self._data.get(['load', 'enabled']):
+            return self._create_load()
+
+        properties = self._data.get('properties')
         modbus_type = modbus.ModbusType[properties['modbus_type']]
 
         if properties['link_type'] == 'TCP':
@@ -48,16 +229,20 @@ class Master(common.Device):
                 modbus_type=modbus_type,
                 addr=tcp.Address(properties['tcp_host'],
                                  properties['tcp_port']))
-            return self._master
 
-        if properties['link_type'] == 'SERIAL':
+        elif properties['link_type'] == 'SERIAL':
             self._master = await modbus.create_serial_master(
                 modbus_type=modbus_type,
                 port=properties['serial_port'],
                 silent_interval=properties['serial_silent_interval'])
-            return self._master
 
-        raise ValueError('invalid link type')
+        else:
+            raise ValueError('invalid link type')
+
+        self._master.async_group.spawn(self._poll_jobs.stats_loop,
+                                       poll_stats_interval)
+        self._reset_poll_groups()
+        return self._master
 
     async def execute(self, action, *args):
         if action == 'set_property':
@@ -69,37 +254,294 @@ class Master(common.Device):
         if action == 'write':
             return await self._act_write(*args)
 
+        if action == 'read_points':
+            return await self._act_read_points(*args)
+
+        if action == 'add_poll_group':
+            return self._act_add_poll_group(*args)
+
+        if action == 'remove_poll_group':
+            return self._act_remove_poll_group(*args)
+
+        if action == 'change_poll_group':
+            return self._act_change_poll_group(*args)
+
+        if action == 'reset_poll_stats':
+            return self._act_reset_poll_stats(*args)
+
+        if action == 'change_load':
+            return self._act_change_load(*args)
+
         raise ValueError('invalid action')
 
+    def _on_changes(self, changes):
+        for change in changes:
+            path = change.path
+            if not path or (path[0] == 'poll_groups' and len(path) == 1):
+                self._reset_poll_groups()
+
+            elif path[0] == 'poll_groups':
+                self._update_poll_group(path[1])
+
+    def _reset_poll_groups(self):
+        for group_id in self._poll_jobs.job_ids:
+            self._update_poll_group(group_id)
+
+        for group_id in (self._data.get('poll_groups') or {}).keys():
+            self._update_poll_group(group_id)
+
+    def _update_poll_group(self, group_id):
+        poll_group = self._data.get(['poll_groups', group_id])
+        if poll_group is None:
+            self._poll_jobs.remove(group_id)
+            return
+
+        self._poll_jobs.stop(group_id)
+        if (not self._master or
+                not self._master.is_open or
+                not isinstance(poll_group, dict) or
+                not poll_group.get('enabled')):
+            return
+
+        try:
+            period = poll_group['period']
+            timeout = poll_group['timeout']
+            request = {'device_id': poll_group['device_id'],
+                       'data_type': modbus.DataType[poll_group['data_type']],
+                       'start_address': poll_group['start_address'],
+                       'quantity': poll_group['quantity']}
+            if not (period > 0 and timeout > 0):
+                raise ValueError('invalid period or timeout')
+
+            if not _is_int(request['device_id']):
+                raise ValueError('invalid device id')
+
+            start_address = request['start_address']
+            if not (_is_int(start_address) and start_address >= 0):
+                raise ValueError('invalid start address')
+
+            quantity = request['quantity']
+            max_quantity = max_read_quantities[poll_group['data_type']]
+            if not (_is_int(quantity) and 0 < quantity <= max_quantity):
+                raise ValueError('invalid quantity')
+
+        except Exception as e:
+            self._logger.log(f'invalid poll group {group_id}: {e}')
+            return
+
+        labels = {'poll_group': group_id}
+        errors_counter = self._metrics.counter(
+            'poll_errors_total',
+            'number of poll group requests resulting with modbus error',
+            labels)
+        self._poll_jobs.start(
+            self._master.async_group, group_id, period, timeout,
+            functools.partial(self._poll, errors_counter, request),
+            _PollStats, labels)
+
+    async def _poll(self, errors_counter, request):
+        result = await self._request('poll', self._master.read, **request)
+        if isinstance(result, modbus.Error):
+            errors_counter.inc()
+        return result
+
+    def _create_load(self):
+        properties = self._data.get('properties')
+        load = self._data.get('load')
+        if properties['link_type'] != 'TCP':
+            raise ValueError('load mode requires TCP link type')
+
+        requests = [_load_request_from_json(i) for i in load['requests']]
+        if not requests:
+            raise ValueError('empty load request mix')
+
+        connection_count = load['connection_count']
+        if not (_is_int(connection_count) and connection_count >= 0):
+            raise ValueError('invalid connection count')
+
+        if not load['connect_concurrency'] > 0:
+            raise ValueError('invalid connect concurrency')
+
+        period = connection_count / load['rate'] if load['rate'] > 0 else 0
+
+        stats = _LoadStats()
+        semaphore = asyncio.Semaphore(load['connect_concurrency'])
+        runner = common.LoadRunner()
+        runner.async_group.spawn(self._load_stats_loop, stats)
+
+        self._logger.log(f'starting load (connections: {connection_count})')
+        for _ in range(connection_count):
+            runner.async_group.spawn(self._load_connection_loop, stats,
+                                     semaphore, period, requests)
+
+        return runner
+
+    async def _load_connection_loop(self, stats, semaphore, period, requests):
+        properties = self._data.get('properties')
+        load = self._data.get('load')
+        modbus_type = modbus.ModbusType[properties['modbus_type']]
+        addr = tcp.Address(properties['tcp_host'], properties['tcp_port'])
+        weights = [i.weight for i in requests]
+
+        while True:
+            try:
+                async with semaphore:
+                    master = await modbus.create_tcp_master(
+                        modbus_type=modbus_type,
+                        addr=addr)
+
+            except Exception:
+                stats.connect_failures += 1
+                await asyncio.sleep(load['reconnect_delay'])
+                continue
+
+            stats.connections += 1
+            stats.connects += 1
+            try:
+                scheduled = time.monotonic() + random.uniform(0, period)
+                while master.is_open:
+                    delay = scheduled - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    request = random.choices(requests, weights)[0]
+                    await _load_request(stats, master, request,
+                                        load['timeout'])
+
+                    scheduled += period
+                    now = time.monotonic()
+                    if scheduled < now and period > 0:
+                        skipped = math.ceil((now - scheduled) / period)
+                        stats.overruns += skipped
+                        scheduled += skipped * period
+
+            except ConnectionError:
+                pass
+
+            finally:
+                stats.connections -= 1
+                await aio.uncancellable(master.async_close())
+
+            await asyncio.sleep(load['reconnect_delay'])
+
+    async def _load_stats_loop(self, stats):
+        try:
+            while True:
+                self._data.set('load_stats', stats.to_json())
+                await asyncio.sleep(load_stats_interval)
+
+        finally:
+            self._logger.log('stopping load')
+
     def _act_set_property(self, path, value):
         self._logger.log(f'changing property {path} to {value}')
+        if path == 'history_size':
+            self._history.resize(value)
+            value = self._history.size
+
         self._data.set(['properties', path], value)
 
+    def _act_change_load(self, path, value):
+        self._logger.log(f'changing load {path} to {value}')
+        self._data.set(['load', path], value)
+
+    def _act_add_poll_group(self):
+        self._logger.log('creating new poll group')
+        group_id = next(self._next_poll_group_ids)
+        self._data.set(['poll_groups', group_id], {
+            'device_id': 1,
+            'data_type': 'HOLDING_REGISTER',
+            'start_address': 0,
+            'quantity': 1,
+            'period': 1,
+            'timeout': 1,
+            'enabled': False})
+        return group_id
+
+    def _act_remove_poll_group(self, group_id):
+        self._logger.log('removing poll group')
+        self._data.remove(['poll_groups', group_id])
+        self._poll_jobs.update_stats()
+
+    def _act_change_poll_group(self, group_id, path, value):
+        if self._data.get(['poll_groups', group_id]) is None:
+            raise ValueError('invalid poll group id')
+
+        self._logger.log(f'changing poll group {path} to {value}')
+        self._data.set(['poll_groups', group_id, path], value)
+
+    def _act_reset_poll_stats(self):
+        self._logger.log('resetting poll statistics')
+        self._poll_jobs.reset_stats()
+
     async def _act_read(self, device_id, data_type, start_address, quantity):
         if not self._master or not self._master.is_open:
             self._logger.log('read failed - not connected')
             return
 
-        result = await self._master.read(device_id=device_id,
-                                         data_type=modbus.DataType[data_type],
-                                         start_address=start_address,
-                                         quantity=quantity)
+        result = await self._request(
+            'read', self._master.read,
+            device_id=device_id,
+            data_type=modbus.DataType[data_type],
+            start_address=start_address,
+            quantity=quantity)
         value = (result.name if isinstance(result, modbus.Error)
                  else ', '.join(str(i) for i in result))
         self._add_data('read', device_id, data_type, start_address, value)
 
+    async def _act_read_points(self, points, max_gap=0):
+        points = [ReadPoint(*i) for i in points]
+        requests = plan_reads(points, max_gap)
+
+        if not self._master or not self._master.is_open:
+            self._logger.log('read points failed - not connected')
+            return
+
+        self._logger.log(f'reading {len(points)} points with '
+                         f'{len(requests)} requests')
+        results = collections.deque()
+        for request in requests:
+            result = await self._request(
+                'read_points', self._master.read,
+                device_id=request.device_id,
+                data_type=modbus.DataType[request.data_type],
+                start_address=request.start_address,
+                quantity=request.quantity)
+            results.append(result)
+
+            value = (result.name if isinstance(result, modbus.Error)
+                     else ', '.join(str(i) for i in result))
+            self._add_data('read', request.device_id, request.data_type,
+                           request.start_address, value)
+
+        values = get_point_values(points, requests, results)
+        return [_read_point_result(point, values.get(point))
+                for point in points]
+
     async def _act_write(self, device_id, data_type, start_address, values):
         if not self._master or not self._master.is_open:
             self._logger.log('write failed - not connected')
             return
 
-        result = await self._master.write(device_id=device_id,
-                                          data_type=modbus.DataType[data_type],
-                                          start_address=start_address,
-                                          values=values)
+        result = await self._request(
+            'write', self._master.write,
+            device_id=device_id,
+            data_type=modbus.DataType[data_type],
+            start_address=start_address,
+            values=values)
         value = result.name if result else ', '.join(str(i) for i in values)
         self._add_data('write', device_id, data_type, start_address, value)
 
+    async def _request(self, action, fn, **kwargs):
+        self._requests_counters[action].inc()
+        start = time.monotonic()
+        result = await fn(**kwargs)
+        self._request_duration_histograms[action].observe(
+            time.monotonic() - start)
+        if isinstance(result, modbus.Error):
+            self._request_errors_counters[action].inc()
+        return result
+
     def _add_data(self, action, device_id, data_type, start_address, value):
         entry = {'timestamp': time.time(),
                  'action': action,
@@ -107,9 +549,7 @@ class Master(common.Device):
                  'data_type': data_type,
                  'start_address': start_address,
                  'value': value}
-        data = itertools.chain([entry], self._data.data['data'])
-        data = itertools.islice(data, master_data_size)
-        self._data.set('data', list(data))
+        self._history.append(entry)
 
 
 class Slave(common.Device):
@@ -117,22 +557,46 @@ class Slave(common.Device):
     def __init__(self, conf, logger):
         self._logger = logger
         self._next_data_ids = (str(i) for i in itertools.count(1))
+        self._next_generator_ids = (str(i) for i in itertools.count(1))
         self._data = common.DataStorage({
             'properties': conf['properties'],
             'slave_count': 0,
             'data': {next(self._next_data_ids): i
-                     for i in conf['data']}})
+                     for i in conf['data']},
+            'generators': {next(self._next_generator_ids): i
+                           for i in conf.get('generators', [])}})
+        self._data_index = _AddressIndex()
+        self._data_index.reset(self._data.get('data'))
+        self._generators = common.GeneratorScheduler()
+        self._reset_generators()
+        self._data.register_changes_cb(self._on_changes)
+        self._metrics = common.Metrics()
+        self._slaves_gauge = self._metrics.gauge(
+            'slaves', 'number of active slaves')
+        self._requests_counters = {
+            action: self._metrics.counter('requests_total',
+                                          'number of received requests',
+                                          {'action': action})
+            for action in ['read', 'write', 'write_mask']}
+        self._generated_data_counter = self._metrics.counter(
+            'generated_data_total', 'number of generated data changes')
 
     @property
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
     def get_conf(self):
-        return {'properties': self._data.data['properties'],
-                'data': list(self._data.data['data'].values())}
+        return {'properties': self._data.get('properties'),
+                'data': common.get_sorted_values(self._data.get('data')),
+                'generators': common.get_sorted_values(
+                    self._data.get('generators'))}
 
     async def create(self):
-        properties = self._data.data['properties']
+        properties = self._data.get('properties')
         modbus_type = modbus.ModbusType[properties['modbus_type']]
 
         if properties['link_type'] == 'TCP':
@@ -144,6 +608,7 @@ class Slave(common.Device):
                 read_cb=self._on_read,
                 write_cb=self._on_write,
                 write_mask_cb=self._on_write_mask)
+            srv.async_group.spawn(self._generator_loop)
             return srv
 
         if properties['link_type'] == 'SERIAL':
@@ -155,6 +620,7 @@ class Slave(common.Device):
                 write_mask_cb=self._on_write_mask,
                 silent_interval=properties['serial_silent_interval'])
             slave.async_group.spawn(self._slave_loop, slave)
+            slave.async_group.spawn(self._generator_loop)
             return slave
 
         raise ValueError('invalid link type')
@@ -172,12 +638,25 @@ class Slave(common.Device):
         if action == 'change_data':
             return self._act_change_data(*args)
 
+        if action == 'set_generator':
+            return self._act_set_generator(*args)
+
+        if action == 'add_range_generator':
+            return self._act_add_range_generator(*args)
+
+        if action == 'remove_range_generator':
+            return self._act_remove_range_generator(*args)
+
+        if action == 'change_range_generator':
+            return self._act_change_range_generator(*args)
+
         raise ValueError('invalid action')
 
     async def _slave_loop(self, slave):
         try:
             self._logger.log('new slave created')
-            self._data.set('slave_count', self._data.data['slave_count'] + 1)
+            self._slaves_gauge.inc()
+            self._data.set('slave_count', self._data.get('slave_count') + 1)
             await slave.wait_closing()
 
         except ConnectionError:
@@ -186,50 +665,156 @@ class Slave(common.Device):
         finally:
             slave.close()
             self._logger.log('slave closed')
-            self._data.set('slave_count', self._data.data['slave_count'] - 1)
+            self._slaves_gauge.dec()
+            self._data.set('slave_count', self._data.get('slave_count') - 1)
+
+    def _on_changes(self, changes):
+        for change in changes:
+            path = change.path
+            if not path:
+                self._data_index.reset(self._data.get('data'))
+                self._reset_generators()
+
+            elif path[0] == 'data' and len(path) == 1:
+                self._data_index.reset(self._data.get('data'))
+                self._reset_generators()
+
+            elif path[0] == 'data':
+                if len(path) == 2 or path[2] in _data_key_fields:
+                    self._data_index.update(path[1],
+                                            self._data.get(['data', path[1]]))
+
+                if len(path) == 2 or path[2] == 'generator':
+                    self._update_generator('data', path[1])
+
+            elif path[0] == 'generators' and len(path) == 1:
+                self._reset_generators()
+
+            elif path[0] == 'generators':
+                self._update_generator('generators', path[1])
 
     def _on_read(self, slave, device_id, data_type, start_address, quantity):
         self._logger.log('received read request')
+        self._requests_counters['read'].inc()
         quantity = quantity or 1
-        data = {i['address']: i['value']
-                for i in self._data.data['data'].values()
-                if device_id == i['device_id'] and
-                data_type.name == i['data_type'] and
-                i['address'] is not None and
-                start_address <= i['address'] < start_address + quantity}
+        data = {address: self._data.get(['data', data_id, 'value'])
+                for address, data_id in self._data_index.get(
+                    device_id, data_type.name, start_address, quantity)}
         result = [(data.get(i) or 0)
                   for i in range(start_address, start_address + quantity)]
         return result
 
     def _on_write(self, slave, device_id, data_type, start_address, values):
         self._logger.log('received write request')
-        quantity = len(values)
-        data = {}
-        for data_id, i in self._data.data['data'].items():
-            if ((device_id == i['device_id'] or device_id == 0) and
-                    data_type.name == i['data_type'] and
-                    i['address'] is not None and
-                    start_address <= i['address'] < start_address + quantity):
-                data[data_id] = values[i['address'] - start_address]
+        self._requests_counters['write'].inc()
+        data = {data_id: values[address - start_address]
+                for address, data_id in self._get_write_data(
+                    device_id, data_type.name, start_address, len(values))}
 
         self._logger.log(f'changing data values (count: {len(data)})')
-        for data_id, value in data.items():
-            self._data.set(['data', data_id, 'value'], value)
+        with self._data.transaction():
+            for data_id, value in data.items():
+                self._data.set(['data', data_id, 'value'], value)
 
     def _on_write_mask(self, slave, device_id, address, and_mask, or_mask):
         self._logger.log('received write mask request')
+        self._requests_counters['write_mask'].inc()
         data = {}
-        for data_id, i in self._data.data['data'].items():
-            if ((device_id == i['device_id'] or device_id == 0) and
-                    i['data_type'] == 'HOLDING_REGISTER' and
-                    i['address'] == address):
-                data[data_id] = modbus.apply_mask(value=i['value'] or 0,
-                                                  and_mask=and_mask,
-                                                  or_mask=or_mask)
+        for _, data_id in self._get_write_data(device_id, 'HOLDING_REGISTER',
+                                               address, 1):
+            value = self._data.get(['data', data_id, 'value'])
+            data[data_id] = modbus.apply_mask(value=value or 0,
+                                              and_mask=and_mask,
+                                              or_mask=or_mask)
 
         self._logger.log(f'changing data values (count: {len(data)})')
-        for data_id, value in data.items():
-            self._data.set(['data', data_id, 'value'], value)
+        with self._data.transaction():
+            for data_id, value in data.items():
+                self._data.set(['data', data_id, 'value'], value)
+
+    async def _generator_loop(self):
+        while True:
+            due = await self._generators.get_due()
+            self._generate(due)
+
+    def _generate(self, due):
+        now = time.time()
+        values = {}
+        for (key_type, key_id), generator in due:
+            if key_type == 'data':
+                data_ids = [key_id]
+
+            else:
+                data_ids = self._get_range_generator_data_ids(key_id)
+
+            for data_id in data_ids:
+                data = self._data.get(['data', data_id])
+                if not isinstance(data, dict):
+                    continue
+
+                try:
+                    values[data_id] = _generate_value(
+                        generator, data['data_type'],
+                        values.get(data_id, data['value']), now)
+
+                except Exception:
+                    continue
+
+        if not values:
+            return
+
+        with self._data.transaction():
+            for data_id, value in values.items():
+                self._data.set(['data', data_id, 'value'], value)
+
+        self._generated_data_counter.inc(len(values))
+
+    def _get_range_generator_data_ids(self, generator_id):
+        range_generator = self._data.get(['generators', generator_id])
+        if not isinstance(range_generator, dict):
+            return []
+
+        try:
+            for path in _range_generator_key_fields:
+                _validate_range_generator_field(path,
+                                                range_generator.get(path))
+
+        except ValueError:
+            return []
+
+        data_ids = collections.deque()
+        for _, data_id in self._data_index.get(
+                range_generator['device_id'],
+                range_generator['data_type'],
+                range_generator['start_address'],
+                range_generator['quantity']):
+            if self._data.get(['data', data_id, 'generator']):
+                continue
+            data_ids.append(data_id)
+        return data_ids
+
+    def _reset_generators(self):
+        self._generators.clear()
+        for data_id in (self._data.get('data') or {}).keys():
+            self._update_generator('data', data_id)
+        for generator_id in (self._data.get('generators') or {}).keys():
+            self._update_generator('generators', generator_id)
+
+    def _update_generator(self, key_type, key_id):
+        data = self._data.get([key_type, key_id])
+        conf = data.get('generator') if isinstance(data, dict) else None
+        try:
+            generator = common.Generator(conf) if conf else None
+        except ValueError:
+            generator = None
+        self._generators.set((key_type, key_id), generator)
+
+    def _get_write_data(self, device_id, data_type, start_address, quantity):
+        device_ids = (self._data_index.get_device_ids(data_type)
+                      if device_id == 0 else [device_id])
+        for i in device_ids:
+            yield from self._data_index.get(i, data_type, start_address,
+                                            quantity)
 
     def _act_set_property(self, path, value):
         self._logger.log(f'changing property {path} to {value}')
@@ -241,7 +826,8 @@ class Slave(common.Device):
         self._data.set(['data', data_id], {'device_id': 1,
                                            'data_type': 'COIL',
                                            'address': None,
-                                           'value': 0})
+                                           'value': 0,
+                                           'generator': None})
         return data_id
 
     def _act_remove_data(self, data_id):
@@ -251,3 +837,307 @@ class Slave(common.Device):
     def _act_change_data(self, data_id, path, value):
         self._logger.log(f'changing data {path} to {value}')
         self._data.set(['data', data_id, path], value)
+
+    def _act_set_generator(self, data_id, generator):
+        if self._data.get(['data', data_id]) is None:
+            raise ValueError('invalid data id')
+
+        if generator is not None:
+            generator = common.Generator(generator).conf
+
+        self._logger.log(f'changing data generator to {generator}')
+        self._data.set(['data', data_id, 'generator'], generator)
+
+    def _act_add_range_generator(self):
+        self._logger.log('creating new range generator')
+        generator_id = next(self._next_generator_ids)
+        self._data.set(['generators', generator_id], {
+            'device_id': 1,
+            'data_type': 'HOLDING_REGISTER',
+            'start_address': 0,
+            'quantity': 1,
+            'generator': common.Generator({'type': 'counter'}).conf})
+        return generator_id
+
+    def _act_remove_range_generator(self, generator_id):
+        self._logger.log('removing range generator')
+        self._data.remove(['generators', generator_id])
+
+    def _act_change_range_generator(self, generator_id, path, value):
+        if self._data.get(['generators', generator_id]) is None:
+            raise ValueError('invalid generator id')
+
+        if path == 'generator':
+            value = common.Generator(value).conf
+
+        elif path in _range_generator_key_fields:
+            _validate_range_generator_field(path, value)
+
+        self._logger.log(f'changing range generator {path} to {value}')
+        self._data.set(['generators', generator_id, path], value)
+
+
+_data_key_fields = {'device_id', 'data_type', 'address'}
+
+_range_generator_key_fields = ['device_id', 'data_type', 'start_address',
+                               'quantity']
+
+_master_request_actions = ['read', 'read_points', 'write', 'poll']
+
+
+class _LoadRequest(typing.NamedTuple):
+    weight: float
+    action: str
+    device_id: int
+    data_type: modbus.DataType
+    start_address: int
+    quantity: typing.Optional[int]
+    values: typing.Optional[typing.List[int]]
+
+
+class _LoadStats:
+
+    def __init__(self):
+        self.connections = 0
+        self.connects = 0
+        self.connect_failures = 0
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.overruns = 0
+        self.latencies = common.Latencies(load_latency_samples)
+        self._last_time = time.monotonic()
+        self._last_requests = 0
+
+    def to_json(self):
+        now = time.monotonic()
+        dt = (now - self._last_time) or 1
+        result = {'connections': self.connections,
+                  'connects': self.connects,
+                  'connect_failures': self.connect_failures,
+                  'requests': self.requests,
+                  'rate': (self.requests - self._last_requests) / dt,
+                  'errors': self.errors,
+                  'timeouts': self.timeouts,
+                  'overruns': self.overruns,
+                  'latency': self.latencies.to_json()}
+
+        self._last_time = now
+        self._last_requests = self.requests
+        return result
+
+
+async def _load_request(stats, master, request, timeout):
+    if request.action == 'read':
+        fn = functools.partial(master.read,
+                               device_id=request.device_id,
+                               data_type=request.data_type,
+                               start_address=request.start_address,
+                               quantity=request.quantity)
+
+    else:
+        fn = functools.partial(master.write,
+                               device_id=request.device_id,
+                               data_type=request.data_type,
+                               start_address=request.start_address,
+                               values=request.values)
+
+    start = time.monotonic()
+    stats.requests += 1
+    try:
+        result = await aio.wait_for(fn(), timeout)
+
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+        return
+
+    except ConnectionError:
+        raise
+
+    except Exception:
+        stats.errors += 1
+        return
+
+    stats.latencies.add(time.monotonic() - start)
+    if isinstance(result, modbus.Error):
+        stats.errors += 1
+
+
+class _PollStats(common.PeriodicStats):
+
+    def reset(self):
+        super().reset()
+        self.errors = 0
+        self._cycle = _Aggregate()
+        self._jitter = _Aggregate()
+        self._duration = _Aggregate()
+
+    def add_start(self, jitter, cycle):
+        self._jitter.add(jitter)
+        if cycle is not None:
+            self._cycle.add(cycle)
+
+    def add_result(self, duration, result):
+        self.count += 1
+        self._duration.add(duration)
+
+        if isinstance(result, modbus.Error):
+            self.errors += 1
+            self.last_result = result.name
+
+        else:
+            self.last_result = ', '.join(str(i) for i in result)
+
+    def add_failure(self, duration, e):
+        super().add_failure(duration, e)
+        self._duration.add(duration)
+
+    def add_timeout(self, duration):
+        super().add_timeout(duration)
+        self._duration.add(duration)
+
+    def to_json(self):
+        return {**super().to_json(),
+                'errors': self.errors,
+                'cycle': self._cycle.to_json(),
+                'jitter': self._jitter.to_json(),
+                'duration': self._duration.to_json()}
+
+
+class _Aggregate:
+
+    def __init__(self):
+        self._count = 0
+        self._sum = 0
+        self._last = None
+        self._min = None
+        self._max = None
+
+    def add(self, value):
+        self._count += 1
+        self._sum += value
+        self._last = value
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+
+    def to_json(self):
+        return {'last': self._last,
+                'avg': self._sum / self._count if self._count else None,
+                'min': self._min,
+                'max': self._max}
+
+
+class _AddressIndex:
+
+    def __init__(self):
+        self._keys = {}
+        self._addresses = {}
+
+    def get_device_ids(self, data_type):
+        return [device_id for device_id, i in self._addresses.keys()
+                if i == data_type]
+
+    def get(self, device_id, data_type, start_address, quantity):
+        addresses = self._addresses.get((device_id, data_type))
+        if not addresses:
+            return
+
+        stop_address = start_address + quantity
+        index = bisect.bisect_left(addresses, (start_address, ''))
+        for i in range(index, len(addresses)):
+            address, data_id = addresses[i]
+            if address >= stop_address:
+                break
+            yield address, data_id
+
+    def reset(self, data):
+        self._keys = {}
+        self._addresses = {}
+        for data_id, i in (data or {}).items():
+            self.update(data_id, i)
+
+    def update(self, data_id, data):
+        key = self._keys.pop(data_id, None)
+        if key is not None:
+            device_id, data_type, address = key
+            addresses = self._addresses[(device_id, data_type)]
+            index = bisect.bisect_left(addresses, (address, data_id))
+            del addresses[index]
+            if not addresses:
+                del self._addresses[(device_id, data_type)]
+
+        if not isinstance(data, dict):
+            return
+
+        device_id = data.get('device_id')
+        data_type = data.get('data_type')
+        address = data.get('address')
+        if not isinstance(address, int):
+            return
+
+        self._keys[data_id] = device_id, data_type, address
+        addresses = self._addresses.setdefault((device_id, data_type), [])
+        bisect.insort(addresses, (address, data_id))
+
+
+def _generate_value(generator, data_type, value, t):
+    value = generator.generate(value or 0, t)
+
+    if data_type in ('COIL', 'DISCRETE_INPUT'):
+        return 1 if value >= 0.5 else 0
+
+    if data_type in ('HOLDING_REGISTER', 'INPUT_REGISTER', 'QUEUE'):
+        return round(value) % 0x10000
+
+    raise ValueError('unsupported data type')
+
+
+def _read_point_result(point, value):
+    result = {'device_id': point.device_id,
+              'data_type': point.data_type,
+              'address': point.address}
+
+    if value is None:
+        return dict(result, success=False, error='NO_VALUE')
+
+    if isinstance(value, modbus.Error):
+        return dict(result, success=False, error=value.name)
+
+    return dict(result, success=True, value=value)
+
+
+def _load_request_from_json(request):
+    action = request.get('action', 'read')
+    if action not in ('read', 'write'):
+        raise ValueError('invalid load request action')
+
+    weight = request.get('weight', 1)
+    if not weight > 0:
+        raise ValueError('invalid load request weight')
+
+    return _LoadRequest(
+        weight=weight,
+        action=action,
+        device_id=request['device_id'],
+        data_type=modbus.DataType[request['data_type']],
+        start_address=request['start_address'],
+        quantity=request.get('quantity', 1) if action == 'read' else None,
+        values=request.get('values', [0]) if action == 'write' else None)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate_range_generator_field(path, value):
+    if path == 'device_id' and not _is_int(value):
+        raise ValueError('invalid device id')
+
+    if path == 'data_type' and value not in max_read_quantities:
+        raise ValueError('invalid data type')
+
+    if path == 'start_address' and not (_is_int(value) and value >= 0):
+        raise ValueError('invalid start address')
+
+    if path == 'quantity' and not (_is_int(value) and value >= 0):
+        raise ValueError('invalid quantity')
@@ -15,16 +15,25 @@ class Device(common.Device):
                                          'mid': 0,
                                          'local_components': [],
                                          'global_components': []})
+        self._metrics = common.Metrics()
+        self._received_changes_counter = self._metrics.counter(
+            'received_changes_total', 'number of received data changes')
+        self._sent_messages_counter = self._metrics.counter(
+            'sent_messages_total', 'number of sent messages')
 
     @property
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
     def get_conf(self):
-        return {'address': self._data.data['address']}
+        return {'address': self._data.get('address')}
 
     async def create(self):
-        address = self._data.data['address']
+        address = self._data.get('address')
         self._client = await juggler.connect(address)
         self._client.async_group.spawn(self._client_loop, self._client)
         return self._client
@@ -41,6 +50,7 @@ class Device(common.Device):
     async def _client_loop(self, client):
 
         def on_change():
+            self._received_changes_counter.inc()
             mid = json.get(client.remote_data, 'mid')
             local_components = json.get(client.remote_data,
                                         'local_components')
@@ -71,6 +81,7 @@ class Device(common.Device):
             self._logger.log('set rank failed - not connected')
             return
 
+        self._sent_messages_counter.inc()
         await self._client.send({'type': 'set_rank',
                                  'payload': {'cid': cid,
                                              'rank': rank}})
@@ -13,16 +13,25 @@ class Device(common.Device):
         self._client = None
         self._data = common.DataStorage({'address': conf['address'],
                                          'components': []})
+        self._metrics = common.Metrics()
+        self._received_changes_counter = self._metrics.counter(
+            'received_changes_total', 'number of received data changes')
+        self._sent_messages_counter = self._metrics.counter(
+            'sent_messages_total', 'number of sent messages')
 
     @property
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
     def get_conf(self):
-        return {'address': self._data.data['address']}
+        return {'address': self._data.get('address')}
 
     async def create(self):
-        address = self._data.data['address']
+        address = self._data.get('address')
         self._client = await juggler.connect(address)
         self._client.async_group.spawn(self._client_loop, self._client)
         return self._client
@@ -45,6 +54,7 @@ class Device(common.Device):
     async def _client_loop(self, client):
 
         def on_change():
+            self._received_changes_counter.inc()
             components = json.get(client.remote_data, 'components') or []
             self._data.set('components', components)
 
@@ -68,6 +78,7 @@ class Device(common.Device):
             self._logger.log('start failed - not connected')
             return
 
+        self._sent_messages_counter.inc()
         await self._client.send({'type': 'start',
                                  'payload': {'id': component_id}})
         self._logger.log('send start')
@@ -77,6 +88,7 @@ class Device(common.Device):
             self._logger.log('stop failed - not connected')
             return
 
+        self._sent_messages_counter.inc()
         await self._client.send({'type': 'stop',
                                  'payload': {'id': component_id}})
         self._logger.log('send stop')
@@ -86,6 +98,7 @@ class Device(common.Device):
             self._logger.log('set revive failed - not connected')
             return
 
+        self._sent_messages_counter.inc()
         await self._client.send({'type': 'revive',
                                  'payload': {'id': component_id,
                                              'value': revive}})
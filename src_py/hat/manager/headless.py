@@ -0,0 +1,223 @@
+"""Headless front-end
+
+Headless front-end replaces web ui with newline-delimited JSON streams.
+
+RPC requests are JSON objects with `id` (arbitrary JSON data used for
+pairing with response), `action` (any action supported by
+`hat.manager.server.Server.call`) and optional `args` (list of action
+arguments). Requests received from single source are processed
+sequentially and each request results with response object::
+
+    {"type": "response", "id": ..., "success": true, "result": ...}
+    {"type": "response", "id": ..., "success": false, "error": "..."}
+
+Device state changes are streamed as change objects where `path` is
+path of changed data relative to back-end state (always starting with
+``devices``)::
+
+    {"type": "change", "timestamp": ..., "path": [...], "value": ...,
+     "removed": false}
+
+First change object always contains complete device states (`path` is
+``["devices"]``).
+
+"""
+
+from pathlib import Path
+import asyncio
+import contextlib
+import logging
+import sys
+import threading
+import time
+import typing
+
+from hat import aio
+from hat import json
+from hat.manager import common
+from hat.manager.server import Server
+
+
+mlog: logging.Logger = logging.getLogger(__name__)
+"""Module logger"""
+
+
+async def run(server: Server,
+              rpc_path: typing.Optional[Path] = None,
+              changes_path: typing.Optional[Path] = None):
+    """Run headless front-end until server is closed
+
+    If `rpc_path` is ``None``, RPC requests are read from standard input and
+    responses are written to standard output. Otherwise, RPC requests are
+    received (and responses sent) over local (unix domain) socket listening
+    at `rpc_path`.
+
+    If `changes_path` is ``None``, device state changes are written to
+    standard output. Otherwise, changes are written to `changes_path` file.
+
+    """
+    async_group = server.async_group.create_subgroup()
+    try:
+        stdout = _Writer(async_group, sys.stdout)
+
+        if changes_path is None:
+            changes_writer = stdout
+
+        else:
+            changes_file = open(changes_path, 'w', encoding='utf-8')
+            async_group.spawn(aio.call_on_cancel, changes_file.close)
+            changes_writer = _Writer(async_group, changes_file)
+
+        on_changes = _ChangesCb(server.data, changes_writer)
+        with server.data.register_changes_cb(on_changes):
+            if rpc_path is None:
+                async_group.spawn(_stdin_loop, server, stdout)
+
+            else:
+                srv = await asyncio.start_unix_server(
+                    lambda reader, writer: async_group.spawn(
+                        _socket_loop, server, reader, writer),
+                    str(rpc_path))
+                async_group.spawn(aio.call_on_cancel, _close_unix_server,
+                                  srv, rpc_path)
+
+            await async_group.wait_closing()
+
+    finally:
+        await aio.uncancellable(async_group.async_close())
+
+
+class _Writer:
+
+    def __init__(self, async_group, f):
+        self._f = f
+        self._queue = aio.Queue()
+        self._executor = aio.create_executor(1)
+        async_group.spawn(self._write_loop)
+
+    def write(self, data: json.Data):
+        self._queue.put_nowait(json.encode(data))
+
+    async def _write_loop(self):
+        try:
+            while True:
+                lines = [await self._queue.get()]
+                while not self._queue.empty():
+                    lines.append(self._queue.get_nowait())
+
+                text = ''.join(f'{line}\n' for line in lines)
+                await self._executor(_write, self._f, text)
+
+        except Exception as e:
+            mlog.error("write loop error: %s", e, exc_info=e)
+
+        finally:
+            self._queue.close()
+
+
+class _ChangesCb:
+
+    def __init__(self, data: common.DataStorage, writer: _Writer):
+        self._writer = writer
+        self._writer.write({'type': 'change',
+                            'timestamp': time.time(),
+                            'path': ['devices'],
+                            'value': data.get('devices'),
+                            'removed': False})
+
+    def __call__(self, changes: typing.List[common.DataChange]):
+        timestamp = time.time()
+        for change in changes:
+            if change.path and change.path[0] != 'devices':
+                continue
+
+            self._writer.write({'type': 'change',
+                                'timestamp': timestamp,
+                                'path': change.path,
+                                'value': change.new_value,
+                                'removed': change.removed})
+
+
+async def _stdin_loop(server, writer):
+    loop = asyncio.get_running_loop()
+    queue = aio.Queue()
+
+    def read():
+        try:
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(queue.put_nowait, line)
+
+        finally:
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(queue.close)
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            line = await queue.get()
+            if not line.strip():
+                continue
+
+            writer.write(await _process_request(server, line))
+
+    except aio.QueueClosedError:
+        mlog.debug("standard input closed")
+
+    except Exception as e:
+        mlog.error("stdin loop error: %s", e, exc_info=e)
+
+
+async def _socket_loop(server, reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            if not line.strip():
+                continue
+
+            response = await _process_request(server, line.decode('utf-8'))
+            writer.write(f'{json.encode(response)}\n'.encode('utf-8'))
+            await writer.drain()
+
+    except ConnectionError:
+        pass
+
+    except Exception as e:
+        mlog.error("socket loop error: %s", e, exc_info=e)
+
+    finally:
+        writer.close()
+
+
+async def _process_request(server, line):
+    request_id = None
+    try:
+        request = json.decode(line)
+        request_id = request.get('id')
+        result = await server.call(request['action'],
+                                   *request.get('args', []))
+        return {'type': 'response',
+                'id': request_id,
+                'success': True,
+                'result': result}
+
+    except Exception as e:
+        return {'type': 'response',
+                'id': request_id,
+                'success': False,
+                'error': str(e)}
+
+
+def _write(f, text):
+    f.write(text)
+    f.flush()
+
+
+def _close_unix_server(srv, path):
+    srv.close()
+    with contextlib.suppress(FileNotFoundError):
+        Path(path).unlink()
@@ -6,6 +6,7 @@ import asyncio
 import contextlib
 import logging.config
 import sys
+import typing
 
 import appdirs
 
@@ -13,6 +14,7 @@ from hat import aio
 from hat import json
 from hat.manager import common
 from hat.manager.server import create_server
+import hat.manager.headless
 
 
 mlog: logging.Logger = logging.getLogger('hat.manager.main')
@@ -29,6 +31,20 @@ def create_argument_parser() -> argparse.ArgumentParser:
         '--conf', metavar='PATH', type=Path, default=None,
         help="configuration defined by hat-manager://main.yaml# "
              "(default $XDG_CONFIG_HOME/hat/manager.{yaml|yml|json})")
+    parser.add_argument(
+        '--headless', action='store_true',
+        help="run without web ui - all configured devices are started "
+             "once on startup, RPC requests are received as "
+             "newline-delimited JSON and device state changes are streamed "
+             "as newline-delimited JSON")
+    parser.add_argument(
+        '--rpc-socket', metavar='PATH', type=Path, default=None,
+        help="headless mode local socket path used for RPC requests "
+             "(default RPC requests are read from stdin)")
+    parser.add_argument(
+        '--changes', metavar='PATH', type=Path, default=None,
+        help="headless mode device state changes output file path "
+             "(default stdout)")
     return parser
 
 
@@ -58,15 +74,27 @@ def main():
     aio.init_asyncio()
 
     with contextlib.suppress(asyncio.CancelledError):
-        aio.run_asyncio(async_main(conf, conf_path))
+        aio.run_asyncio(async_main(conf, conf_path,
+                                   headless=args.headless,
+                                   rpc_path=args.rpc_socket,
+                                   changes_path=args.changes))
 
 
 async def async_main(conf: json.Data,
-                     conf_path: Path):
+                     conf_path: Path,
+                     headless: bool = False,
+                     rpc_path: typing.Optional[Path] = None,
+                     changes_path: typing.Optional[Path] = None):
     """Async main entry point"""
-    srv = await create_server(conf, conf_path)
+    srv = await create_server(conf, conf_path,
+                              ui_enabled=not headless,
+                              start_devices=headless)
     try:
+        if headless:
+            await hat.manager.headless.run(srv, rpc_path, changes_path)
+
         await srv.wait_closing()
+
     finally:
         await aio.uncancellable(srv.async_close())
 
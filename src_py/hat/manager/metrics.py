@@ -0,0 +1,166 @@
+"""Prometheus metrics endpoint"""
+
+import collections
+import logging
+import math
+import typing
+import urllib
+
+import aiohttp.web
+
+from hat import aio
+from hat import json
+
+
+mlog: logging.Logger = logging.getLogger(__name__)
+"""Module logger"""
+
+content_type: str = 'text/plain; version=0.0.4; charset=utf-8'
+"""Prometheus text exposition format content type"""
+
+MetricsCb = typing.Callable[[], typing.List[json.Data]]
+"""Metrics callback
+
+Callback returns list of metrics, each represented with `name`,
+`description`, `type`, `labels` and `value` (as returned by
+`hat.manager.common.Metrics.to_json`).
+
+"""
+
+
+async def listen(address: str,
+                 metrics_cb: MetricsCb,
+                 path: str = '/metrics'
+                 ) -> 'Server':
+    """Create HTTP server providing metrics in Prometheus text format
+
+    Args:
+        address: listening address (``http://<host>:<port>``)
+        metrics_cb: metrics callback
+        path: metrics url path
+
+    """
+    addr = urllib.parse.urlparse(address)
+
+    server = Server()
+    server._metrics_cb = metrics_cb
+    server._async_group = aio.Group()
+
+    app = aiohttp.web.Application()
+    app.add_routes([aiohttp.web.get(path, server._handler)])
+    runner = aiohttp.web.AppRunner(app)
+    await runner.setup()
+    server.async_group.spawn(aio.call_on_cancel, runner.cleanup)
+
+    try:
+        site = aiohttp.web.TCPSite(runner=runner,
+                                   host=addr.hostname,
+                                   port=addr.port,
+                                   shutdown_timeout=0.1,
+                                   reuse_address=True)
+        await site.start()
+
+    except BaseException:
+        await aio.uncancellable(server.async_close())
+        raise
+
+    return server
+
+
+class Server(aio.Resource):
+    """Metrics HTTP server"""
+
+    @property
+    def async_group(self) -> aio.Group:
+        """Async group"""
+        return self._async_group
+
+    async def _handler(self, request):
+        try:
+            text = encode(self._metrics_cb())
+
+        except Exception as e:
+            mlog.error("metrics error: %s", e, exc_info=e)
+            raise aiohttp.web.HTTPInternalServerError()
+
+        return aiohttp.web.Response(body=text.encode('utf-8'),
+                                    headers={'Content-Type': content_type})
+
+
+def encode(metrics: typing.Iterable[json.Data]) -> str:
+    """Encode metrics in Prometheus text exposition format
+
+    Metrics with same name are grouped together. Metrics with type
+    different from type of first metric with same name are skipped.
+
+    """
+    groups = collections.OrderedDict()
+    for metric in metrics:
+        group = groups.get(metric['name'])
+        if group is None:
+            group = metric['description'], metric['type'], collections.deque()
+            groups[metric['name']] = group
+
+        elif group[1] != metric['type']:
+            continue
+
+        group[2].append(metric)
+
+    lines = collections.deque()
+    for name, (description, metric_type, group) in groups.items():
+        if description:
+            lines.append(f'# HELP {name} {_escape_help(description)}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+        for metric in group:
+            labels = metric['labels']
+            value = metric['value']
+
+            if metric_type != 'histogram':
+                lines.append(_encode_sample(name, labels, value))
+                continue
+
+            cumulative = 0
+            bounds = [*value['buckets'], math.inf]
+            for bound, count in zip(bounds, value['counts']):
+                cumulative += count
+                bucket_labels = dict(labels, le=_encode_value(bound))
+                lines.append(_encode_sample(f'{name}_bucket', bucket_labels,
+                                            cumulative))
+
+            lines.append(_encode_sample(f'{name}_sum', labels, value['sum']))
+            lines.append(_encode_sample(f'{name}_count', labels,
+                                        value['count']))
+
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def _encode_sample(name, labels, value):
+    if not labels:
+        return f'{name} {_encode_value(value)}'
+
+    labels_str = ','.join(f'{k}="{_escape_label(str(v))}"'
+                          for k, v in labels.items())
+    return f'{name}{{{labels_str}}} {_encode_value(value)}'
+
+
+def _encode_value(value):
+    if value == math.inf:
+        return '+Inf'
+
+    if value == -math.inf:
+        return '-Inf'
+
+    if isinstance(value, float) and math.isnan(value):
+        return 'NaN'
+
+    return repr(value)
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _escape_label(text):
+    return _escape_help(text).replace('"', '\\"')
@@ -2,11 +2,13 @@
 
 from pathlib import Path
 import asyncio
+import collections
 import enum
 import functools
 import itertools
-import logging
+import logging.handlers
 import time
+import typing
 import urllib
 
 from hat import aio
@@ -14,6 +16,7 @@ from hat import json
 from hat import juggler
 from hat.manager import common
 from hat.manager import devices
+import hat.manager.metrics
 
 
 mlog: logging.Logger = logging.getLogger(__name__)
@@ -23,47 +26,140 @@ ui_path: Path = common.package_path / 'ui'
 """Web ui directory path"""
 
 autoflush_delay: float = 0.2
-"""Juggler autoflush delay"""
+"""Minimal delay between client data synchronizations"""
 
-log_size: int = 100
-"""Max log size"""
+max_flush_delay: float = 5
+"""Maximal delay between client data synchronizations"""
 
 autostart_delay: float = 1
 """Auto start timeout"""
 
+loop_lag_interval: float = 1
+"""Event loop lag measurement interval"""
+
 
 async def create_server(conf: json.Data,
-                        conf_path: Path
+                        conf_path: Path,
+                        ui_enabled: bool = True,
+                        start_devices: bool = False
                         ) -> 'Server':
     """Create server
 
+    If `ui_enabled` is ``False``, web ui server is not created and server
+    functionality is available only with `Server.data` and `Server.call`.
+
+    If `start_devices` is ``True``, configured devices without auto start
+    are started once after creation. Their auto start property is not
+    changed.
+
     Args:
         conf: configuration defined by ``hat://manager/main.yaml#``
         conf_path: configuration file path
+        ui_enabled: enable web ui server
+        start_devices: start configured devices
 
     """
     addr = urllib.parse.urlparse(conf['settings']['ui']['address'])
 
+    history = conf['settings']['log'].get(
+        'history', common.default_settings['log']['history'])
+    metrics = conf['settings'].get(
+        'metrics', common.default_settings['metrics'])
+
     server = Server()
+    server._async_group = aio.Group()
     server._conf_path = conf_path
     server._devices = {}
     server._next_device_ids = (str(i) for i in itertools.count(1))
-    server._data = common.DataStorage({'log': [],
-                                       'devices': {},
-                                       'settings': conf['settings']})
+    server._next_connection_ids = (str(i) for i in itertools.count(1))
+    server._connections = {}
+    server._log_file = None
+    server._metrics = common.Metrics()
+    server._data = common.DataStorage({'devices': {},
+                                       'settings': conf['settings']},
+                                      server._metrics)
+    server._log_history = common.History(server._data, 'log',
+                                         history['size'])
+
+    if history['file']['enabled']:
+        log_file_path = conf_path.parent / history['file']['path']
+        log_file_path.parent.mkdir(parents=True, exist_ok=True)
+        server._log_file = _LogFile(log_file_path,
+                                    history['file']['max_size'],
+                                    history['file']['backup_count'])
+        server.async_group.spawn(aio.call_on_cancel, server._log_file.close)
+
+    server._connections_gauge = server._metrics.gauge(
+        'connections', 'number of active ui connections')
+    server._connections_counter = server._metrics.counter(
+        'connections_total', 'number of accepted ui connections')
+    server._devices_gauge = server._metrics.gauge(
+        'devices', 'number of devices')
+    server._log_counter = server._metrics.counter(
+        'log_entries_total', 'number of log entries')
+    server._loop_lag_gauge = server._metrics.gauge(
+        'event_loop_lag_seconds', 'last measured event loop lag')
+    server._loop_lag_histogram = server._metrics.histogram(
+        'event_loop_lag_duration_seconds', 'event loop lag')
+    server.async_group.spawn(server._loop_lag_loop)
+
+    server._logger = common.Logger()
+    handler = server._logger.register_log_cb(server._on_log)
+    server.async_group.spawn(aio.call_on_cancel, handler.cancel)
 
-    server._srv = await juggler.listen(host=addr.hostname,
+    server._actions = {'set_settings': server._rpc_set_settings,
+                       'save': server._rpc_save,
+                       'add': server._rpc_add,
+                       'remove': server._rpc_remove,
+                       'start': server._rpc_start,
+                       'stop': server._rpc_stop,
+                       'set_name': server._rpc_set_name,
+                       'set_autostart': server._rpc_set_autostart,
+                       'execute': server._rpc_execute,
+                       'execute_batch': server._rpc_execute_batch,
+                       'get_log': server._rpc_get_log,
+                       'get_connections': server._rpc_get_connections,
+                       'get_metrics': server._rpc_get_metrics}
+
+    server._rpc_errors_counters = {
+        name: server._metrics.counter('rpc_errors_total',
+                                      'number of failed rpc calls',
+                                      {'action': name})
+        for name in [*server._actions.keys(), 'set_view']}
+    server._rpc_duration_histograms = {
+        name: server._metrics.histogram('rpc_duration_seconds',
+                                        'rpc call duration',
+                                        {'action': name})
+        for name in [*server._actions.keys(), 'set_view']}
+
+    if ui_enabled:
+        try:
+            srv = await juggler.listen(host=addr.hostname,
                                        port=addr.port,
                                        connection_cb=server._on_connection,
                                        static_dir=ui_path,
-                                       autoflush_delay=autoflush_delay)
+                                       autoflush_delay=None)
 
-    server._logger = common.Logger()
-    handler = server._logger.register_log_cb(server._on_log)
-    server.async_group.spawn(aio.call_on_cancel, handler.cancel)
+        except BaseException:
+            await aio.uncancellable(server.async_close())
+            raise
+
+        server.async_group.spawn(aio.call_on_cancel, srv.async_close)
+        srv.async_group.spawn(aio.call_on_cancel, server.close)
+
+    if metrics['enabled']:
+        try:
+            metrics_srv = await hat.manager.metrics.listen(
+                metrics['address'], server._get_prometheus_metrics)
+
+        except BaseException:
+            await aio.uncancellable(server.async_close())
+            raise
+
+        server.async_group.spawn(aio.call_on_cancel, metrics_srv.async_close)
 
     for device_conf in conf['devices']:
-        server._create_device(device_conf)
+        server._create_device(device_conf, start_devices)
 
     return server
 
@@ -74,49 +170,100 @@ class Server(aio.Resource):
     @property
     def async_group(self) -> aio.Group:
         """Async group"""
-        return self._srv.async_group
+        return self._async_group
+
+    @property
+    def data(self) -> common.DataStorage:
+        """Server state data shared with front-end"""
+        return self._data
+
+    async def call(self,
+                   action: str,
+                   *args: json.Data
+                   ) -> json.Data:
+        """Call RPC action
+
+        All RPC actions available to front-end connections, except
+        connection specific ``set_view``, are supported.
+
+        """
+        fn = self._actions.get(action)
+        if not fn:
+            raise ValueError('invalid action')
+
+        return await self._call_rpc(action, fn, *args)
 
     def _on_log(self, msg):
-        self._data.set('log', [{'timestamp': time.time(),
-                                'message': msg},
-                               *self._data.data['log']][:log_size])
+        entry = {'timestamp': time.time(),
+                 'message': msg}
+
+        self._log_counter.inc()
+
+        if self._log_file:
+            self._log_file.write(entry)
+
+        self._log_history.append(entry)
 
     def _on_connection(self, conn):
+        connection_id = next(self._next_connection_ids)
+        connection = _Connection(self._data)
+        actions = dict(self._actions, set_view=connection.set_view)
         conn = juggler.RpcConnection(conn, {
-            'set_settings': self._rpc_set_settings,
-            'save': self._rpc_save,
-            'add': self._rpc_add,
-            'remove': self._rpc_remove,
-            'start': self._rpc_start,
-            'stop': self._rpc_stop,
-            'set_name': self._rpc_set_name,
-            'set_autostart': self._rpc_set_autostart,
-            'execute': self._rpc_execute})
-        conn.async_group.spawn(self._connection_loop, conn)
-
-    async def _connection_loop(self, conn):
+            name: functools.partial(self._call_rpc, name, action)
+            for name, action in actions.items()})
+        self._connections[connection_id] = connection
+        self._connections_gauge.inc()
+        self._connections_counter.inc()
+        conn.async_group.spawn(self._connection_loop, conn, connection_id,
+                               connection)
+
+    async def _loop_lag_loop(self):
         try:
-            changes = aio.Queue()
-            with self._data.register_change_cb(changes.put_nowait):
-                changes.put_nowait(self._data.data)
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(loop_lag_interval)
+                lag = max(time.monotonic() - start - loop_lag_interval, 0)
+                self._loop_lag_gauge.set(lag)
+                self._loop_lag_histogram.observe(lag)
+
+        except Exception as e:
+            mlog.error("loop lag loop error: %s", e, exc_info=e)
+
+    async def _connection_loop(self, conn, connection_id, connection):
+        try:
+            with self._data.register_changes_cb(connection.on_changes):
                 while True:
-                    data = await changes.get()
-                    conn.set_local_data(data)
+                    await connection.wait_pending()
+
+                    conn.set_local_data(connection.get_data())
+                    start = time.monotonic()
+                    await conn.flush_local_data()
+                    connection.set_flushed(time.monotonic() - start)
+
+                    await asyncio.sleep(connection.flush_delay)
+
+        except ConnectionError:
+            pass
 
         except Exception as e:
             mlog.error("connection loop error: %s", e, exc_info=e)
 
         finally:
+            del self._connections[connection_id]
+            self._connections_gauge.dec()
             conn.close()
 
-    async def _device_loop(self, device_id, conf):
+    async def _device_loop(self, device_id, conf, start):
         device = _ProxyDevice(conf, self._logger)
         try:
             self._devices[device_id] = device
-            on_change = functools.partial(self._data.set,
-                                          ['devices', device_id])
-            with device.data.register_change_cb(on_change):
-                on_change(device.data.data)
+            self._devices_gauge.inc()
+            on_changes = functools.partial(self._data.apply,
+                                           path=['devices', device_id])
+            with device.data.register_changes_cb(on_changes):
+                self._data.set(['devices', device_id], device.data.data)
+                if start and not device.data.get('autostart'):
+                    device.start()
                 await device.wait_closing()
 
         except Exception as e:
@@ -125,16 +272,30 @@ class Server(aio.Resource):
         finally:
             self._data.remove(['devices', device_id])
             del self._devices[device_id]
+            self._devices_gauge.dec()
             await aio.uncancellable(device.async_close())
 
+    async def _call_rpc(self, name, action, *args):
+        start = time.monotonic()
+        try:
+            return await aio.call(action, *args)
+
+        except Exception:
+            self._rpc_errors_counters[name].inc()
+            raise
+
+        finally:
+            self._rpc_duration_histograms[name].observe(
+                time.monotonic() - start)
+
     def _rpc_set_settings(self, path, value):
         self._logger.log(f'configuration change ({path}: {value})')
         self._data.set(['settings', path], value)
 
     def _rpc_save(self):
         conf = dict(common.default_conf,
-                    log=common.get_log_conf(self._data.data['settings']),
-                    settings=self._data.data['settings'],
+                    log=common.get_log_conf(self._data.get('settings')),
+                    settings=self._data.get('settings'),
                     devices=[device.get_conf()
                              for device in self._devices.values()])
         self._conf_path.parent.mkdir(parents=True, exist_ok=True)
@@ -171,12 +332,179 @@ class Server(aio.Resource):
         device = self._devices[device_id]
         return await device.execute(action, *args)
 
-    def _create_device(self, conf):
+    async def _rpc_execute_batch(self, entries):
+        results = collections.deque()
+        for entry in entries:
+            try:
+                device_id, action, args = entry
+                device = self._devices[device_id]
+                result = await device.execute(action, *args)
+                results.append({'success': True,
+                                'result': result})
+
+            except Exception as e:
+                results.append({'success': False,
+                                'error': str(e)})
+
+        return list(results)
+
+    def _rpc_get_log(self, offset, count):
+        if self._log_file and offset + count > self._log_history.count:
+            return self._log_file.read(offset, count)
+
+        return self._log_history.get(offset, count)
+
+    def _rpc_get_connections(self):
+        return {connection_id: connection.get_info()
+                for connection_id, connection in self._connections.items()}
+
+    def _rpc_get_metrics(self):
+        return {'server': self._metrics.to_json(),
+                'devices': {device_id: device.get_metrics()
+                            for device_id, device in self._devices.items()}}
+
+    def _get_prometheus_metrics(self):
+        result = [dict(metric, name=f"hat_manager_{metric['name']}")
+                  for metric in self._metrics.to_json()]
+
+        for device_id, device in self._devices.items():
+            labels = {'device_id': device_id,
+                      'device_type': device.data.get('type'),
+                      'device_name': device.data.get('name')}
+            result.extend(
+                dict(metric,
+                     name=f"hat_manager_device_{metric['name']}",
+                     labels=dict(labels, **metric['labels']))
+                for metric in device.get_metrics())
+
+        return result
+
+    def _create_device(self, conf, start=False):
         device_id = next(self._next_device_ids)
-        self.async_group.spawn(self._device_loop, device_id, conf)
+        self.async_group.spawn(self._device_loop, device_id, conf, start)
         return device_id
 
 
+class _LogFile:
+
+    def __init__(self,
+                 path: Path,
+                 max_size: int,
+                 backup_count: int):
+        self._path = path
+        self._backup_count = backup_count
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_size, backupCount=backup_count,
+            encoding='utf-8')
+
+    def close(self):
+        self._handler.close()
+
+    def write(self, entry: json.Data):
+        record = logging.makeLogRecord({'msg': json.encode(entry)})
+        self._handler.emit(record)
+
+    def read(self,
+             offset: int,
+             count: int
+             ) -> typing.List[json.Data]:
+        self._handler.flush()
+        entries = itertools.islice(self._read_entries(), offset,
+                                   offset + count)
+        return list(entries)
+
+    def _read_entries(self):
+        paths = [self._path,
+                 *(self._path.with_name(f'{self._path.name}.{i}')
+                   for i in range(1, self._backup_count + 1))]
+        for path in paths:
+            if not path.exists():
+                break
+
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+
+            for line in reversed(lines):
+                if line.strip():
+                    yield json.decode(line)
+
+
+class _Connection:
+
+    def __init__(self, data: common.DataStorage):
+        self._data = data
+        self._view = None
+        self._view_data = None
+        self._pending_event = asyncio.Event()
+        self._pending_since = None
+        self._flushing_since = None
+        self._flush_delay = autoflush_delay
+        self._flush_duration = None
+        self._flush_count = 0
+        self._set_pending()
+
+    @property
+    def flush_delay(self) -> float:
+        return self._flush_delay
+
+    def get_info(self) -> json.Data:
+        since = self._flushing_since or self._pending_since
+        return {'view': self._view,
+                'lag': time.monotonic() - since if since else 0,
+                'flush_delay': self._flush_delay,
+                'flush_duration': self._flush_duration,
+                'flush_count': self._flush_count}
+
+    def set_view(self, devices: typing.Optional[json.Data]):
+        if devices is not None and not isinstance(devices, dict):
+            raise ValueError('invalid view')
+
+        self._view = devices
+        self._view_data = (
+            common.DataStorage(_get_view_data(self._data.data, devices))
+            if devices is not None else None)
+        self._set_pending()
+
+    def on_changes(self, changes: typing.List[common.DataChange]):
+        if self._view_data is not None:
+            changes = list(_get_view_changes(changes, self._view))
+            if not changes:
+                return
+
+            self._view_data.apply(changes)
+
+        self._set_pending()
+
+    async def wait_pending(self):
+        await self._pending_event.wait()
+
+    def get_data(self) -> json.Data:
+        self._pending_event.clear()
+        self._flushing_since = self._pending_since
+        self._pending_since = None
+        return (self._view_data.data if self._view_data is not None
+                else self._data.data)
+
+    def set_flushed(self, duration: float):
+        self._flushing_since = None
+        self._flush_duration = duration
+        self._flush_count += 1
+
+        if duration > self._flush_delay:
+            self._flush_delay = min(max(self._flush_delay * 2, duration),
+                                    max_flush_delay)
+
+        else:
+            self._flush_delay = max(self._flush_delay / 2, autoflush_delay)
+
+    def _set_pending(self):
+        if self._pending_event.is_set():
+            return
+
+        self._pending_since = time.monotonic()
+        self._pending_event.set()
+
+
 class _Status(enum.Enum):
     STOPPED = 'stopped'
     STARTING = 'starting'
@@ -194,6 +522,16 @@ class _ProxyDevice(aio.Resource):
         self._run_subgroup = self.async_group.create_subgroup()
         self._autostart_subgroup = self.async_group.create_subgroup()
 
+        self._metrics = common.Metrics()
+        self._starts_counter = self._metrics.counter(
+            'starts_total', 'number of device starts')
+        self._status_gauges = {
+            status: self._metrics.gauge('status', 'current device status',
+                                        {'status': status.value})
+            for status in _Status}
+        self._status_gauges[_Status.STOPPED].set(1)
+        self._execute_duration_histograms = {}
+
         device_logger = common.Logger()
         handler = device_logger.register_log_cb(self._log)
         self._async_group.spawn(aio.call_on_cancel, handler.cancel)
@@ -205,15 +543,15 @@ class _ProxyDevice(aio.Resource):
                                          'status': _Status.STOPPED.value,
                                          'data': self._device.data.data})
 
-        on_change = functools.partial(self._data.set, 'data')
-        handler = self._device.data.register_change_cb(on_change)
+        on_changes = functools.partial(self._data.apply, path='data')
+        handler = self._device.data.register_changes_cb(on_changes)
         self._async_group.spawn(aio.call_on_cancel, handler.cancel)
 
         self._log('device created')
         self._async_group.spawn(aio.call_on_cancel, self._log,
                                 'removing device')
 
-        if self._data.data['autostart']:
+        if self._data.get('autostart'):
             self._run_autostart()
 
     @property
@@ -226,9 +564,14 @@ class _ProxyDevice(aio.Resource):
 
     def get_conf(self) -> json.Data:
         return dict(self._device.get_conf(),
-                    type=self._data.data['type'],
-                    name=self._data.data['name'],
-                    autostart=self._data.data['autostart'])
+                    type=self._data.get('type'),
+                    name=self._data.get('name'),
+                    autostart=self._data.get('autostart'))
+
+    def get_metrics(self) -> json.Data:
+        device_metrics = self._device.metrics
+        return [*self._metrics.to_json(),
+                *(device_metrics.to_json() if device_metrics else [])]
 
     def start(self):
         previous = self._run_subgroup
@@ -244,7 +587,7 @@ class _ProxyDevice(aio.Resource):
         self._data.set('name', name)
 
     def set_autostart(self, autostart: bool):
-        previous_autostart = self._data.data['autostart']
+        previous_autostart = self._data.get('autostart')
         if previous_autostart == autostart:
             return
 
@@ -260,10 +603,27 @@ class _ProxyDevice(aio.Resource):
                       action: str,
                       *args: json.Data
                       ) -> json.Data:
-        return await self._device.execute(action, *args)
+        histogram = self._execute_duration_histograms.get(action)
+        if histogram is None:
+            histogram = self._metrics.histogram(
+                'execute_duration_seconds', 'device action execution duration',
+                {'action': action})
+            self._execute_duration_histograms[action] = histogram
+
+        start = time.monotonic()
+        try:
+            return await self._device.execute(action, *args)
+
+        finally:
+            histogram.observe(time.monotonic() - start)
 
     def _log(self, msg):
-        self._logger.log(f"{self._data.data['name']}: {msg}")
+        self._logger.log(f"{self._data.get('name')}: {msg}")
+
+    def _set_status(self, status):
+        for i, gauge in self._status_gauges.items():
+            gauge.set(1 if i == status else 0)
+        self._data.set('status', status.value)
 
     async def _run(self, previous_subgroup, current_subgroup):
         resource = None
@@ -272,11 +632,12 @@ class _ProxyDevice(aio.Resource):
             del previous_subgroup
 
             self._log('starting')
-            self._data.set('status', _Status.STARTING.value)
+            self._starts_counter.inc()
+            self._set_status(_Status.STARTING)
 
             resource = await self._device.create()
 
-            self._data.set('status', _Status.STARTED.value)
+            self._set_status(_Status.STARTED)
             self._log('started')
 
             await resource.wait_closing()
@@ -301,16 +662,16 @@ class _ProxyDevice(aio.Resource):
             await previous_subgroup.async_close()
             del previous_subgroup
 
-            if self._data.data['status'] == _Status.STOPPED.value:
+            if self._data.get('status') == _Status.STOPPED.value:
                 self.start()
             queue = aio.Queue()
-            with self._data.register_change_cb(queue.put_nowait):
+            with self._data.register_changes_cb(queue.put_nowait):
                 while True:
-                    state = await queue.get_until_empty()
-                    if state['status'] != _Status.STOPPED.value:
+                    await queue.get_until_empty()
+                    if self._data.get('status') != _Status.STOPPED.value:
                         continue
                     await asyncio.sleep(autostart_delay)
-                    if self._data.data['status'] != _Status.STOPPED.value:
+                    if self._data.get('status') != _Status.STOPPED.value:
                         continue
                     self.start()
 
@@ -323,8 +684,84 @@ class _ProxyDevice(aio.Resource):
     async def _close_resource(self, resource):
         if resource:
             self._log('stopping')
-            self._data.set('status', _Status.STOPPING.value)
+            self._set_status(_Status.STOPPING)
             await resource.async_close()
 
-        self._data.set('status', _Status.STOPPED.value)
+        self._set_status(_Status.STOPPED)
         self._log('stopped')
+
+
+def _get_view_data(data, view):
+    devices = {device_id: _get_device_view_data(device_id, device, view)
+               for device_id, device in (data.get('devices') or {}).items()}
+    return dict(data, devices=devices)
+
+
+def _get_device_view_data(device_id, device, view):
+    if not isinstance(device, dict):
+        return device
+
+    if device_id not in view:
+        return dict(device, data=None)
+
+    return dict(device, data=_get_device_data_view_data(device_id,
+                                                        device.get('data'),
+                                                        view))
+
+
+def _get_device_data_view_data(device_id, data, view):
+    keys = view[device_id]
+    if keys is None or not isinstance(data, dict):
+        return data
+
+    return {key: data[key] for key in keys if key in data}
+
+
+def _get_view_changes(changes, view):
+    for change in changes:
+        path = change.path
+
+        if not path:
+            if change.removed:
+                yield change
+            else:
+                yield change._replace(
+                    new_value=_get_view_data(change.new_value, view))
+
+        elif path[0] != 'devices':
+            yield change
+
+        elif len(path) == 1:
+            if change.removed:
+                yield change
+            else:
+                yield change._replace(
+                    new_value=_get_view_data({'devices': change.new_value},
+                                             view)['devices'])
+
+        elif len(path) == 2:
+            if change.removed:
+                yield change
+            else:
+                yield change._replace(
+                    new_value=_get_device_view_data(path[1],
+                                                    change.new_value,
+                                                    view))
+
+        elif path[2] != 'data':
+            yield change
+
+        elif path[1] not in view:
+            continue
+
+        elif len(path) == 3:
+            if change.removed:
+                yield change
+            else:
+                yield change._replace(
+                    new_value=_get_device_data_view_data(path[1],
+                                                         change.new_value,
+                                                         view))
+
+        elif view[path[1]] is None or path[3] in view[path[1]]:
+            yield change
@@ -0,0 +1,25 @@
+import contextlib
+import time
+
+import pytest
+
+from hat import aio
+
+
+def pytest_configure(config):
+    aio.init_asyncio()
+
+
+@pytest.fixture
+def duration(request):
+
+    @contextlib.contextmanager
+    def duration(description, count=1):
+        start = time.perf_counter()
+        yield
+        dt = time.perf_counter() - start
+        print(f'\n{request.node.name} - {description}: '
+              f'{dt:.6f}s total, {dt / count * 1e6:.3f}us per operation, '
+              f'{count / dt:.0f} operations per second')
+
+    return duration
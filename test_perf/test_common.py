@@ -0,0 +1,59 @@
+import itertools
+
+import pytest
+
+from hat import json
+from hat.manager import common
+
+
+def create_data(size):
+    return {'properties': {},
+            'data': {str(i): {'type': 'Single',
+                              'asdu': 1,
+                              'io': i,
+                              'value': 0}
+                     for i in range(size)}}
+
+
+@pytest.mark.parametrize('size', [10, 100, 1000, 10000, 20000, 100000])
+def test_set(duration, size):
+    count = 1000
+    data = create_data(size)
+    storage = common.DataStorage(data)
+    storage.set(['data', '0', 'value'], 0)
+
+    with duration(f'json.set_ (size: {size})', count):
+        for i in range(count):
+            data = json.set_(data, ['data', str(i % size), 'value'], i)
+
+    with duration(f'DataStorage.set (size: {size})', count):
+        for i in range(count):
+            storage.set(['data', str(i % size), 'value'], i)
+
+    with duration(f'DataStorage.data (size: {size})', count):
+        for i in range(count):
+            storage.set(['data', str(i % size), 'value'], i)
+            storage.data
+
+    assert storage.data == data
+
+
+@pytest.mark.parametrize('size', [100, 1000, 10000])
+def test_history(duration, size):
+    count = 10000
+    entry = {'type': 'Single', 'asdu': 1, 'io': 1, 'value': 0}
+
+    storage = common.DataStorage({'data': []})
+    with duration(f'list rebuild (size: {size})', count):
+        for _ in range(count):
+            data = itertools.chain([entry], storage.get('data'))
+            data = itertools.islice(data, size)
+            storage.set('data', list(data))
+
+    storage = common.DataStorage({})
+    history = common.History(storage, 'data', size)
+    with duration(f'History.append (size: {size})', count):
+        for _ in range(count):
+            history.append(entry)
+
+    assert history.count == min(size, count)
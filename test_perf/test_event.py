@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from hat import aio
+from hat import chatter
+from hat import util
+from hat.manager import common
+import hat.event.common
+import hat.manager.devices.event
+
+
+@pytest.fixture
+def addr():
+    port = util.get_unused_tcp_port()
+    return f'tcp+sbs://127.0.0.1:{port}'
+
+
+def create_event(event_type, payload_data):
+    event_id = hat.event.common.EventId(1, 1, 1)
+    timestamp = hat.event.common.now()
+    payload = hat.event.common.EventPayload(
+        type=hat.event.common.EventPayloadType.JSON,
+        data=payload_data)
+    return hat.event.common.Event(event_id=event_id,
+                                  event_type=event_type,
+                                  timestamp=timestamp,
+                                  source_timestamp=None,
+                                  payload=payload)
+
+
+@pytest.mark.parametrize('type_count', [10, 1000, 10000])
+@pytest.mark.parametrize('batch_size', [1, 100])
+async def test_receive(duration, addr, type_count, batch_size):
+    batch_count = 100
+    connection_queue = aio.Queue()
+    srv = await chatter.listen(hat.event.common.sbs_repo, addr,
+                               connection_queue.put_nowait)
+
+    device = hat.manager.devices.event.Device({'address': addr},
+                                              common.Logger())
+    client = await device.create()
+    conn = await connection_queue.get()
+
+    await conn.receive()
+    msg = await conn.receive()
+    events = [create_event(('a', str(i)), i) for i in range(type_count)]
+    conn.send(chatter.Data('HatEventer', 'MsgQueryRes',
+                           [hat.event.common.event_to_sbs(event)
+                            for event in events]),
+              conv=msg.conv)
+
+    while len(device.data.get('latest')) < type_count:
+        await asyncio.sleep(0.01)
+
+    received = asyncio.Event()
+    received_count = 0
+
+    def on_changes(changes):
+        nonlocal received_count
+        received_count += 1
+        if received_count == batch_count:
+            received.set()
+
+    batches = [[hat.event.common.event_to_sbs(
+                    create_event(('a', str((i * batch_size + j) % type_count)),
+                                 j))
+                for j in range(batch_size)]
+               for i in range(batch_count)]
+
+    with device.data.register_changes_cb(on_changes):
+        with duration(f'receive {batch_size} events '
+                      f'(types: {type_count})', batch_count):
+            for batch in batches:
+                conn.send(chatter.Data('HatEventer', 'MsgNotify', batch))
+            await received.wait()
+
+    await client.async_close()
+    await conn.async_close()
+    await srv.async_close()
@@ -0,0 +1,108 @@
+import pytest
+
+from hat.manager import common
+import hat.manager.devices.iec104
+
+
+def create_slave(size):
+    conf = {'properties': hat.manager.devices.iec104.default_slave_conf,
+            'data': [{'type': 'Scaled',
+                      'asdu': i % 10,
+                      'io': i,
+                      'value': {'Scaled': i % 0x8000},
+                      'quality': {'invalid': False,
+                                  'not_topical': False,
+                                  'substituted': False,
+                                  'blocked': False,
+                                  'overflow': False},
+                      'time': None,
+                      'cause': 'SPONTANEOUS',
+                      'is_test': False}
+                     for i in range(size)],
+            'commands': []}
+    return hat.manager.devices.iec104.Slave(conf, common.Logger())
+
+
+@pytest.mark.parametrize('size', [100, 1000, 10000, 50000])
+def test_interrogate(duration, size):
+    count = 10
+    slave = create_slave(size)
+
+    with duration(f'first interrogate (size: {size})'):
+        result = slave._on_interrogate(None, 0xFFFF)
+
+    assert len(result) == size
+
+    with duration(f'station interrogate (size: {size})', count):
+        for _ in range(count):
+            slave._on_interrogate(None, 0xFFFF)
+
+    with duration(f'asdu interrogate (size: {size})', count):
+        for _ in range(count):
+            slave._on_interrogate(None, 1)
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'jsonl'])
+@pytest.mark.parametrize('size', [1000, 30000])
+async def test_import_points(duration, file_format, size):
+    slave = create_slave(0)
+
+    if file_format == 'csv':
+        text = 'type,asdu,io,value,quality\n' + ''.join(
+            f'Scaled,{i % 10},{i},{i % 0x8000},\n' for i in range(size))
+
+    else:
+        text = ''.join(
+            f'{{"type": "Scaled", "asdu": {i % 10}, "io": {i}, '
+            f'"value": {i % 0x8000}}}\n' for i in range(size))
+
+    with duration(f'import {file_format} (size: {size})', size):
+        result = await slave.execute('import_points', text, file_format)
+
+    assert result['data'] == size
+
+
+@pytest.mark.parametrize('size', [100, 1000, 10000])
+def test_generate(duration, size):
+    count = 10
+    slave = create_slave(size)
+    generator = common.Generator({'type': 'counter'})
+    due = [(data_id, generator) for data_id in slave.data.get('data')]
+    batches = []
+    slave._data_notify_cbs.register(batches.append)
+
+    with duration(f'generate (size: {size})', count):
+        for _ in range(count):
+            slave._generate(due)
+
+    assert len(batches) == count
+    assert all(len(batch) == size for batch in batches)
+
+
+@pytest.mark.parametrize('points', [100, 10000])
+@pytest.mark.parametrize('size', [100, 1000])
+def test_add_data(duration, points, size):
+    count = 100
+    master = hat.manager.devices.iec104.Master(
+        hat.manager.devices.iec104.default_master_conf, common.Logger())
+    batches = [[hat.manager.devices.iec104._data_from_json({
+                    'type': 'Scaled',
+                    'asdu': i % 10,
+                    'io': i % points,
+                    'value': {'Scaled': i % 0x8000},
+                    'quality': {'invalid': False,
+                                'not_topical': False,
+                                'substituted': False,
+                                'blocked': False,
+                                'overflow': False},
+                    'time': None,
+                    'cause': 'SPONTANEOUS',
+                    'is_test': False})
+                for i in range(j * size, (j + 1) * size)]
+               for j in range(count)]
+
+    with duration(f'add data (points: {points}, size: {size})', count):
+        for batch in batches:
+            master._add_data(batch)
+
+    assert len(master.data.get('points')) == min(points, size * count)
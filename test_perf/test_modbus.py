@@ -0,0 +1,76 @@
+import pytest
+
+from hat.drivers import modbus
+from hat.manager import common
+import hat.manager.devices.modbus
+from hat.manager.devices.modbus import ReadPoint, plan_reads
+
+
+def create_slave(size):
+    conf = {'properties': hat.manager.devices.modbus.default_slave_conf,
+            'data': [{'device_id': 1,
+                      'data_type': 'HOLDING_REGISTER',
+                      'address': i,
+                      'value': i % 0x10000}
+                     for i in range(size)]}
+    return hat.manager.devices.modbus.Slave(conf, common.Logger())
+
+
+@pytest.mark.parametrize('size', [100, 1000, 10000, 50000])
+def test_read(duration, size):
+    count = 1000
+    quantity = 125
+    slave = create_slave(size)
+
+    with duration(f'read {quantity} registers (size: {size})', count):
+        for i in range(count):
+            start_address = (i * quantity) % size
+            slave._on_read(None, 1, modbus.DataType.HOLDING_REGISTER,
+                           start_address, quantity)
+
+
+@pytest.mark.parametrize('size', [100, 1000, 10000, 50000])
+def test_write(duration, size):
+    count = 1000
+    quantity = 10
+    slave = create_slave(size)
+    values = list(range(quantity))
+
+    with duration(f'write {quantity} registers (size: {size})', count):
+        for i in range(count):
+            start_address = (i * quantity) % size
+            slave._on_write(None, 1, modbus.DataType.HOLDING_REGISTER,
+                            start_address, values)
+
+
+@pytest.mark.parametrize('size', [100, 1000, 10000, 50000])
+async def test_generate(duration, size):
+    count = 10
+    slave = create_slave(size)
+    generator_id = await slave.execute('add_range_generator')
+    await slave.execute('change_range_generator', generator_id,
+                        'quantity', size)
+    due = list(slave._generators.generators.items())
+    changes = []
+    slave.data.register_changes_cb(changes.append)
+
+    with duration(f'generate range (size: {size})', count):
+        for _ in range(count):
+            slave._generate(due)
+
+    assert len(changes) == count
+    assert all(len(i) == size for i in changes)
+
+
+@pytest.mark.parametrize('max_gap', [0, 10])
+@pytest.mark.parametrize('size', [1000, 10000, 50000])
+def test_plan_reads(duration, size, max_gap):
+    count = 10
+    points = [ReadPoint(1 + i % 5, 'HOLDING_REGISTER', (i * 7) % 0x10000)
+              for i in range(size)]
+
+    with duration(f'plan reads (size: {size}; max gap: {max_gap})', count):
+        for _ in range(count):
+            requests = plan_reads(points, max_gap)
+
+    assert sum(i.quantity for i in requests) >= len(set(points))
@@ -0,0 +1,342 @@
+import asyncio
+import itertools
+import multiprocessing
+import time
+
+import pytest
+
+from hat import aio
+from hat import json
+from hat import juggler
+from hat import util
+from hat.manager import common
+import hat.manager.devices
+import hat.manager.server
+
+
+@pytest.fixture
+def port():
+    return util.get_unused_tcp_port()
+
+
+@pytest.fixture
+def addr(port):
+    return f'ws://127.0.0.1:{port}/ws'
+
+
+@pytest.fixture
+def settings(port):
+    return {'ui': {'address': f'http://127.0.0.1:{port}'},
+            'log': {'level': 'DEBUG',
+                    'syslog': {'enabled': False,
+                               'host': '127.0.0.1',
+                               'port': 6514},
+                    'console': {'enabled': False}}}
+
+
+@pytest.fixture
+def conf_path(tmp_path):
+    return tmp_path / 'manager.json'
+
+
+@pytest.fixture
+def patch_devices(monkeypatch):
+    devices = []
+
+    def create_device(conf, logger):
+        device = Device(conf)
+        devices.append(device)
+        return device
+
+    monkeypatch.setattr(hat.manager.devices, 'create_device', create_device)
+    return devices
+
+
+class Device(common.Device):
+
+    def __init__(self, conf):
+        self._conf = conf
+        self._data = common.DataStorage(
+            {'data': {str(i): {'value': 0}
+                      for i in range(conf['point_count'])}})
+
+    @property
+    def data(self):
+        return self._data
+
+    def get_conf(self):
+        return self._conf
+
+    async def create(self):
+        return aio.Group()
+
+    async def execute(self, action, *args):
+        pass
+
+
+class Client:
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._data = None
+        self._bytes = 0
+        self._change_queue = aio.Queue()
+        conn.register_change_cb(self._on_change)
+
+    @property
+    def conn(self):
+        return self._conn
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    async def wait_value(self, path, value):
+        while json.get(self._conn.remote_data, path) != value:
+            await self._change_queue.get()
+
+    def _on_change(self):
+        diff = json.diff(self._data, self._conn.remote_data)
+        self._bytes += len(json.encode(diff))
+        self._data = self._conn.remote_data
+        self._change_queue.put_nowait(None)
+
+
+@pytest.mark.parametrize('device_count', [10, 30])
+@pytest.mark.parametrize('point_count', [100, 1000])
+@pytest.mark.parametrize('client_count', [1, 5])
+async def test_bytes_per_client(settings, conf_path, addr, patch_devices,
+                                device_count, point_count, client_count):
+    change_count = 100
+    conf = {'settings': settings,
+            'devices': [{'type': 'device',
+                         'name': f'device {i}',
+                         'autostart': False,
+                         'point_count': point_count}
+                        for i in range(device_count)]}
+    srv = await hat.manager.server.create_server(conf, conf_path)
+
+    full_clients = []
+    view_clients = []
+    for _ in range(client_count):
+        conn = juggler.RpcConnection(await juggler.connect(addr))
+        full_clients.append(Client(conn))
+
+        conn = juggler.RpcConnection(await juggler.connect(addr))
+        view_clients.append(Client(conn))
+        await conn.call('set_view', {'1': None})
+
+    clients = [*full_clients, *view_clients]
+    for client in clients:
+        await client.wait_value(['devices', str(device_count), 'name'],
+                                f'device {device_count - 1}')
+
+    initial_full_bytes = [client.bytes for client in full_clients]
+    initial_view_bytes = [client.bytes for client in view_clients]
+
+    for i in range(change_count):
+        device = patch_devices[i % device_count]
+        device.data.set(['data', str(i % point_count), 'value'], i + 1)
+        await asyncio.sleep(0)
+
+    last = change_count - 1
+    for client in full_clients:
+        await client.wait_value(['devices', str(last % device_count + 1),
+                                 'data', str(last % point_count), 'value'],
+                                last + 1)
+
+    last = (change_count - 1) // device_count * device_count
+    for client in view_clients:
+        await client.wait_value(['devices', '1',
+                                 'data', str(last % point_count), 'value'],
+                                last + 1)
+
+    full_bytes = sum(client.bytes for client in full_clients)
+    view_bytes = sum(client.bytes for client in view_clients)
+    print(f'\ndevices: {device_count}; points: {point_count}; '
+          f'clients: {client_count}\n'
+          f'initial bytes per client: '
+          f'full={sum(initial_full_bytes) / client_count:.0f} '
+          f'view={sum(initial_view_bytes) / client_count:.0f}\n'
+          f'total bytes per client: '
+          f'full={full_bytes / client_count:.0f} '
+          f'view={view_bytes / client_count:.0f}')
+
+    for client in clients:
+        await client.conn.async_close()
+    await srv.async_close()
+
+
+def run_server(conf, conf_path, autoflush_delay, change_rate, change_count,
+               pipe):
+    aio.init_asyncio()
+    aio.run_asyncio(_run_server(conf, conf_path, autoflush_delay,
+                                change_rate, change_count, pipe))
+
+
+async def _run_server(conf, conf_path, autoflush_delay, change_rate,
+                      change_count, pipe):
+    devices = []
+
+    def create_device(conf, logger):
+        device = Device(conf)
+        devices.append(device)
+        return device
+
+    hat.manager.devices.create_device = create_device
+    hat.manager.server.autoflush_delay = autoflush_delay
+
+    loop = asyncio.get_running_loop()
+    executor = aio.create_executor()
+    srv = await hat.manager.server.create_server(conf, conf_path)
+
+    try:
+        pipe.send('ready')
+        await executor(pipe.recv)
+
+        point_count = conf['devices'][0]['point_count']
+        tick = 0.01
+        start_cpu = time.process_time()
+        start = loop.time()
+
+        for i in range(change_count):
+            if i % max(int(change_rate * tick), 1) == 0:
+                await asyncio.sleep(max(
+                    start + i / change_rate - loop.time(), 0))
+
+            device = devices[i % len(devices)]
+            point = (i // len(devices)) % point_count
+            device.data.set(['data', str(point), 'value'], time.time())
+
+        await executor(pipe.recv)
+        pipe.send(time.process_time() - start_cpu)
+
+    finally:
+        await srv.async_close()
+
+
+class LatencyClient:
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._data = None
+        self._latencies = []
+        self._initial_event = asyncio.Event()
+        self._count_event = asyncio.Event()
+        self._count = None
+        conn.register_change_cb(self._on_change)
+
+    @property
+    def conn(self):
+        return self._conn
+
+    @property
+    def latencies(self):
+        return self._latencies
+
+    async def wait_initial(self):
+        await self._initial_event.wait()
+
+    async def wait_count(self, count):
+        self._count = count
+        if len(self._latencies) < count:
+            await self._count_event.wait()
+
+    def _on_change(self):
+        now = time.time()
+        remote_data = self._conn.remote_data
+        if not self._initial_event.is_set():
+            if remote_data and remote_data.get('devices'):
+                self._initial_event.set()
+                self._data = remote_data
+            return
+
+        for op in json.diff(self._data, remote_data):
+            if op['op'] == 'replace' and op['path'].endswith('/value'):
+                self._latencies.append(now - op['value'])
+
+            elif op['op'] in ('add', 'replace'):
+                self._latencies.extend(
+                    now - i for i in _get_timestamps(op['value']))
+
+        self._data = remote_data
+        if self._count is not None and len(self._latencies) >= self._count:
+            self._count_event.set()
+
+
+def _get_timestamps(data):
+    if isinstance(data, float):
+        yield data
+
+    elif isinstance(data, dict):
+        for i in data.values():
+            yield from _get_timestamps(i)
+
+    elif isinstance(data, list):
+        for i in data:
+            yield from _get_timestamps(i)
+
+
+@pytest.mark.parametrize('autoflush_delay', [0.2, 0])
+@pytest.mark.parametrize('device_count', [10, 100])
+@pytest.mark.parametrize('client_count', [1, 10])
+@pytest.mark.parametrize('change_rate', [1000, 10000])
+async def test_propagation(settings, conf_path, addr, autoflush_delay,
+                           device_count, client_count, change_rate):
+    point_count = 1000
+    change_count = min(change_rate * 2, device_count * point_count)
+    conf = {'settings': settings,
+            'devices': [{'type': 'device',
+                         'name': f'device {i}',
+                         'autostart': False,
+                         'point_count': point_count}
+                        for i in range(device_count)]}
+
+    context = multiprocessing.get_context('spawn')
+    pipe, child_pipe = context.Pipe()
+    process = context.Process(target=run_server,
+                              args=(conf, conf_path, autoflush_delay,
+                                    change_rate, change_count, child_pipe))
+    process.start()
+    child_pipe.close()
+    executor = aio.create_executor()
+
+    try:
+        assert await executor(pipe.recv) == 'ready'
+
+        clients = []
+        for _ in range(client_count):
+            conn = juggler.RpcConnection(await juggler.connect(addr))
+            client = LatencyClient(conn)
+            await client.wait_initial()
+            clients.append(client)
+
+        start = time.perf_counter()
+        pipe.send('start')
+
+        for client in clients:
+            await asyncio.wait_for(client.wait_count(change_count), 60)
+        dt = time.perf_counter() - start
+
+        pipe.send('stop')
+        cpu = await executor(pipe.recv)
+
+        latencies = sorted(itertools.chain.from_iterable(
+            client.latencies for client in clients))
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) * 99 // 100, len(latencies) - 1)]
+
+        print(f'\nautoflush delay: {autoflush_delay}; '
+              f'devices: {device_count}; clients: {client_count}; '
+              f'change rate: {change_rate}/s\n'
+              f'throughput: {change_count / dt:.0f} changes/s; '
+              f'latency: p50={p50 * 1e3:.1f}ms p99={p99 * 1e3:.1f}ms; '
+              f'server cpu: {cpu / change_count * 1e6:.1f}us per change')
+
+        for client in clients:
+            await client.conn.async_close()
+
+    finally:
+        process.join(5)
+        if process.is_alive():
+            process.kill()
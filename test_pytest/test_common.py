@@ -0,0 +1,523 @@
+import asyncio
+import random
+
+import pytest
+
+from hat import aio
+from hat import json
+from hat.manager import common
+
+
+def create_changes_queue(data_storage):
+    changes_queue = []
+    data_storage.register_changes_cb(changes_queue.append)
+    return changes_queue
+
+
+def test_data_storage_set():
+    data = common.DataStorage({'a': {'b': 1}})
+    data_queue = []
+    data.register_change_cb(data_queue.append)
+    changes_queue = create_changes_queue(data)
+
+    data.set(['a', 'b'], 2)
+    assert data.data == {'a': {'b': 2}}
+    assert data_queue == [{'a': {'b': 2}}]
+    assert changes_queue == [[common.DataChange(path=['a', 'b'],
+                                                old_value=1,
+                                                new_value=2,
+                                                removed=False)]]
+
+    data.set(['a', ['c', 'd']], 3)
+    assert data.data == {'a': {'b': 2, 'c': {'d': 3}}}
+    assert changes_queue[-1] == [common.DataChange(path=['a', 'c', 'd'],
+                                                   old_value=None,
+                                                   new_value=3,
+                                                   removed=False)]
+
+
+def test_data_storage_remove():
+    data = common.DataStorage({'a': {'b': 1, 'c': 2}})
+    changes_queue = create_changes_queue(data)
+
+    data.remove(['a', 'b'])
+    assert data.data == {'a': {'c': 2}}
+    assert changes_queue == [[common.DataChange(path=['a', 'b'],
+                                                old_value=1,
+                                                new_value=None,
+                                                removed=True)]]
+
+
+def test_data_storage_transaction():
+    data = common.DataStorage({})
+    data_queue = []
+    data.register_change_cb(data_queue.append)
+    changes_queue = create_changes_queue(data)
+
+    with data.transaction():
+        data.set('a', 1)
+        with data.transaction():
+            data.set('b', 2)
+            data.remove('a')
+        assert data.data == {'b': 2}
+        assert data_queue == []
+        assert changes_queue == []
+
+    assert data_queue == [{'b': 2}]
+    assert changes_queue == [[
+        common.DataChange(['a'], None, 1, False),
+        common.DataChange(['b'], None, 2, False),
+        common.DataChange(['a'], 1, None, True)]]
+
+    with data.transaction():
+        pass
+
+    assert len(changes_queue) == 1
+
+    with pytest.raises(Exception):
+        with data.transaction():
+            data.set('c', 3)
+            raise Exception()
+
+    assert changes_queue[-1] == [common.DataChange(['c'], None, 3, False)]
+
+
+@pytest.mark.parametrize('path', [[], 'x', ['x', 'y']])
+def test_data_storage_apply(path):
+    src = common.DataStorage({'a': 1})
+    dst = common.DataStorage()
+    dst.set(path, src.data)
+    src.register_changes_cb(lambda changes: dst.apply(changes, path))
+
+    src.set('b', [1, 2, 3])
+    src.set(['b', 1], 4)
+    src.remove('a')
+    assert dst.data == json.set_(None, path, src.data)
+
+
+@pytest.mark.parametrize('hash_mask', [(1 << 64) - 1, 0b11])
+@pytest.mark.parametrize('max_pending', [1024, 2])
+@pytest.mark.parametrize('size', [1, 10, 100, 1000])
+def test_data_storage_persistent(monkeypatch, hash_mask, max_pending, size):
+    monkeypatch.setattr(common, '_hamt_hash_mask', hash_mask)
+    monkeypatch.setattr(common, '_map_max_pending', max_pending)
+    rand = random.Random(size)
+    keys = [str(i) for i in range(size)]
+    data = common.DataStorage({'a': {}})
+    expected = {'a': {}}
+    snapshots = []
+
+    for _ in range(size * 3):
+        key = rand.choice(keys)
+        if rand.random() < 0.3:
+            data.remove(['a', key])
+            expected = json.remove(expected, ['a', key])
+
+        elif rand.random() < 0.5:
+            data.set(['a', key, 'value'], rand.random())
+            expected = json.set_(expected, ['a', key, 'value'],
+                                 data.get(['a', key, 'value']))
+
+        else:
+            data.set(['a', key], [key])
+            expected = json.set_(expected, ['a', key], [key])
+
+        assert data.get(['a', key]) == json.get(expected, ['a', key])
+        if rand.random() < 0.1:
+            assert data.data == expected
+            snapshots.append((data.data, expected))
+
+    assert data.data == expected
+    for snapshot, snapshot_expected in snapshots:
+        assert snapshot == snapshot_expected
+
+
+def test_data_storage_metrics():
+    metrics = common.Metrics()
+    data = common.DataStorage({}, metrics)
+    changes_queue = []
+    data.register_changes_cb(changes_queue.append)
+
+    def get_values():
+        return {(i['name'], *i['labels'].values()): i['value']
+                for i in metrics.to_json()}
+
+    data.set('a', 1)
+    data.set('b', 2)
+    data.remove('a')
+    with data.transaction():
+        data.set('c', 3)
+        data.set('d', 4)
+
+    values = get_values()
+    assert len(changes_queue) == 4
+    assert values[('data_modifications_total', 'set')] == 4
+    assert values[('data_modifications_total', 'remove')] == 1
+    assert values[('data_notifications_total',)] == 4
+    assert values[('data_notify_duration_seconds',)]['count'] == 4
+
+    with data.transaction():
+        pass
+
+    values = get_values()
+    assert values[('data_notifications_total',)] == 4
+
+
+def test_history():
+    data = common.DataStorage({})
+    changes_queue = create_changes_queue(data)
+    history = common.History(data, 'x', 3)
+    assert data.data == {'x': {}}
+    assert history.size == 3
+    assert history.count == 0
+
+    history.append(1)
+    history.append(2)
+    assert data.data == {'x': {'1': 1, '2': 2}}
+    assert history.get() == [2, 1]
+
+    changes_queue.clear()
+    history.extend([3, 4])
+    assert data.data == {'x': {'2': 2, '3': 3, '4': 4}}
+    assert history.count == 3
+    assert history.get() == [4, 3, 2]
+    assert history.get(1, 1) == [3]
+    assert changes_queue == [[
+        common.DataChange(['x', '3'], None, 3, False),
+        common.DataChange(['x', '1'], 1, None, True),
+        common.DataChange(['x', '4'], None, 4, False)]]
+
+    history.extend(range(5, 10))
+    assert data.data == {'x': {'5': 7, '6': 8, '7': 9}}
+
+    history.resize(1)
+    assert data.data == {'x': {'7': 9}}
+    assert history.get() == [9]
+
+    history.resize(2)
+    history.append(10)
+    assert data.data == {'x': {'7': 9, '8': 10}}
+
+    history.clear()
+    assert data.data == {'x': {}}
+    assert history.count == 0
+
+    history.resize(0)
+    history.append(11)
+    assert data.data == {'x': {}}
+
+    history.resize(2)
+    history.append(12)
+    for size in [None, 1.5, True, '1']:
+        with pytest.raises(ValueError):
+            history.resize(size)
+        assert history.size == 2
+        assert data.data == {'x': {'9': 12}}
+
+
+def test_metrics():
+    metrics = common.Metrics()
+    assert metrics.to_json() == []
+
+    counter = metrics.counter('c', 'counter', {'x': '1'})
+    assert metrics.counter('c', labels={'x': '1'}) is counter
+    assert metrics.counter('c', labels={'x': '2'}) is not counter
+    counter.inc()
+    counter.inc(2)
+    assert counter.value == 3
+
+    gauge = metrics.gauge('g')
+    gauge.set(5)
+    gauge.dec(2)
+    gauge.inc()
+    assert gauge.value == 4
+
+    with pytest.raises(ValueError):
+        metrics.counter('g')
+
+    histogram = metrics.histogram('h', buckets=[1, 2])
+    for value in [0.5, 1, 1.5, 3]:
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.sum == 6
+
+    assert metrics.to_json() == [
+        {'name': 'c',
+         'description': 'counter',
+         'type': 'counter',
+         'labels': {'x': '1'},
+         'value': 3},
+        {'name': 'c',
+         'description': '',
+         'type': 'counter',
+         'labels': {'x': '2'},
+         'value': 0},
+        {'name': 'g',
+         'description': '',
+         'type': 'gauge',
+         'labels': {},
+         'value': 4},
+        {'name': 'h',
+         'description': '',
+         'type': 'histogram',
+         'labels': {},
+         'value': {'buckets': [1, 2],
+                   'counts': [2, 1, 1],
+                   'count': 4,
+                   'sum': 6}}]
+
+
+@pytest.mark.parametrize('conf', [
+    None,
+    {},
+    {'type': 'abc'},
+    {'type': 'counter', 'interval': 0},
+    {'type': 'counter', 'step': 'x'},
+    {'type': 'counter', 'step': True},
+    {'type': 'ramp', 'min': 2, 'max': 1},
+    {'type': 'sine', 'period': 0},
+    {'type': 'sine', 'period': -1}])
+def test_generator_invalid_conf(conf):
+    with pytest.raises(ValueError):
+        common.Generator(conf)
+
+
+def test_generator():
+    generator = common.Generator({'type': 'counter', 'step': 2})
+    assert generator.conf == {'type': 'counter', 'interval': 1, 'step': 2}
+    assert generator.interval == 1
+    assert generator.generate(1, 0) == 3
+
+    generator = common.Generator({'type': 'ramp', 'min': 1, 'max': 3})
+    values = [0]
+    for _ in range(5):
+        values.append(generator.generate(values[-1], 0))
+    assert values == [0, 1, 2, 3, 1, 2]
+
+    generator = common.Generator({'type': 'toggle'})
+    assert generator.generate(0, 0) == 1
+    assert generator.generate(1, 0) == 0
+
+    generator = common.Generator({'type': 'sine', 'amplitude': 2,
+                                  'offset': 1, 'period': 4})
+    assert generator.generate(0, 0) == pytest.approx(1)
+    assert generator.generate(0, 1) == pytest.approx(3)
+    assert generator.generate(0, 3) == pytest.approx(-1)
+
+    generator = common.Generator({'type': 'random_walk', 'step': 5,
+                                  'min': -1, 'max': 1},
+                                 random.Random(0))
+    value = 0
+    for _ in range(100):
+        new_value = generator.generate(value, 0)
+        assert -1 <= new_value <= 1
+        assert abs(new_value - value) <= 5
+        value = new_value
+
+
+async def test_generator_scheduler():
+    scheduler = common.GeneratorScheduler()
+    fast = common.Generator({'type': 'counter', 'interval': 0.01})
+    slow = common.Generator({'type': 'counter', 'interval': 10})
+    scheduler.set('a', fast)
+    scheduler.set('b', fast)
+    scheduler.set('c', slow)
+    assert scheduler.generators == {'a': fast, 'b': fast, 'c': slow}
+
+    due = await asyncio.wait_for(scheduler.get_due(), 1)
+    assert sorted(due) == [('a', fast), ('b', fast)]
+
+    scheduler.set('b', None)
+    due = await asyncio.wait_for(scheduler.get_due(), 1)
+    assert due == [('a', fast)]
+
+    scheduler.clear()
+    assert scheduler.generators == {}
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(scheduler.get_due(), 0.05)
+
+    scheduler.set('c', fast)
+    due = await asyncio.wait_for(scheduler.get_due(), 1)
+    assert due == [('c', fast)]
+
+
+def test_with_defaults():
+    defaults = {'a': 1, 'b': 2}
+    assert common.with_defaults(None, defaults) == defaults
+    assert common.with_defaults({'b': 3, 'c': 4}, defaults) == {'a': 1,
+                                                                'b': 3,
+                                                                'c': 4}
+    assert defaults == {'a': 1, 'b': 2}
+
+
+def test_get_sorted_values():
+    assert common.get_sorted_values({}) == []
+    assert common.get_sorted_values({'10': 'c', '2': 'b', '1': 'a'}) == [
+        'a', 'b', 'c']
+
+
+@pytest.mark.parametrize('values, q, result', [
+    ([], 0.5, None),
+    ([1], 0.99, 1),
+    ([1, 2, 3, 4], 0, 1),
+    ([1, 2, 3, 4], 0.5, 3),
+    ([1, 2, 3, 4], 1, 4),
+    (list(range(100)), 0.9, 90),
+    (list(range(100)), 0.99, 99)
+])
+def test_get_percentile(values, q, result):
+    assert common.get_percentile(values, q) == result
+
+
+def test_latencies():
+    latencies = common.Latencies(100)
+    assert latencies.to_json() == {'p50': None,
+                                   'p90': None,
+                                   'p99': None,
+                                   'max': None}
+
+    for i in random.sample(range(200), 200):
+        latencies.add(i if i < 100 else 1000 + i)
+    for i in range(100):
+        latencies.add(i)
+
+    assert latencies.to_json() == {'p50': 50,
+                                   'p90': 90,
+                                   'p99': 99,
+                                   'max': 99}
+
+
+async def test_load_runner():
+    runner = common.LoadRunner()
+    task = runner.async_group.spawn(asyncio.sleep, 10)
+    assert runner.is_open
+
+    await asyncio.wait_for(runner.async_close(), 1)
+    assert runner.is_closed
+    assert task.cancelled()
+
+
+def create_periodic_jobs(metrics=None):
+    data = common.DataStorage({'stats': {}})
+    jobs = common.PeriodicJobs(data, 'stats', common.Logger(), 'job',
+                               metrics, 'job')
+    return data, jobs
+
+
+async def wait_periodic_stats(data, jobs, job_id, key, count=1):
+    while True:
+        jobs.update_stats()
+        stats = data.get(['stats', job_id])
+        if stats and stats[key] >= count:
+            return stats
+        await asyncio.sleep(0.01)
+
+
+async def test_periodic_jobs():
+    metrics = common.Metrics()
+    data, jobs = create_periodic_jobs(metrics)
+    group = aio.Group()
+    results = []
+
+    async def fn():
+        results.append(len(results))
+        if len(results) == 2:
+            raise Exception('abc')
+        if len(results) == 3:
+            await asyncio.Future()
+        return results[-1]
+
+    jobs.start(group, 'a', 0.01, 0.05, fn, labels={'job': 'a'})
+    assert jobs.job_ids == ['a']
+
+    stats = await wait_periodic_stats(data, jobs, 'a', 'count', 4)
+    assert stats['failures'] == 1
+    assert stats['timeouts'] == 1
+    assert stats['overruns'] >= 4
+    assert stats['last_result'] == 'OK'
+
+    values = {i['name']: i['value'] for i in metrics.to_json()
+              if i['labels'] == {'job': 'a'}}
+    assert values['job_failures_total'] == 1
+    assert values['job_timeouts_total'] == 1
+    assert values['job_overruns_total'] >= 4
+    assert values['job_duration_seconds']['count'] >= 4
+    assert values['job_cycle_seconds']['count'] >= 3
+
+    jobs.stop('a')
+    await asyncio.sleep(0.02)
+    count = len(results)
+    await asyncio.sleep(0.05)
+    assert len(results) == count
+    assert jobs.job_ids == ['a']
+
+    jobs.reset_stats()
+    assert data.get(['stats', 'a', 'count']) == 0
+
+    jobs.start(group, 'a', 0.01, 1, fn)
+    await wait_periodic_stats(data, jobs, 'a', 'count')
+
+    jobs.remove('a')
+    jobs.update_stats()
+    assert jobs.job_ids == []
+    assert data.get('stats') == {}
+
+    await group.async_close()
+
+
+async def test_periodic_jobs_connection_error():
+    data, jobs = create_periodic_jobs()
+    group = aio.Group()
+    results = []
+
+    async def fn():
+        results.append(None)
+        raise ConnectionError()
+
+    jobs.start(group, 'a', 0.01, 1, fn)
+    await asyncio.sleep(0.05)
+    assert len(results) == 1
+
+    jobs.update_stats()
+    assert data.get(['stats', 'a', 'count']) == 0
+
+    await group.async_close()
+
+
+async def test_periodic_jobs_stats():
+
+    class Stats(common.PeriodicStats):
+
+        def reset(self):
+            super().reset()
+            self.starts = 0
+            self.values = []
+
+        def add_start(self, jitter, cycle):
+            self.starts += 1
+
+        def add_result(self, duration, result):
+            super().add_result(duration, result)
+            self.values.append(result)
+
+        def to_json(self):
+            return {**super().to_json(),
+                    'starts': self.starts,
+                    'values': self.values}
+
+    data, jobs = create_periodic_jobs()
+    group = aio.Group()
+    group.spawn(jobs.stats_loop, 0.01)
+
+    async def fn():
+        return 42
+
+    jobs.start(group, 'a', 0.01, 1, fn, Stats)
+    while (data.get(['stats', 'a', 'count']) or 0) < 2:
+        await asyncio.sleep(0.01)
+
+    stats = data.get(['stats', 'a'])
+    assert stats['starts'] >= stats['count']
+    assert set(stats['values']) == {42}
+
+    await group.async_close()
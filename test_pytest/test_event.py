@@ -59,6 +59,10 @@ def create_change_queue(data_storage, path):
     return queue
 
 
+def get_changes(changes):
+    return [changes[i] for i in sorted(changes.keys(), key=int, reverse=True)]
+
+
 def create_register_event(event_type, payload_data, with_payload=True):
     if with_payload:
         payload = hat.event.common.EventPayload(
@@ -185,7 +189,7 @@ async def test_query(addr, server):
     conn = await server.connection_queue.get()
 
     latest = await latest_queue.get()
-    assert latest == []
+    assert latest == {}
 
     msg = await conn.receive()
     assert msg.first is True
@@ -207,7 +211,7 @@ async def test_query(addr, server):
     conn.send(chatter.Data('HatEventer', 'MsgQueryRes', data),
               conv=msg.conv)
 
-    latest = await latest_queue.get()
+    latest = list((await latest_queue.get()).values())
     assert len(events) == len(latest)
 
     events = sorted(events, key=lambda i: i.event_type)
@@ -231,7 +235,7 @@ async def test_latest(addr, server):
     conn = await server.connection_queue.get()
 
     latest = await latest_queue.get()
-    assert latest == []
+    assert latest == {}
 
     msg = await conn.receive()
     assert msg.first is True
@@ -255,7 +259,7 @@ async def test_latest(addr, server):
     conn.send(chatter.Data('HatEventer', 'MsgNotify', data),
               conv=msg.conv)
 
-    latest = await latest_queue.get()
+    latest = list((await latest_queue.get()).values())
     assert len(latest) == 1
 
     data = util.first(latest, lambda i: i['event_type'] == ['a', 'b', 'c'])
@@ -267,7 +271,7 @@ async def test_latest(addr, server):
     conn.send(chatter.Data('HatEventer', 'MsgNotify', data),
               conv=msg.conv)
 
-    latest = await latest_queue.get()
+    latest = list((await latest_queue.get()).values())
     assert len(latest) == 2
 
     data = util.first(latest, lambda i: i['event_type'] == ['a', 'b', 'c'])
@@ -282,7 +286,7 @@ async def test_latest(addr, server):
     conn.send(chatter.Data('HatEventer', 'MsgNotify', data),
               conv=msg.conv)
 
-    latest = await latest_queue.get()
+    latest = list((await latest_queue.get()).values())
     assert len(latest) == 2
 
     data = util.first(latest, lambda i: i['event_type'] == ['a', 'b', 'c'])
@@ -303,7 +307,7 @@ async def test_changes(addr, server):
     conn = await server.connection_queue.get()
 
     changes = await changes_queue.get()
-    assert changes == []
+    assert changes == {}
 
     msg = await conn.receive()
     assert msg.first is True
@@ -327,7 +331,7 @@ async def test_changes(addr, server):
     conn.send(chatter.Data('HatEventer', 'MsgNotify', data),
               conv=msg.conv)
 
-    changes = await changes_queue.get()
+    changes = get_changes(await changes_queue.get())
     assert len(changes) == 1
 
     data = changes[0]
@@ -340,7 +344,7 @@ async def test_changes(addr, server):
     conn.send(chatter.Data('HatEventer', 'MsgNotify', data),
               conv=msg.conv)
 
-    changes = await changes_queue.get()
+    changes = get_changes(await changes_queue.get())
     assert len(changes) == 2
 
     data = changes[0]
@@ -357,7 +361,7 @@ async def test_changes(addr, server):
     conn.send(chatter.Data('HatEventer', 'MsgNotify', data),
               conv=msg.conv)
 
-    changes = await changes_queue.get()
+    changes = get_changes(await changes_queue.get())
     assert len(changes) == 3
 
     data = changes[0]
@@ -373,3 +377,45 @@ async def test_changes(addr, server):
     assert data['payload'] == 1
 
     await client.async_close()
+
+
+async def test_changes_size(addr, server):
+    conf = {'address': addr,
+            'changes_size': 2}
+    logger = common.Logger()
+    device = hat.manager.devices.event.Device(conf, logger)
+    assert device.get_conf()['changes_size'] == 2
+
+    changes_queue = create_change_queue(device.data, 'changes')
+    client = await device.create()
+    conn = await server.connection_queue.get()
+
+    changes = await changes_queue.get()
+    assert changes == {}
+
+    await conn.receive()
+    msg = await conn.receive()
+    conn.send(chatter.Data('HatEventer', 'MsgQueryRes', []),
+              conv=msg.conv)
+
+    events = [create_event(('a', str(i)), i) for i in range(3)]
+    data = [hat.event.common.event_to_sbs(event)
+            for event in events]
+    conn.send(chatter.Data('HatEventer', 'MsgNotify', data),
+              conv=msg.conv)
+
+    changes = get_changes(await changes_queue.get())
+    assert [i['payload'] for i in changes] == [2, 1]
+
+    await device.execute('set_changes_size', 1)
+    assert device.get_conf()['changes_size'] == 1
+
+    changes = get_changes(await changes_queue.get())
+    assert [i['payload'] for i in changes] == [2]
+
+    with pytest.raises(ValueError):
+        await device.execute('set_changes_size', None)
+    assert device.get_conf()['changes_size'] == 1
+    assert device.data.get('changes_size') == 1
+
+    await client.async_close()
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from hat import aio
+from hat import json
+from hat import util
+import hat.manager.headless
+import hat.manager.server
+
+
+@pytest.fixture
+def settings():
+    port = util.get_unused_tcp_port()
+    return {'ui': {'address': f'http://127.0.0.1:{port}'},
+            'log': {'level': 'DEBUG',
+                    'syslog': {'enabled': False,
+                               'host': '127.0.0.1',
+                               'port': 6514},
+                    'console': {'enabled': False}}}
+
+
+@pytest.fixture
+def conf_path(tmp_path):
+    return tmp_path / 'manager.json'
+
+
+@pytest.fixture
+def rpc_path(tmp_path):
+    return tmp_path / 'rpc.sock'
+
+
+@pytest.fixture
+def changes_path(tmp_path):
+    return tmp_path / 'changes.jsonl'
+
+
+async def read_changes(changes_path, count):
+    while True:
+        lines = (changes_path.read_text().splitlines()
+                 if changes_path.exists() else [])
+        if len(lines) >= count:
+            return [json.decode(line) for line in lines]
+        await asyncio.sleep(0.01)
+
+
+async def call(reader, writer, request):
+    writer.write(f'{json.encode(request)}\n'.encode('utf-8'))
+    await writer.drain()
+    return json.decode((await reader.readline()).decode('utf-8'))
+
+
+async def test_headless(settings, conf_path, rpc_path, changes_path):
+    conf = {'settings': settings,
+            'devices': []}
+    srv = await hat.manager.server.create_server(conf, conf_path,
+                                                 ui_enabled=False)
+    srv.async_group.spawn(hat.manager.headless.run, srv, rpc_path,
+                          changes_path)
+
+    changes = await read_changes(changes_path, 1)
+    assert changes[0]['path'] == ['devices']
+    assert changes[0]['value'] == {}
+
+    while not rpc_path.exists():
+        await asyncio.sleep(0.01)
+    reader, writer = await asyncio.open_unix_connection(str(rpc_path))
+
+    response = await call(reader, writer, {'id': 1,
+                                           'action': 'add',
+                                           'args': ['orchestrator']})
+    assert response == {'type': 'response',
+                        'id': 1,
+                        'success': True,
+                        'result': '1'}
+
+    response = await call(reader, writer, {'id': 2,
+                                           'action': 'set_name',
+                                           'args': ['1', 'abc']})
+    assert response['success'] is True
+
+    changes = await read_changes(changes_path, 3)
+    assert changes[1]['path'] == ['devices', '1']
+    assert changes[1]['value']['type'] == 'orchestrator'
+    assert changes[2] == {'type': 'change',
+                          'timestamp': changes[2]['timestamp'],
+                          'path': ['devices', '1', 'name'],
+                          'value': 'abc',
+                          'removed': False}
+
+    response = await call(reader, writer, {'id': 3,
+                                           'action': 'invalid'})
+    assert response['id'] == 3
+    assert response['success'] is False
+
+    response = await call(reader, writer, {'id': 4,
+                                           'action': 'set_view',
+                                           'args': [{}]})
+    assert response['success'] is False
+
+    writer.close()
+    await srv.async_close()
+    assert not rpc_path.exists()
+
+
+async def test_headless_stdin(monkeypatch, settings, conf_path,
+                              changes_path):
+    queue = aio.Queue()
+
+    class Stdin:
+
+        def __iter__(self):
+            while True:
+                line = asyncio.run_coroutine_threadsafe(
+                    queue.get(), loop).result()
+                if line is None:
+                    return
+                yield line
+
+    class Stdout:
+
+        def __init__(self):
+            self.lines = aio.Queue()
+
+        def write(self, text):
+            for line in text.splitlines():
+                loop.call_soon_threadsafe(self.lines.put_nowait,
+                                          json.decode(line))
+
+        def flush(self):
+            pass
+
+    loop = asyncio.get_running_loop()
+    stdout = Stdout()
+    monkeypatch.setattr('sys.stdin', Stdin())
+    monkeypatch.setattr('sys.stdout', stdout)
+
+    conf = {'settings': settings,
+            'devices': []}
+    srv = await hat.manager.server.create_server(conf, conf_path,
+                                                 ui_enabled=False)
+    srv.async_group.spawn(hat.manager.headless.run, srv, None, changes_path)
+
+    queue.put_nowait(json.encode({'id': 'a',
+                                  'action': 'get_log',
+                                  'args': [0, 10]}))
+    response = await stdout.lines.get()
+    assert response['id'] == 'a'
+    assert response['success'] is True
+    assert isinstance(response['result'], list)
+
+    queue.put_nowait('not json')
+    response = await stdout.lines.get()
+    assert response['id'] is None
+    assert response['success'] is False
+
+    queue.put_nowait(None)
+    await srv.async_close()
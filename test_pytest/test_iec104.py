@@ -0,0 +1,765 @@
+import asyncio
+import collections
+import types
+
+import pytest
+
+from hat import aio
+from hat.drivers import iec104
+from hat.manager import common
+import hat.manager.devices.iec104
+
+
+def data_conf(asdu, io, data_type='Scaled', value=0):
+    return {'type': data_type,
+            'asdu': asdu,
+            'io': io,
+            'value': {**hat.manager.devices.iec104._default_data_value,
+                      data_type: value},
+            'quality': None,
+            'time': None,
+            'cause': 'SPONTANEOUS',
+            'is_test': False}
+
+
+def command_conf(asdu, io, data_type='Single', success=True):
+    return {'type': data_type,
+            'asdu': asdu,
+            'io': io,
+            'success': success}
+
+
+def create_slave(data=[], commands=[]):
+    default_conf = hat.manager.devices.iec104.default_slave_conf
+    conf = {'properties': default_conf['properties'],
+            'data': data,
+            'commands': commands}
+    return hat.manager.devices.iec104.Slave(conf, common.Logger())
+
+
+class FakeConnection(aio.Resource):
+
+    def __init__(self, addr):
+        self._async_group = aio.Group()
+        self._addr = addr
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    @property
+    def addr(self):
+        return self._addr
+
+    async def receive(self):
+        await asyncio.sleep(0.01)
+        return [None, None]
+
+    async def interrogate(self, asdu):
+        await asyncio.sleep(0.001)
+        return []
+
+    async def send_command(self, cmd):
+        await asyncio.sleep(0.001)
+        return True
+
+
+class FakeMasterConnection(aio.Resource):
+
+    def __init__(self, interrogate_results={}):
+        self._async_group = aio.Group()
+        self._interrogate_results = interrogate_results
+        self._data_queue = aio.Queue()
+        self._async_group.spawn(aio.call_on_cancel, self._data_queue.close)
+        self.interrogations = []
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    def send_data(self, data):
+        self._data_queue.put_nowait(data)
+
+    async def receive(self):
+        try:
+            return await self._data_queue.get()
+
+        except aio.QueueClosedError:
+            raise ConnectionError()
+
+    async def interrogate(self, asdu):
+        self.interrogations.append(asdu)
+        await asyncio.sleep(0.001)
+        result = self._interrogate_results.get(asdu, [])
+        if result is None:
+            await asyncio.Future()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def create_data(asdu, io, value=0, quality=None, time=None):
+    return hat.manager.devices.iec104._data_from_json(
+        dict(data_conf(asdu, io, value=value), quality=quality, time=time))
+
+
+async def receive_data(master, conn, data):
+    future = asyncio.get_running_loop().create_future()
+
+    def on_changes(changes):
+        if not future.done():
+            future.set_result(changes)
+
+    with master.data.register_changes_cb(on_changes):
+        conn.send_data(data)
+        return await future
+
+
+async def create_master(monkeypatch, conn, interrogations=[]):
+
+    async def connect(addr, **kwargs):
+        return conn
+
+    monkeypatch.setattr(hat.manager.devices.iec104.iec104, 'connect',
+                        connect)
+    monkeypatch.setattr(hat.manager.devices.iec104,
+                        'interrogation_stats_interval', 0.01)
+
+    default_conf = hat.manager.devices.iec104.default_master_conf
+    conf = {'properties': default_conf['properties'],
+            'interrogations': interrogations}
+    master = hat.manager.devices.iec104.Master(conf, common.Logger())
+    await master.create()
+    return master
+
+
+def interrogate(slave, asdu=0xFFFF):
+    return sorted((i.asdu_address, i.io_address)
+                  for i in slave._on_interrogate(None, asdu))
+
+
+def counter_interrogate(slave, asdu=0xFFFF):
+    return sorted((i.asdu_address, i.io_address)
+                  for i in slave._on_counter_interrogate(
+                      None, asdu, iec104.FreezeCode.READ))
+
+
+def command(slave, asdu, io):
+    cmd = iec104.Command(action=iec104.Action.EXECUTE,
+                         value=iec104.SingleValue.ON,
+                         asdu_address=asdu,
+                         io_address=io,
+                         time=None,
+                         qualifier=0)
+    return slave._on_command(None, [cmd])
+
+
+def get_data_id(slave, asdu, io):
+    return next(data_id
+                for data_id, data in slave.data.get('data').items()
+                if (data['asdu'], data['io']) == (asdu, io))
+
+
+def test_interrogate():
+    slave = create_slave(data=[data_conf(1, 1),
+                               data_conf(1, 2),
+                               data_conf(2, 1),
+                               data_conf(2, 2, 'BinaryCounter',
+                                         {'value': 0,
+                                          'sequence': 0,
+                                          'overflow': False,
+                                          'adjusted': False,
+                                          'invalid': False}),
+                               data_conf(None, 3)])
+
+    assert interrogate(slave) == [(1, 1), (1, 2), (2, 1)]
+    assert interrogate(slave, 1) == [(1, 1), (1, 2)]
+    assert interrogate(slave, 2) == [(2, 1)]
+    assert interrogate(slave, 3) == []
+    assert counter_interrogate(slave) == [(2, 2)]
+    assert counter_interrogate(slave, 1) == []
+
+    result = slave._on_interrogate(None, 1)
+    assert all(i.cause == iec104.Cause.INTERROGATED_STATION for i in result)
+
+
+async def test_interrogate_change_data():
+    slave = create_slave(data=[data_conf(1, 1),
+                               data_conf(1, 2)])
+    data_id = get_data_id(slave, 1, 2)
+
+    await slave.execute('change_data', data_id, 'asdu', 2)
+    assert interrogate(slave, 1) == [(1, 1)]
+    assert interrogate(slave, 2) == [(2, 2)]
+
+    await slave.execute('change_data', data_id, 'io', 3)
+    assert interrogate(slave) == [(1, 1), (2, 3)]
+
+    await slave.execute('change_data', data_id, 'value', {
+        **hat.manager.devices.iec104._default_data_value,
+        'Scaled': 42})
+    result = slave._on_interrogate(None, 2)
+    assert [i.value for i in result] == [iec104.ScaledValue(42)]
+
+    await slave.execute('change_data', data_id, 'type', 'BinaryCounter')
+    assert interrogate(slave) == [(1, 1)]
+    assert counter_interrogate(slave) == [(2, 3)]
+
+    await slave.execute('change_data', data_id, 'type', 'Scaled')
+    await slave.execute('change_data', data_id, 'io', None)
+    assert interrogate(slave) == [(1, 1)]
+    assert counter_interrogate(slave) == []
+
+    await slave.execute('change_data', data_id, 'io', 4)
+    assert interrogate(slave) == [(1, 1), (2, 4)]
+
+
+async def test_interrogate_add_remove_data():
+    slave = create_slave(data=[data_conf(1, 1),
+                               data_conf(1, 2)])
+
+    data_id = await slave.execute('add_data')
+    assert interrogate(slave) == [(1, 1), (1, 2)]
+
+    await slave.execute('change_data', data_id, 'asdu', 1)
+    await slave.execute('change_data', data_id, 'io', 3)
+    assert interrogate(slave) == [(1, 1), (1, 2), (1, 3)]
+
+    await slave.execute('remove_data', get_data_id(slave, 1, 1))
+    assert interrogate(slave) == [(1, 2), (1, 3)]
+
+    await slave.execute('remove_data', data_id)
+    assert interrogate(slave, 1) == [(1, 2)]
+
+
+def test_interrogate_replace_data():
+    slave = create_slave(data=[data_conf(1, 1),
+                               data_conf(1, 2)])
+    assert interrogate(slave) == [(1, 1), (1, 2)]
+
+    slave.data.set('data', {'a': data_conf(3, 1),
+                            'b': data_conf(4, 1)})
+    assert interrogate(slave) == [(3, 1), (4, 1)]
+    assert interrogate(slave, 1) == []
+
+    slave.data.set([], dict(slave.data.data,
+                            data={'c': data_conf(5, 1)}))
+    assert interrogate(slave) == [(5, 1)]
+
+
+@pytest.mark.parametrize('asdu, io, success', [
+    (1, 1, True),
+    (1, 2, False),
+    (1, 3, False),
+    (2, 1, False)
+])
+def test_command(asdu, io, success):
+    slave = create_slave(commands=[command_conf(1, 1),
+                                   command_conf(1, 2, success=False),
+                                   command_conf(1, 3, 'Double')])
+
+    assert command(slave, asdu, io) is success
+
+    commands = slave.data.get('commands').values()
+    values = [i['value'] for i in commands if i['value'] is not None]
+    assert values == ([{'Single': 'ON'}] if success else [])
+
+
+async def test_command_change():
+    slave = create_slave(commands=[command_conf(1, 1)])
+    command_id = next(iter(slave.data.get('commands').keys()))
+
+    await slave.execute('change_command', command_id, 'io', 2)
+    assert command(slave, 1, 1) is False
+    assert command(slave, 1, 2) is True
+
+    await slave.execute('change_command', command_id, 'type', 'Double')
+    assert command(slave, 1, 2) is False
+
+    await slave.execute('change_command', command_id, 'type', 'Single')
+    await slave.execute('change_command', command_id, 'success', False)
+    assert command(slave, 1, 2) is False
+
+    await slave.execute('change_command', command_id, 'success', True)
+    assert command(slave, 1, 2) is True
+
+    await slave.execute('remove_command', command_id)
+    assert command(slave, 1, 2) is False
+
+    slave.data.set('commands', {'x': dict(command_conf(3, 3), value=None)})
+    assert command(slave, 3, 3) is True
+
+
+def generate(slave):
+    notified = []
+    slave._data_notify_cbs.register(notified.append)
+    slave._generate(list(slave._generators.generators.items()))
+    return [(i.asdu_address, i.io_address, i.value, i.cause)
+            for data in notified for i in data]
+
+
+async def test_generator():
+    slave = create_slave(data=[data_conf(1, 1, value=5),
+                               data_conf(1, 2, 'Single', 'OFF')])
+    data_id = get_data_id(slave, 1, 1)
+    assert generate(slave) == []
+
+    await slave.execute('set_generator', data_id, {'type': 'counter',
+                                                   'step': 2})
+    generator = slave.data.get(['data', data_id, 'generator'])
+    assert generator == {'type': 'counter', 'interval': 1, 'step': 2}
+    assert list(slave._generators.generators.keys()) == [data_id]
+
+    assert generate(slave) == [
+        (1, 1, iec104.ScaledValue(7), iec104.Cause.SPONTANEOUS)]
+    assert slave.data.get(['data', data_id, 'value', 'Scaled']) == 7
+    assert interrogate(slave) == [(1, 1), (1, 2)]
+
+    single_id = get_data_id(slave, 1, 2)
+    await slave.execute('set_generator', single_id, {'type': 'toggle'})
+    generate(slave)
+    assert slave.data.get(['data', data_id, 'value', 'Scaled']) == 9
+    assert slave.data.get(['data', single_id, 'value', 'Single']) == 'ON'
+
+    await slave.execute('change_data', data_id, 'value', {
+        **hat.manager.devices.iec104._default_data_value,
+        'Scaled': 0x7FFF})
+    generate(slave)
+    assert slave.data.get(['data', data_id, 'value', 'Scaled']) == 0x7FFF
+
+    await slave.execute('set_generator', single_id, None)
+    assert list(slave._generators.generators.keys()) == [data_id]
+
+    await slave.execute('remove_data', data_id)
+    assert slave._generators.generators == {}
+    assert generate(slave) == []
+
+
+async def test_generator_invalid():
+    slave = create_slave(data=[data_conf(1, 1),
+                               dict(data_conf(1, 2),
+                                    generator={'type': 'sine',
+                                               'period': 0})])
+    data_id = get_data_id(slave, 1, 1)
+    assert slave._generators.generators == {}
+
+    with pytest.raises(ValueError):
+        await slave.execute('set_generator', 'invalid', {'type': 'counter'})
+
+    for generator in [{'type': 'abc'},
+                      {'type': 'sine', 'period': 0},
+                      {'type': 'counter', 'interval': -1}]:
+        with pytest.raises(ValueError):
+            await slave.execute('set_generator', data_id, generator)
+
+    assert slave.data.get(['data', data_id]).get('generator') is None
+    assert slave._generators.generators == {}
+
+    await slave.execute('change_data', get_data_id(slave, 1, 2),
+                        'generator', {'type': 'sine', 'period': 10})
+    assert len(slave._generators.generators) == 1
+
+
+async def test_import_points_csv():
+    slave = create_slave()
+    text = ('kind,type,asdu,io,value,quality\n'
+            'data,Single,1,1,ON,\n'
+            'data,Floating,1,2,12.5,invalid|blocked\n'
+            'command,Double,1,3,ON,\n'
+            'data,Invalid,1,4,0,\n'
+            'data,Scaled,true,5,0,\n'
+            'data,Scaled,1,false,0,\n'
+            'data,Scaled,1,,0,\n'
+            'data,Scaled,65536,1,0,\n'
+            'data,Scaled,1,16777216,0,\n'
+            'data,Single,1,6,INVALID,\n'
+            'data,Single,1,7,ON,invalid|abc\n'
+            'invalid,Single,1,8,ON,\n')
+
+    result = await slave.execute('import_points', text, 'csv')
+    assert result['data'] == 2
+    assert result['commands'] == 1
+    assert [i['line'] for i in result['errors']] == list(range(5, 14))
+    assert [i['error'] for i in result['errors'][:6]] == [
+        'invalid type', 'invalid asdu', 'invalid io', 'invalid io',
+        'invalid asdu', 'invalid io']
+
+    data = sorted(slave.data.get('data').values(), key=lambda i: i['io'])
+    assert [(i['type'], i['asdu'], i['io']) for i in data] == [
+        ('Single', 1, 1), ('Floating', 1, 2)]
+    assert data[0]['value']['Single'] == 'ON'
+    assert data[1]['value']['Floating'] == 12.5
+    assert data[1]['quality'] == {'invalid': True,
+                                  'not_topical': False,
+                                  'substituted': False,
+                                  'blocked': True,
+                                  'overflow': False}
+
+    commands = list(slave.data.get('commands').values())
+    assert [(i['type'], i['asdu'], i['io'], i['success'])
+            for i in commands] == [('Double', 1, 3, True)]
+
+    assert interrogate(slave, 1) == [(1, 1), (1, 2)]
+
+
+async def test_import_points_jsonl():
+    slave = create_slave()
+    text = ('{"type": "Scaled", "asdu": 1, "io": 1, "value": 5}\n'
+            '\n'
+            '{"type": "Scaled", "asdu": true, "io": 2}\n'
+            '{"type": "Scaled", "asdu": 1, "io": 3.5}\n'
+            '[1, 2, 3]\n'
+            '{"type": \n'
+            '{"type": "Scaled", "asdu": 1, "io": 4, "quality": {}}\n'
+            '{"kind": "command", "type": "Single", "asdu": 1, "io": 5, '
+            '"success": 1}\n'
+            '{"kind": "command", "type": "Single", "asdu": 1, "io": 6, '
+            '"success": false}\n')
+
+    result = await slave.execute('import_points', text, 'jsonl')
+    assert result['data'] == 1
+    assert result['commands'] == 1
+    assert [i['line'] for i in result['errors']] == [3, 4, 5, 6, 7, 8]
+    errors = {i['line']: i['error'] for i in result['errors']}
+    assert errors[3] == 'invalid asdu'
+    assert errors[4] == 'invalid io'
+    assert errors[5] == 'invalid row'
+    assert errors[7] == 'invalid quality'
+    assert errors[8] == 'invalid success'
+
+    data = list(slave.data.get('data').values())
+    assert [i['value']['Scaled'] for i in data] == [5]
+    assert data[0]['quality'] == (hat.manager.devices.iec104
+                                  ._default_quality)
+
+    commands = list(slave.data.get('commands').values())
+    assert [(i['io'], i['success']) for i in commands] == [(6, False)]
+
+
+async def test_import_points_errors_limit(monkeypatch):
+    monkeypatch.setattr(hat.manager.devices.iec104, 'max_import_errors', 2)
+    monkeypatch.setattr(hat.manager.devices.iec104, 'import_chunk_size', 3)
+    slave = create_slave()
+    text = ''.join(f'{{"type": "Scaled", "asdu": 1, "io": {i}}}\n'
+                   if i % 2 else '{}\n'
+                   for i in range(10))
+
+    result = await slave.execute('import_points', text, 'jsonl')
+    assert result['data'] == 5
+    assert [i['line'] for i in result['errors']] == [1, 3]
+
+
+async def test_import_points_invalid_format():
+    slave = create_slave()
+
+    with pytest.raises(ValueError):
+        await slave.execute('import_points', '', 'xml')
+
+
+@pytest.mark.parametrize('file_name, file_format', [
+    ('points.csv', None),
+    ('points.txt', 'csv'),
+])
+async def test_import_points_file_csv(monkeypatch, tmp_path, file_name,
+                                      file_format):
+    monkeypatch.setattr(hat.manager.devices.iec104, 'import_chunk_size', 2)
+    path = tmp_path / file_name
+    path.write_text('type,asdu,io,value\n' +
+                    ''.join(f'Scaled,1,{i},{i}\n' for i in range(5)) +
+                    'Scaled,1,-1,0\n')
+    slave = create_slave()
+
+    result = await slave.execute('import_points_file', str(path),
+                                 file_format)
+    assert result['data'] == 5
+    assert result['errors'] == [{'line': 7, 'error': 'invalid io'}]
+    assert interrogate(slave, 1) == [(1, i) for i in range(5)]
+
+
+async def test_import_points_file_jsonl(tmp_path):
+    path = tmp_path / 'points.jsonl'
+    path.write_text(''.join(f'{{"type": "Scaled", "asdu": 2, "io": {i}}}\n'
+                            for i in range(3)))
+    slave = create_slave()
+
+    result = await slave.execute('import_points_file', str(path))
+    assert result == {'data': 3, 'commands': 0, 'errors': []}
+    assert interrogate(slave, 2) == [(2, i) for i in range(3)]
+
+    with pytest.raises(FileNotFoundError):
+        await slave.execute('import_points_file', str(tmp_path / 'missing'))
+
+
+async def test_master_load(monkeypatch):
+    connections = []
+    failures = 5
+    connecting = 0
+    max_connecting = 0
+
+    async def connect(addr, **kwargs):
+        nonlocal failures, connecting, max_connecting
+        connecting += 1
+        max_connecting = max(max_connecting, connecting)
+        try:
+            await asyncio.sleep(0.001)
+        finally:
+            connecting -= 1
+
+        if failures:
+            failures -= 1
+            raise ConnectionError()
+
+        conn = FakeConnection(addr)
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(hat.manager.devices.iec104.iec104, 'connect',
+                        connect)
+    monkeypatch.setattr(hat.manager.devices.iec104, 'load_stats_interval',
+                        0.01)
+
+    default_conf = hat.manager.devices.iec104.default_master_conf
+    conf = {'properties': default_conf['properties'],
+            'load': dict(default_conf['load'],
+                         enabled=True,
+                         connection_count=300,
+                         port_count=3,
+                         connect_concurrency=20,
+                         reconnect_delay=0.01,
+                         interrogation_period=0.05,
+                         command={'type': 'Single',
+                                  'action': 'EXECUTE',
+                                  'asdu': 1,
+                                  'io': 1,
+                                  'value': {'Single': 'ON'},
+                                  'time': None,
+                                  'qualifier': 0},
+                         command_period=0.05,
+                         timeout=1)}
+    master = hat.manager.devices.iec104.Master(conf, common.Logger())
+    runner = await master.create()
+
+    while True:
+        stats = master.data.get('load_stats')
+        if (stats and stats['connections'] == 300 and
+                stats['interrogations']['count'] >= 300 and
+                stats['commands']['count'] >= 300):
+            break
+        await asyncio.sleep(0.01)
+
+    assert stats['connects'] == 300
+    assert stats['connect_failures'] == 5
+    assert stats['received_asdus'] > 0
+    assert stats['received_data'] == 2 * stats['received_asdus']
+    for i in ['interrogations', 'commands']:
+        assert stats[i]['failures'] == stats[i]['timeouts'] == 0
+        assert stats[i]['latency']['p50'] is not None
+        assert stats[i]['latency']['max'] >= stats[i]['latency']['p99']
+
+    assert max_connecting <= 20
+    ports = collections.Counter(conn.addr.port for conn in connections)
+    port = default_conf['properties']['port']
+    assert ports == {port: 100, port + 1: 100, port + 2: 100}
+
+    connections[0].close()
+    while master.data.get(['load_stats', 'connects']) < 301:
+        await asyncio.sleep(0.01)
+    assert master.data.get(['load_stats', 'connections']) == 300
+
+    await asyncio.wait_for(runner.async_close(), 1)
+    assert all(conn.is_closed for conn in connections)
+
+
+async def test_master_set_history_size():
+    default_conf = hat.manager.devices.iec104.default_master_conf
+    master = hat.manager.devices.iec104.Master(
+        {'properties': default_conf['properties']}, common.Logger())
+
+    await master.execute('set_property', 'history_size', 5)
+    assert master.data.get(['properties', 'history_size']) == 5
+
+    for size in [None, 'abc', 2.5]:
+        with pytest.raises(ValueError):
+            await master.execute('set_property', 'history_size', size)
+        assert master.data.get(['properties', 'history_size']) == 5
+
+    await master.execute('set_property', 'history_size', -1)
+    assert master.data.get(['properties', 'history_size']) == 0
+
+
+@pytest.mark.parametrize('load', [
+    {'connect_concurrency': 0},
+    {'port_count': 0},
+    {'port_count': True},
+    {'connection_count': -1},
+    {'connection_count': 1.5}
+])
+async def test_master_load_invalid(load):
+    default_conf = hat.manager.devices.iec104.default_master_conf
+    conf = {'properties': default_conf['properties'],
+            'load': dict(default_conf['load'], enabled=True, **load)}
+    master = hat.manager.devices.iec104.Master(conf, common.Logger())
+
+    with pytest.raises(ValueError):
+        await master.create()
+
+
+async def test_master_periodic_interrogation(monkeypatch):
+    conn = FakeMasterConnection({1: [create_data(1, 1, 123)],
+                                 2: Exception('interrogation error'),
+                                 3: None})
+    master = await create_master(monkeypatch, conn)
+
+    async def wait_stats(interrogation_id, key):
+        while not master.data.get(['interrogation_stats', interrogation_id,
+                                   key]):
+            await asyncio.sleep(0.01)
+        return master.data.get(['interrogation_stats', interrogation_id])
+
+    async def wait_interrogations(asdu):
+        conn.interrogations.clear()
+        while len(conn.interrogations) < 3:
+            await asyncio.sleep(0.01)
+        assert set(conn.interrogations) == {asdu}
+
+    async def change(interrogation_id, path, value):
+        await master.execute('change_interrogation', interrogation_id,
+                             path, value)
+
+    interrogation_id = await master.execute('add_interrogation')
+    await asyncio.sleep(0.05)
+    assert conn.interrogations == []
+    assert master.data.get('interrogation_stats') == {}
+
+    await change(interrogation_id, 'asdu', 1)
+    await change(interrogation_id, 'period', 0.01)
+    await change(interrogation_id, 'enabled', True)
+    stats = await wait_stats(interrogation_id, 'count')
+    await wait_interrogations(1)
+    assert stats['last_result'] == 'OK (count: 1)'
+    assert stats['failures'] == stats['timeouts'] == 0
+    point = master.data.get(['points', '1:1'])
+    assert point['value']['Scaled'] == 123
+    assert point['updates'] >= stats['count']
+    assert any(i['asdu'] == 1 and i['io'] == 1
+               for i in master.data.get('data').values())
+
+    await change(interrogation_id, 'asdu', 2)
+    stats = await wait_stats(interrogation_id, 'failures')
+    await wait_interrogations(2)
+    assert stats['last_result'] == 'ERROR (interrogation error)'
+
+    await change(interrogation_id, 'timeout', 0.005)
+    await change(interrogation_id, 'asdu', 3)
+    stats = await wait_stats(interrogation_id, 'timeouts')
+    await wait_interrogations(3)
+    assert stats['last_result'] == 'TIMEOUT'
+
+    await change(interrogation_id, 'enabled', False)
+    await asyncio.sleep(0.02)
+    conn.interrogations.clear()
+    await asyncio.sleep(0.05)
+    assert conn.interrogations == []
+    assert interrogation_id in master.data.get('interrogation_stats')
+
+    await master.execute('remove_interrogation', interrogation_id)
+    assert master.data.get('interrogation_stats') == {}
+
+    with pytest.raises(ValueError):
+        await master.execute('change_interrogation', interrogation_id,
+                             'enabled', True)
+
+    await conn.async_close()
+
+
+async def test_master_periodic_interrogation_conf(monkeypatch):
+    conn = FakeMasterConnection({1: [create_data(1, 1)]})
+    interrogation = {'type': 'interrogate',
+                     'asdu': 1,
+                     'freeze': 'READ',
+                     'period': 0.01,
+                     'timeout': 1,
+                     'enabled': True}
+    master = await create_master(monkeypatch, conn, [interrogation])
+
+    while not master.data.get(['interrogation_stats', '1', 'count']):
+        await asyncio.sleep(0.01)
+    assert set(conn.interrogations) == {1}
+    assert master.get_conf()['interrogations'] == [interrogation]
+
+    await conn.async_close()
+    await asyncio.sleep(0.02)
+    conn.interrogations.clear()
+    await asyncio.sleep(0.05)
+    assert conn.interrogations == []
+
+
+async def test_master_points(monkeypatch):
+    clock = types.SimpleNamespace(time=lambda: 1000,
+                                  monotonic=lambda: 10)
+    monkeypatch.setattr(hat.manager.devices.iec104, 'time', clock)
+    conn = FakeMasterConnection()
+    master = await create_master(monkeypatch, conn)
+    assert master.data.get('points') == {}
+
+    await receive_data(master, conn, [create_data(1, 1, 10),
+                                      create_data(1, 2, 20)])
+    points = master.data.get('points')
+    assert set(points.keys()) == {'1:1', '1:2'}
+    assert points['1:1']['value']['Scaled'] == 10
+    assert points['1:1']['timestamp'] == 1000
+    assert points['1:1']['quality'] is None
+    assert points['1:1']['time'] is None
+    assert points['1:1']['updates'] == 1
+    assert points['1:1']['rate'] is None
+    assert points['1:2']['value']['Scaled'] == 20
+
+    quality = {'invalid': True,
+               'not_topical': False,
+               'substituted': False,
+               'blocked': False,
+               'overflow': False}
+    time = {'milliseconds': 123,
+            'invalid': False,
+            'minutes': 4,
+            'summer_time': False,
+            'hours': 5,
+            'day_of_week': 1,
+            'day_of_month': 2,
+            'months': 3,
+            'years': 21}
+    clock.time = lambda: 1002
+    clock.monotonic = lambda: 12
+    changes = await receive_data(master, conn, [
+        create_data(1, 1, 11, quality=quality, time=time)])
+    assert {tuple(change.path[:2]) for change in changes
+            if change.path[0] == 'points'} == {('points', '1:1')}
+    point = master.data.get(['points', '1:1'])
+    assert point['value']['Scaled'] == 11
+    assert point['quality'] == quality
+    assert point['time'] == time
+    assert point['timestamp'] == 1002
+    assert point['updates'] == 2
+    assert point['rate'] == pytest.approx(1 / 2)
+    assert master.data.get(['points', '1:2']) == points['1:2']
+
+    clock.monotonic = lambda: 13
+    await receive_data(master, conn, [create_data(1, 1, 12)])
+    point = master.data.get(['points', '1:1'])
+    assert point['quality'] is None
+    assert point['time'] is None
+    assert point['updates'] == 3
+    assert point['rate'] == pytest.approx(1 / (0.1 * 1 + 0.9 * 2))
+
+    await master.execute('clear_points')
+    assert master.data.get('points') == {}
+    assert len(master.data.get('data')) == 4
+
+    clock.monotonic = lambda: 14
+    await receive_data(master, conn, [create_data(1, 1, 13)])
+    point = master.data.get(['points', '1:1'])
+    assert point['updates'] == 1
+    assert point['rate'] is None
+    assert set(master.data.get('points').keys()) == {'1:1'}
+
+    await conn.async_close()
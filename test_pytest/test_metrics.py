@@ -0,0 +1,80 @@
+import aiohttp
+import pytest
+
+from hat import util
+import hat.manager.metrics
+
+
+@pytest.fixture
+def address():
+    return f'http://127.0.0.1:{util.get_unused_tcp_port()}'
+
+
+def test_encode():
+    metrics = [{'name': 'a',
+                'description': 'a\ndescription',
+                'type': 'counter',
+                'labels': {},
+                'value': 1},
+               {'name': 'b',
+                'description': '',
+                'type': 'gauge',
+                'labels': {'x': 'y"z'},
+                'value': 2.5},
+               {'name': 'a',
+                'description': '',
+                'type': 'counter',
+                'labels': {'x': '1'},
+                'value': 2},
+               {'name': 'a',
+                'description': '',
+                'type': 'gauge',
+                'labels': {'x': '2'},
+                'value': 3},
+               {'name': 'c',
+                'description': 'c',
+                'type': 'histogram',
+                'labels': {'x': '1'},
+                'value': {'buckets': [1, 2],
+                          'counts': [2, 1, 1],
+                          'count': 4,
+                          'sum': 6}}]
+
+    text = hat.manager.metrics.encode(metrics)
+    assert text == ('# HELP a a\\ndescription\n'
+                    '# TYPE a counter\n'
+                    'a 1\n'
+                    'a{x="1"} 2\n'
+                    '# TYPE b gauge\n'
+                    'b{x="y\\"z"} 2.5\n'
+                    '# HELP c c\n'
+                    '# TYPE c histogram\n'
+                    'c_bucket{x="1",le="1"} 2\n'
+                    'c_bucket{x="1",le="2"} 3\n'
+                    'c_bucket{x="1",le="+Inf"} 4\n'
+                    'c_sum{x="1"} 6\n'
+                    'c_count{x="1"} 4\n')
+
+
+async def test_listen(address):
+    metrics = [{'name': 'a',
+                'description': '',
+                'type': 'gauge',
+                'labels': {},
+                'value': 1}]
+    srv = await hat.manager.metrics.listen(address, lambda: metrics)
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'{address}/metrics') as res:
+            assert res.status == 200
+            assert res.headers['Content-Type'].startswith('text/plain')
+            assert await res.text() == '# TYPE a gauge\na 1\n'
+
+        metrics[0]['value'] = 2
+        async with session.get(f'{address}/metrics') as res:
+            assert await res.text() == '# TYPE a gauge\na 2\n'
+
+        async with session.get(f'{address}/other') as res:
+            assert res.status == 404
+
+    await srv.async_close()
@@ -0,0 +1,643 @@
+import asyncio
+
+import pytest
+
+from hat import aio
+from hat.drivers import modbus
+from hat.manager import common
+from hat.manager.devices.modbus import (ReadPoint,
+                                        ReadRequest,
+                                        get_point_values,
+                                        plan_reads)
+import hat.manager.devices.modbus
+
+
+def data_conf(address, value=0, device_id=1, data_type='HOLDING_REGISTER'):
+    return {'device_id': device_id,
+            'data_type': data_type,
+            'address': address,
+            'value': value,
+            'generator': None}
+
+
+def create_slave(data=[], generators=[]):
+    default_conf = hat.manager.devices.modbus.default_slave_conf
+    conf = {'properties': default_conf['properties'],
+            'data': data,
+            'generators': generators}
+    return hat.manager.devices.modbus.Slave(conf, common.Logger())
+
+
+class FakeMaster(aio.Resource):
+
+    def __init__(self, read_cb, write_cb=None):
+        self._async_group = aio.Group()
+        self._read_cb = read_cb
+        self._write_cb = write_cb
+        self._reads = []
+        self._writes = []
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    @property
+    def reads(self):
+        return self._reads
+
+    async def read(self, device_id, data_type, start_address, quantity):
+        self._reads.append((device_id, data_type, start_address, quantity))
+        return await self._read_cb(quantity)
+
+    @property
+    def writes(self):
+        return self._writes
+
+    async def write(self, device_id, data_type, start_address, values):
+        self._writes.append((device_id, data_type, start_address, values))
+        return await self._write_cb(values)
+
+
+async def create_master(monkeypatch, read_cb, poll_groups=[]):
+    fake_master = FakeMaster(read_cb)
+
+    async def create_tcp_master(**kwargs):
+        return fake_master
+
+    monkeypatch.setattr(hat.manager.devices.modbus.modbus,
+                        'create_tcp_master', create_tcp_master)
+    monkeypatch.setattr(hat.manager.devices.modbus, 'poll_stats_interval',
+                        0.01)
+
+    default_conf = hat.manager.devices.modbus.default_master_conf
+    conf = {'properties': default_conf['properties'],
+            'poll_groups': poll_groups}
+    master = hat.manager.devices.modbus.Master(conf, common.Logger())
+    await master.create()
+    return master, fake_master
+
+
+def poll_group_conf(start_address=0, quantity=1, period=0.01, timeout=1,
+                    enabled=True):
+    return {'device_id': 1,
+            'data_type': 'HOLDING_REGISTER',
+            'start_address': start_address,
+            'quantity': quantity,
+            'period': period,
+            'timeout': timeout,
+            'enabled': enabled}
+
+
+async def wait_poll_stats(master, group_id, key, count=1):
+    while (master.data.get(['poll_stats', group_id, key]) or 0) < count:
+        await asyncio.sleep(0.01)
+    return master.data.get(['poll_stats', group_id])
+
+
+def read(slave, start_address, quantity, device_id=1,
+         data_type=modbus.DataType.HOLDING_REGISTER):
+    return slave._on_read(None, device_id, data_type, start_address, quantity)
+
+
+def get_values(slave):
+    return {(i['device_id'], i['data_type'], i['address']): i['value']
+            for i in slave.data.get('data').values()}
+
+
+def get_data_id(slave, address, device_id=1):
+    return next(data_id
+                for data_id, data in slave.data.get('data').items()
+                if (data['device_id'], data['address']) == (device_id,
+                                                            address))
+
+
+@pytest.mark.parametrize('points, max_gap, requests', [
+    ([], 0, []),
+
+    ([ReadPoint(1, 'HOLDING_REGISTER', 1)],
+     0,
+     [ReadRequest(1, 'HOLDING_REGISTER', 1, 1)]),
+
+    ([ReadPoint(1, 'HOLDING_REGISTER', 3),
+      ReadPoint(1, 'HOLDING_REGISTER', 1),
+      ReadPoint(1, 'HOLDING_REGISTER', 2),
+      ReadPoint(1, 'HOLDING_REGISTER', 2)],
+     0,
+     [ReadRequest(1, 'HOLDING_REGISTER', 1, 3)]),
+
+    ([ReadPoint(1, 'HOLDING_REGISTER', 1),
+      ReadPoint(1, 'HOLDING_REGISTER', 5)],
+     0,
+     [ReadRequest(1, 'HOLDING_REGISTER', 1, 1),
+      ReadRequest(1, 'HOLDING_REGISTER', 5, 1)]),
+
+    ([ReadPoint(1, 'HOLDING_REGISTER', 1),
+      ReadPoint(1, 'HOLDING_REGISTER', 5)],
+     3,
+     [ReadRequest(1, 'HOLDING_REGISTER', 1, 5)]),
+
+    ([ReadPoint(1, 'HOLDING_REGISTER', 1),
+      ReadPoint(1, 'INPUT_REGISTER', 2),
+      ReadPoint(2, 'HOLDING_REGISTER', 2)],
+     10,
+     [ReadRequest(1, 'HOLDING_REGISTER', 1, 1),
+      ReadRequest(1, 'INPUT_REGISTER', 2, 1),
+      ReadRequest(2, 'HOLDING_REGISTER', 2, 1)]),
+
+    ([ReadPoint(1, 'HOLDING_REGISTER', i) for i in range(0, 300, 2)],
+     1,
+     [ReadRequest(1, 'HOLDING_REGISTER', 0, 125),
+      ReadRequest(1, 'HOLDING_REGISTER', 126, 125),
+      ReadRequest(1, 'HOLDING_REGISTER', 252, 47)]),
+
+    ([ReadPoint(1, 'COIL', i) for i in range(0, 3000, 100)],
+     100,
+     [ReadRequest(1, 'COIL', 0, 1901),
+      ReadRequest(1, 'COIL', 2000, 901)]),
+
+    ([ReadPoint(1, 'QUEUE', 1),
+      ReadPoint(1, 'QUEUE', 2)],
+     10,
+     [ReadRequest(1, 'QUEUE', 1, 1),
+      ReadRequest(1, 'QUEUE', 2, 1)])
+])
+def test_plan_reads(points, max_gap, requests):
+    result = plan_reads(points, max_gap)
+    assert sorted(result) == sorted(requests)
+
+
+def test_plan_reads_invalid():
+    with pytest.raises(ValueError):
+        plan_reads([ReadPoint(1, 'HOLDING_REGISTER', 1)], -1)
+
+    with pytest.raises(ValueError):
+        plan_reads([ReadPoint(1, 'INVALID', 1)])
+
+
+def test_get_point_values():
+    points = [ReadPoint(1, 'HOLDING_REGISTER', i) for i in [1, 3, 10, 12]]
+    points.append(ReadPoint(2, 'HOLDING_REGISTER', 1))
+    requests = plan_reads(points, 2)
+    assert len(requests) == 3
+
+    results = [[i.start_address + j for j in range(i.quantity)]
+               for i in requests]
+    values = get_point_values(points, requests, results)
+    assert values == {point: point.address for point in points}
+
+    values = get_point_values(points + [ReadPoint(1, 'HOLDING_REGISTER', 2),
+                                        ReadPoint(1, 'HOLDING_REGISTER', 5),
+                                        ReadPoint(1, 'COIL', 1)],
+                              requests, results)
+    assert values[ReadPoint(1, 'HOLDING_REGISTER', 2)] == 2
+    assert ReadPoint(1, 'HOLDING_REGISTER', 5) not in values
+    assert ReadPoint(1, 'COIL', 1) not in values
+
+
+def test_get_point_values_unordered():
+    requests = [ReadRequest(1, 'HOLDING_REGISTER', 10, 2),
+                ReadRequest(1, 'HOLDING_REGISTER', 5, 2),
+                ReadRequest(1, 'HOLDING_REGISTER', 0, 1)]
+    error = modbus.Error.INVALID_DATA_ADDRESS
+    results = [error, [5], [0]]
+    points = [ReadPoint(1, 'HOLDING_REGISTER', i)
+              for i in [0, 1, 5, 6, 7, 9, 11, 12]]
+
+    values = get_point_values(points, requests, results)
+    assert values == {
+        ReadPoint(1, 'HOLDING_REGISTER', 0): 0,
+        ReadPoint(1, 'HOLDING_REGISTER', 5): 5,
+        ReadPoint(1, 'HOLDING_REGISTER', 11): error}
+
+
+def test_slave_read():
+    slave = create_slave([data_conf(1, 11),
+                          data_conf(3, 13),
+                          data_conf(5, 15),
+                          data_conf(3, 23, device_id=2),
+                          data_conf(3, 1, data_type='COIL'),
+                          data_conf(None, 99)])
+
+    assert read(slave, 0, 6) == [0, 11, 0, 13, 0, 15]
+    assert read(slave, 3, 1) == [13]
+    assert read(slave, 6, 2) == [0, 0]
+    assert read(slave, 3, 1, device_id=2) == [23]
+    assert read(slave, 3, 1, device_id=3) == [0]
+    assert read(slave, 2, 2, data_type=modbus.DataType.COIL) == [0, 1]
+
+
+async def test_slave_read_change_data():
+    slave = create_slave([data_conf(1, 11),
+                          data_conf(2, 12)])
+    data_id = get_data_id(slave, 2)
+
+    await slave.execute('change_data', data_id, 'address', 4)
+    assert read(slave, 1, 4) == [11, 0, 0, 12]
+
+    await slave.execute('change_data', data_id, 'device_id', 2)
+    assert read(slave, 1, 4) == [11, 0, 0, 0]
+    assert read(slave, 1, 4, device_id=2) == [0, 0, 0, 12]
+
+    await slave.execute('change_data', data_id, 'data_type', 'INPUT_REGISTER')
+    assert read(slave, 4, 1, device_id=2) == [0]
+    assert read(slave, 4, 1, device_id=2,
+                data_type=modbus.DataType.INPUT_REGISTER) == [12]
+
+    await slave.execute('change_data', data_id, 'address', None)
+    assert read(slave, 4, 1, device_id=2,
+                data_type=modbus.DataType.INPUT_REGISTER) == [0]
+
+    await slave.execute('change_data', data_id, 'data_type',
+                        'HOLDING_REGISTER')
+    await slave.execute('change_data', data_id, 'device_id', 1)
+    await slave.execute('change_data', data_id, 'address', 6)
+    assert read(slave, 1, 6) == [11, 0, 0, 0, 0, 12]
+
+    await slave.execute('remove_data', get_data_id(slave, 1))
+    assert read(slave, 1, 6) == [0, 0, 0, 0, 0, 12]
+
+
+async def test_slave_read_add_remove_data():
+    slave = create_slave([data_conf(1, 11)])
+
+    data_id = await slave.execute('add_data')
+    await slave.execute('change_data', data_id, 'data_type',
+                        'HOLDING_REGISTER')
+    await slave.execute('change_data', data_id, 'address', 2)
+    await slave.execute('change_data', data_id, 'value', 12)
+    assert read(slave, 1, 2) == [11, 12]
+
+    await slave.execute('remove_data', data_id)
+    assert read(slave, 1, 2) == [11, 0]
+
+
+def test_slave_read_replace_data():
+    slave = create_slave([data_conf(1, 11)])
+
+    slave.data.set('data', {'a': data_conf(2, 12),
+                            'b': data_conf(3, 13)})
+    assert read(slave, 1, 3) == [0, 12, 13]
+
+    slave.data.set([], dict(slave.data.data,
+                            data={'c': data_conf(1, 21)}))
+    assert read(slave, 1, 3) == [21, 0, 0]
+
+
+async def test_slave_write():
+    slave = create_slave([data_conf(1),
+                          data_conf(3),
+                          data_conf(1, device_id=2),
+                          data_conf(1, data_type='COIL')])
+
+    slave._on_write(None, 1, modbus.DataType.HOLDING_REGISTER, 0, [1, 2, 3])
+    assert get_values(slave) == {(1, 'HOLDING_REGISTER', 1): 2,
+                                 (1, 'HOLDING_REGISTER', 3): 0,
+                                 (2, 'HOLDING_REGISTER', 1): 0,
+                                 (1, 'COIL', 1): 0}
+
+    slave._on_write(None, 0, modbus.DataType.HOLDING_REGISTER, 1, [5])
+    assert get_values(slave) == {(1, 'HOLDING_REGISTER', 1): 5,
+                                 (1, 'HOLDING_REGISTER', 3): 0,
+                                 (2, 'HOLDING_REGISTER', 1): 5,
+                                 (1, 'COIL', 1): 0}
+
+    await slave.execute('change_data', get_data_id(slave, 3), 'address', 2)
+    slave._on_write(None, 1, modbus.DataType.HOLDING_REGISTER, 2, [7, 8])
+    assert get_values(slave)[(1, 'HOLDING_REGISTER', 2)] == 7
+
+    slave._on_write_mask(None, 1, 2, 0xFF00, 0x0011)
+    assert get_values(slave)[(1, 'HOLDING_REGISTER', 2)] == 0x0011
+
+
+async def test_poll_group(monkeypatch):
+
+    async def read_cb(quantity):
+        return list(range(quantity))
+
+    master, fake_master = await create_master(
+        monkeypatch, read_cb, [poll_group_conf(start_address=2, quantity=3)])
+
+    stats = await wait_poll_stats(master, '1', 'count', 3)
+    assert stats['last_result'] == '0, 1, 2'
+    assert stats['errors'] == stats['failures'] == stats['timeouts'] == 0
+    assert stats['duration']['max'] is not None
+    assert stats['cycle']['avg'] is not None
+    assert set(fake_master.reads) == {
+        (1, modbus.DataType.HOLDING_REGISTER, 2, 3)}
+
+    await master.execute('reset_poll_stats')
+    assert master.data.get(['poll_stats', '1', 'cycle', 'avg']) is None
+
+    await fake_master.async_close()
+
+
+async def test_poll_group_error(monkeypatch):
+
+    async def read_cb(quantity):
+        return modbus.Error.INVALID_DATA_ADDRESS
+
+    master, fake_master = await create_master(monkeypatch, read_cb,
+                                              [poll_group_conf()])
+
+    stats = await wait_poll_stats(master, '1', 'errors', 2)
+    assert stats['last_result'] == 'INVALID_DATA_ADDRESS'
+    assert stats['failures'] == stats['timeouts'] == 0
+
+    await fake_master.async_close()
+
+
+async def test_poll_group_failure(monkeypatch):
+
+    async def read_cb(quantity):
+        raise Exception('abc')
+
+    master, fake_master = await create_master(monkeypatch, read_cb,
+                                              [poll_group_conf()])
+
+    stats = await wait_poll_stats(master, '1', 'failures', 2)
+    assert stats['last_result'] == 'ERROR (abc)'
+    assert stats['errors'] == stats['timeouts'] == 0
+
+    await fake_master.async_close()
+
+
+async def test_poll_group_timeout(monkeypatch):
+
+    async def read_cb(quantity):
+        await asyncio.Future()
+
+    master, fake_master = await create_master(
+        monkeypatch, read_cb, [poll_group_conf(period=0.02, timeout=0.01)])
+
+    stats = await wait_poll_stats(master, '1', 'timeouts', 2)
+    assert stats['last_result'] == 'TIMEOUT'
+    assert stats['errors'] == stats['failures'] == 0
+    assert stats['overruns'] == 0
+
+    await fake_master.async_close()
+
+
+async def test_poll_group_overrun(monkeypatch):
+
+    async def read_cb(quantity):
+        await asyncio.sleep(0.05)
+        return [0]
+
+    master, fake_master = await create_master(
+        monkeypatch, read_cb, [poll_group_conf(period=0.01)])
+
+    stats = await wait_poll_stats(master, '1', 'count', 3)
+    assert stats['overruns'] >= 2 * stats['count']
+    assert stats['cycle']['min'] >= 0.05
+
+    await fake_master.async_close()
+
+
+async def test_poll_group_change(monkeypatch):
+
+    async def read_cb(quantity):
+        return [0] * quantity
+
+    master, fake_master = await create_master(monkeypatch, read_cb)
+
+    group_id = await master.execute('add_poll_group')
+    await asyncio.sleep(0.05)
+    assert fake_master.reads == []
+
+    await master.execute('change_poll_group', group_id, 'period', 0.01)
+    await master.execute('change_poll_group', group_id, 'enabled', True)
+    await wait_poll_stats(master, group_id, 'count')
+
+    await master.execute('change_poll_group', group_id, 'start_address', 10)
+    await asyncio.sleep(0.02)
+    fake_master.reads.clear()
+    while len(fake_master.reads) < 2:
+        await asyncio.sleep(0.01)
+    assert {i[2] for i in fake_master.reads} == {10}
+
+    await master.execute('change_poll_group', group_id, 'enabled', False)
+    await asyncio.sleep(0.02)
+    fake_master.reads.clear()
+    await asyncio.sleep(0.05)
+    assert fake_master.reads == []
+
+    await master.execute('remove_poll_group', group_id)
+    assert master.data.get('poll_stats') == {}
+
+    await fake_master.async_close()
+
+
+@pytest.mark.parametrize('poll_group', [
+    poll_group_conf(period=0),
+    poll_group_conf(timeout=-1),
+    poll_group_conf(start_address=-1),
+    poll_group_conf(start_address=True),
+    poll_group_conf(start_address='0'),
+    poll_group_conf(quantity=0),
+    poll_group_conf(quantity=126),
+    poll_group_conf(quantity=1.5),
+    dict(poll_group_conf(), device_id=None),
+    dict(poll_group_conf(), data_type='INVALID')
+])
+async def test_poll_group_invalid(monkeypatch, poll_group):
+
+    async def read_cb(quantity):
+        return [0] * quantity
+
+    master, fake_master = await create_master(monkeypatch, read_cb,
+                                              [poll_group])
+
+    await asyncio.sleep(0.05)
+    assert fake_master.reads == []
+    assert master.data.get('poll_stats') == {}
+
+    await fake_master.async_close()
+
+
+def generate(slave):
+    slave._generate(list(slave._generators.generators.items()))
+    return get_values(slave)
+
+
+async def test_slave_range_generator():
+    slave = create_slave([data_conf(1, 10),
+                          data_conf(2, 20),
+                          dict(data_conf(3, 30),
+                               generator={'type': 'counter', 'step': 5}),
+                          data_conf(4, 40)])
+
+    generator_id = await slave.execute('add_range_generator')
+    await slave.execute('change_range_generator', generator_id,
+                        'start_address', 1)
+    await slave.execute('change_range_generator', generator_id,
+                        'quantity', 3)
+    assert generate(slave) == {(1, 'HOLDING_REGISTER', 1): 11,
+                               (1, 'HOLDING_REGISTER', 2): 21,
+                               (1, 'HOLDING_REGISTER', 3): 35,
+                               (1, 'HOLDING_REGISTER', 4): 40}
+
+    await slave.execute('change_range_generator', generator_id,
+                        'generator', {'type': 'counter', 'step': 0x10000})
+    await slave.execute('change_range_generator', generator_id,
+                        'device_id', 2)
+    assert generate(slave) == {(1, 'HOLDING_REGISTER', 1): 11,
+                               (1, 'HOLDING_REGISTER', 2): 21,
+                               (1, 'HOLDING_REGISTER', 3): 40,
+                               (1, 'HOLDING_REGISTER', 4): 40}
+
+    await slave.execute('remove_range_generator', generator_id)
+    assert list(slave._generators.generators.keys()) == [('data', '3')]
+
+
+@pytest.mark.parametrize('path, value', [
+    ('device_id', None),
+    ('device_id', '1'),
+    ('data_type', 'INVALID'),
+    ('data_type', None),
+    ('start_address', None),
+    ('start_address', -1),
+    ('start_address', True),
+    ('start_address', 1.5),
+    ('quantity', None),
+    ('quantity', -1),
+    ('generator', {'type': 'sine', 'period': 0})
+])
+async def test_slave_range_generator_invalid(path, value):
+    range_generator = {'device_id': 1,
+                       'data_type': 'HOLDING_REGISTER',
+                       'start_address': 0,
+                       'quantity': 10,
+                       'generator': {'type': 'counter'}}
+    slave = create_slave([data_conf(1, 10),
+                          dict(data_conf(2, 20),
+                               generator={'type': 'counter'})],
+                         [range_generator])
+
+    with pytest.raises(ValueError):
+        await slave.execute('change_range_generator', '1', path, value)
+    assert slave.data.get(['generators', '1']) == range_generator
+
+    slave.data.set(['generators', '1', path], value)
+    assert generate(slave) == {(1, 'HOLDING_REGISTER', 1): 10,
+                               (1, 'HOLDING_REGISTER', 2): 21}
+
+
+async def test_master_set_history_size():
+    default_conf = hat.manager.devices.modbus.default_master_conf
+    master = hat.manager.devices.modbus.Master(
+        {'properties': default_conf['properties']}, common.Logger())
+
+    await master.execute('set_property', 'history_size', 5)
+    assert master.data.get(['properties', 'history_size']) == 5
+
+    for size in [None, 'abc', 2.5]:
+        with pytest.raises(ValueError):
+            await master.execute('set_property', 'history_size', size)
+        assert master.data.get(['properties', 'history_size']) == 5
+
+    await master.execute('set_property', 'history_size', -1)
+    assert master.data.get(['properties', 'history_size']) == 0
+
+
+@pytest.mark.parametrize('load', [
+    {'connect_concurrency': 0},
+    {'connection_count': -1},
+    {'connection_count': 1.5},
+    {'requests': []}
+])
+async def test_master_load_invalid(load):
+    default_conf = hat.manager.devices.modbus.default_master_conf
+    conf = {'properties': default_conf['properties'],
+            'load': dict(default_conf['load'], enabled=True, **load)}
+    master = hat.manager.devices.modbus.Master(conf, common.Logger())
+
+    with pytest.raises(ValueError):
+        await master.create()
+
+
+async def test_master_load(monkeypatch):
+    masters = []
+    failures = 3
+
+    async def read_cb(quantity):
+        await asyncio.sleep(0.001)
+        if quantity == 2:
+            return modbus.Error.INVALID_DATA_ADDRESS
+        if quantity == 3:
+            await asyncio.Future()
+        return [0] * quantity
+
+    async def write_cb(values):
+        await asyncio.sleep(0.001)
+        raise Exception('abc')
+
+    async def create_tcp_master(**kwargs):
+        nonlocal failures
+        await asyncio.sleep(0.001)
+        if failures:
+            failures -= 1
+            raise ConnectionError()
+
+        fake_master = FakeMaster(read_cb, write_cb)
+        masters.append(fake_master)
+        return fake_master
+
+    monkeypatch.setattr(hat.manager.devices.modbus.modbus,
+                        'create_tcp_master', create_tcp_master)
+    monkeypatch.setattr(hat.manager.devices.modbus, 'load_stats_interval',
+                        0.01)
+
+    requests = [{'weight': 2,
+                 'action': 'read',
+                 'device_id': 1,
+                 'data_type': 'HOLDING_REGISTER',
+                 'start_address': 0,
+                 'quantity': quantity}
+                for quantity in [1, 2, 3]]
+    requests.append({'weight': 1,
+                     'action': 'write',
+                     'device_id': 1,
+                     'data_type': 'COIL',
+                     'start_address': 0,
+                     'values': [1]})
+
+    default_conf = hat.manager.devices.modbus.default_master_conf
+    conf = {'properties': default_conf['properties'],
+            'load': dict(default_conf['load'],
+                         enabled=True,
+                         connection_count=10,
+                         connect_concurrency=5,
+                         reconnect_delay=0.01,
+                         rate=1000,
+                         timeout=0.05,
+                         requests=requests)}
+    master = hat.manager.devices.modbus.Master(conf, common.Logger())
+    runner = await master.create()
+
+    while True:
+        stats = master.data.get('load_stats')
+        if (stats and stats['connections'] == 10 and
+                stats['requests'] >= 200 and
+                stats['timeouts'] > 0):
+            break
+        await asyncio.sleep(0.01)
+
+    assert stats['connects'] == 10
+    assert stats['connect_failures'] == 3
+    assert stats['errors'] > 0
+    assert stats['latency']['p50'] is not None
+    assert stats['latency']['max'] >= stats['latency']['p99']
+
+    reads = [i for fake_master in masters for i in fake_master.reads]
+    writes = [i for fake_master in masters for i in fake_master.writes]
+    assert {quantity for _, _, _, quantity in reads} == {1, 2, 3}
+    assert len(writes) > 1
+    assert all(i == (1, modbus.DataType.COIL, 0, [1]) for i in writes)
+
+    masters[0].close()
+    while master.data.get(['load_stats', 'connects']) < 11:
+        await asyncio.sleep(0.01)
+    assert master.data.get(['load_stats', 'connections']) == 10
+
+    await asyncio.wait_for(runner.async_close(), 1)
+    assert all(fake_master.is_closed for fake_master in masters)
@@ -1,5 +1,7 @@
+import asyncio
 import collections
 
+import aiohttp
 import pytest
 
 from hat import aio
@@ -81,6 +83,14 @@ def create_remote_data_change_queue(conn, path):
     return queue
 
 
+async def wait_device_status(queue, device_id, status, data_devices=None):
+    if data_devices is None:
+        data_devices = await queue.get()
+    while data_devices[device_id]['status'] != status:
+        data_devices = await queue.get()
+    return data_devices
+
+
 class Resource(aio.Resource):
 
     def __init__(self):
@@ -97,6 +107,8 @@ class Device(common.Device):
         self._conf = conf
         self._logger = logger
         self._data = common.DataStorage()
+        self._metrics = common.Metrics()
+        self._wait_future = asyncio.Future()
 
     @property
     def conf(self):
@@ -110,6 +122,14 @@ class Device(common.Device):
     def data(self):
         return self._data
 
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def wait_future(self):
+        return self._wait_future
+
     def get_conf(self):
         return self._conf
 
@@ -117,6 +137,12 @@ class Device(common.Device):
         return Resource()
 
     async def execute(self, action, *args):
+        if action == 'set':
+            self._data.set(*args)
+        if action == 'fail':
+            raise Exception('failed')
+        if action == 'wait':
+            await self._wait_future
         return {'action': action,
                 'args': list(args)}
 
@@ -279,15 +305,13 @@ async def test_start_stop_device(settings, conf_path, addr,
     assert data_devices[device_id]['status'] == 'stopped'
 
     await conn.call('start', device_id)
-    data_devices = await data_devices_queue.get()
-    assert data_devices[device_id]['status'] == 'starting'
-    data_devices = await data_devices_queue.get()
+    data_devices = await wait_device_status(data_devices_queue, device_id,
+                                            'started')
     assert data_devices[device_id]['status'] == 'started'
 
     await conn.call('stop', device_id)
-    data_devices = await data_devices_queue.get()
-    assert data_devices[device_id]['status'] == 'stopping'
-    data_devices = await data_devices_queue.get()
+    data_devices = await wait_device_status(data_devices_queue, device_id,
+                                            'stopped')
     assert data_devices[device_id]['status'] == 'stopped'
 
     await conn.async_close()
@@ -310,6 +334,50 @@ async def test_execute(settings, conf_path, addr,
     await srv.async_close()
 
 
+async def test_execute_batch(settings, conf_path, addr,
+                             patch_autoflush, patch_device_queue):
+    conf = {'settings': settings,
+            'devices': []}
+    srv = await hat.manager.server.create_server(conf, conf_path)
+    conn = juggler.RpcConnection(await juggler.connect(addr))
+    device_id = await conn.call('add', 'device_type')
+    device = await patch_device_queue.get()
+    await conn.call('execute', device_id, 'set', [], {})
+
+    result = await conn.call('execute_batch', [
+        [device_id, 'set', ['a', 1]],
+        [device_id, 'fail', []],
+        ['invalid', 'set', ['a', 2]],
+        [device_id, 'set'],
+        None,
+        [device_id, 'set', ['b', 2]]])
+    assert result[0] == {'success': True,
+                         'result': {'action': 'set',
+                                    'args': ['a', 1]}}
+    assert [i['success'] for i in result[1:]] == [False, False, False,
+                                                  False, True]
+    assert srv.data.get(['devices', device_id, 'data']) == {'a': 1, 'b': 2}
+
+    changes_queue = aio.Queue()
+    srv.data.register_changes_cb(changes_queue.put_nowait)
+
+    batch_future = asyncio.ensure_future(conn.call('execute_batch', [
+        [device_id, 'set', ['c', 3]],
+        [device_id, 'wait', []]]))
+
+    changes = await changes_queue.get()
+    assert {tuple(i.path) for i in changes} == {
+        ('devices', device_id, 'data', 'c')}
+    assert not batch_future.done()
+
+    device.wait_future.set_result(None)
+    result = await batch_future
+    assert [i['success'] for i in result] == [True, True]
+
+    await conn.async_close()
+    await srv.async_close()
+
+
 async def test_autostart(settings, conf_path, addr,
                          patch_autoflush, patch_device_queue,
                          patch_autostart):
@@ -331,19 +399,16 @@ async def test_autostart(settings, conf_path, addr,
     data_devices = await data_devices_queue.get()
     assert data_devices[device_id]['autostart'] is True
 
-    data_devices = await data_devices_queue.get()
-    assert data_devices[device_id]['status'] == 'starting'
-    data_devices = await data_devices_queue.get()
+    data_devices = await wait_device_status(data_devices_queue, device_id,
+                                            'started', data_devices)
     assert data_devices[device_id]['status'] == 'started'
 
     await conn.call('stop', device_id)
-    data_devices = await data_devices_queue.get()
-    assert data_devices[device_id]['status'] == 'stopping'
-    data_devices = await data_devices_queue.get()
+    data_devices = await wait_device_status(data_devices_queue, device_id,
+                                            'stopped')
     assert data_devices[device_id]['status'] == 'stopped'
-    data_devices = await data_devices_queue.get()
-    assert data_devices[device_id]['status'] == 'starting'
-    data_devices = await data_devices_queue.get()
+    data_devices = await wait_device_status(data_devices_queue, device_id,
+                                            'started')
     assert data_devices[device_id]['status'] == 'started'
 
     await conn.call('set_autostart', device_id, False)
@@ -351,10 +416,226 @@ async def test_autostart(settings, conf_path, addr,
     assert data_devices[device_id]['autostart'] is False
 
     await conn.call('stop', device_id)
+    data_devices = await wait_device_status(data_devices_queue, device_id,
+                                            'stopped')
+    assert data_devices[device_id]['status'] == 'stopped'
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_start_devices(settings, conf_path, addr,
+                             patch_autoflush, patch_device_queue,
+                             patch_autostart):
+    conf = {'settings': settings,
+            'devices': [{'type': 'device_type',
+                         'name': 'name',
+                         'autostart': False}]}
+    srv = await hat.manager.server.create_server(conf, conf_path,
+                                                 start_devices=True)
+    conn = juggler.RpcConnection(await juggler.connect(addr))
+    data_devices_queue = create_remote_data_change_queue(conn, 'devices')
+
+    data_devices = await wait_device_status(data_devices_queue, '1',
+                                            'started')
+    assert data_devices['1']['autostart'] is False
+
+    await conn.call('stop', '1')
+    data_devices = await wait_device_status(data_devices_queue, '1',
+                                            'stopped')
+
+    await asyncio.sleep(hat.manager.server.autostart_delay * 3)
+    assert conn.remote_data['devices']['1']['status'] == 'stopped'
+
+    await conn.call('save')
+    saved_conf = json.decode_file(conf_path)
+    assert saved_conf['devices'][0]['autostart'] is False
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_set_view(settings, conf_path, addr,
+                        patch_autoflush, patch_device_queue):
+    conf = {'settings': settings,
+            'devices': []}
+    srv = await hat.manager.server.create_server(conf, conf_path)
+    conn = juggler.RpcConnection(await juggler.connect(addr))
+    data_devices_queue = create_remote_data_change_queue(conn, 'devices')
+
+    data_devices = await data_devices_queue.get()
+    assert data_devices == {}
+
+    device_id1 = await conn.call('add', 'device_type')
+    device1 = await patch_device_queue.get()
+    device_id2 = await conn.call('add', 'device_type')
+    device2 = await patch_device_queue.get()
+
+    device1.data.set([], {'a': 1, 'b': 2})
+    device2.data.set([], {'a': 3, 'b': 4})
+
     data_devices = await data_devices_queue.get()
-    assert data_devices[device_id]['status'] == 'stopping'
+    while (data_devices[device_id1]['data'] is None or
+           data_devices.get(device_id2, {}).get('data') is None):
+        data_devices = await data_devices_queue.get()
+
+    await conn.call('set_view', {device_id1: None})
     data_devices = await data_devices_queue.get()
-    assert data_devices[device_id]['status'] == 'stopped'
+    assert data_devices[device_id1]['data'] == {'a': 1, 'b': 2}
+    assert data_devices[device_id2]['data'] is None
+    assert data_devices[device_id2]['type'] == 'device_type'
+
+    device1.data.set('a', 5)
+    data_devices = await data_devices_queue.get()
+    assert data_devices[device_id1]['data'] == {'a': 5, 'b': 2}
+
+    device2.data.set('a', 6)
+    await conn.call('set_view', {device_id2: ['b']})
+    data_devices = await data_devices_queue.get()
+    assert data_devices[device_id1]['data'] is None
+    assert data_devices[device_id2]['data'] == {'b': 4}
+
+    await conn.call('set_view', None)
+    data_devices = await data_devices_queue.get()
+    assert data_devices[device_id1]['data'] == {'a': 5, 'b': 2}
+    assert data_devices[device_id2]['data'] == {'a': 6, 'b': 4}
 
     await conn.async_close()
     await srv.async_close()
+
+
+@pytest.mark.parametrize('file_enabled', [True, False])
+async def test_log(settings, conf_path, addr, patch_autoflush,
+                   file_enabled):
+    history = {'size': 3,
+               'file': {'enabled': file_enabled,
+                        'path': 'manager.log',
+                        'max_size': 1024,
+                        'backup_count': 2}}
+    settings = json.set_(settings, ['log', 'history'], history)
+    conf = {'settings': settings,
+            'devices': []}
+    srv = await hat.manager.server.create_server(conf, conf_path)
+    conn = juggler.RpcConnection(await juggler.connect(addr))
+    data_log_queue = create_remote_data_change_queue(conn, 'log')
+
+    for i in range(10):
+        await conn.call('set_settings', ['ui', 'address'], str(i))
+
+    data_log = await data_log_queue.get()
+    while not any(i['message'].endswith(': 9)')
+                  for i in data_log.values()):
+        data_log = await data_log_queue.get()
+
+    assert len(data_log) == 3
+    entries = [data_log[i] for i in sorted(data_log.keys(), key=int)]
+    assert [i['message'][-2:] for i in entries] == ['7)', '8)', '9)']
+
+    result = await conn.call('get_log', 0, 2)
+    assert result == entries[:-3:-1]
+
+    result = await conn.call('get_log', 2, 2)
+    if file_enabled:
+        assert [i['message'][-2:] for i in result] == ['7)', '6)']
+        assert (conf_path.parent / 'manager.log').exists()
+    else:
+        assert [i['message'][-2:] for i in result] == ['7)']
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_get_connections(settings, conf_path, addr, patch_autoflush):
+    conf = {'settings': settings,
+            'devices': []}
+    srv = await hat.manager.server.create_server(conf, conf_path)
+    conn1 = juggler.RpcConnection(await juggler.connect(addr))
+    conn2 = juggler.RpcConnection(await juggler.connect(addr))
+    await conn2.call('set_view', {})
+
+    connections = await conn1.call('get_connections')
+    assert len(connections) == 2
+    assert ({json.encode(i['view']) for i in connections.values()} ==
+            {json.encode(None), json.encode({})})
+
+    for i in connections.values():
+        assert i['lag'] >= 0
+        assert i['flush_delay'] >= 0
+
+    await conn2.async_close()
+    while len(connections) != 1:
+        await asyncio.sleep(0.01)
+        connections = await conn1.call('get_connections')
+
+    await conn1.async_close()
+    await srv.async_close()
+
+
+async def test_get_metrics(settings, conf_path, addr, patch_device_queue):
+    conf = {'settings': settings,
+            'devices': []}
+    srv = await hat.manager.server.create_server(conf, conf_path)
+    conn = juggler.RpcConnection(await juggler.connect(addr))
+
+    device_id = await conn.call('add', 'type')
+    device = await patch_device_queue.get()
+    device.metrics.counter('x', 'description', {'a': 'b'}).inc(3)
+    await conn.call('execute', device_id, 'action')
+
+    metrics = await conn.call('get_metrics')
+    server_metrics = {i['name']: i for i in metrics['server']}
+    assert server_metrics['connections']['value'] == 1
+    assert server_metrics['devices']['value'] == 1
+    assert server_metrics['rpc_duration_seconds']['type'] == 'histogram'
+    assert server_metrics['data_notify_duration_seconds']['value']['count'] > 0
+
+    modifications = {i['labels']['operation']: i['value']
+                     for i in metrics['server']
+                     if i['name'] == 'data_modifications_total'}
+    assert modifications['set'] > 0
+
+    rpc_durations = {i['labels']['action']: i['value']
+                     for i in metrics['server']
+                     if i['name'] == 'rpc_duration_seconds'}
+    assert rpc_durations['add']['count'] == 1
+    assert rpc_durations['execute']['count'] == 1
+
+    device_metrics = {i['name']: i for i in metrics['devices'][device_id]}
+    assert device_metrics['x'] == {'name': 'x',
+                                   'description': 'description',
+                                   'type': 'counter',
+                                   'labels': {'a': 'b'},
+                                   'value': 3}
+    assert device_metrics['execute_duration_seconds']['labels'] == {
+        'action': 'action'}
+    assert device_metrics['execute_duration_seconds']['value']['count'] == 1
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_prometheus_metrics(settings, conf_path, patch_device_queue):
+    metrics_address = f'http://127.0.0.1:{util.get_unused_tcp_port()}'
+    settings = dict(settings, metrics={'enabled': True,
+                                       'address': metrics_address})
+    conf = {'settings': settings,
+            'devices': [{'type': 'type',
+                         'name': 'name',
+                         'autostart': False}]}
+    srv = await hat.manager.server.create_server(conf, conf_path)
+    device = await patch_device_queue.get()
+    device.metrics.counter('x_total').inc()
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'{metrics_address}/metrics') as res:
+            assert res.status == 200
+            text = await res.text()
+
+    lines = text.split('\n')
+    assert 'hat_manager_devices 1' in lines
+    assert ('hat_manager_device_x_total{device_id="1",device_type="type",'
+            'device_name="name"} 1') in lines
+    assert ('hat_manager_device_status{device_id="1",device_type="type",'
+            'device_name="name",status="stopped"} 1') in lines
+
+    await srv.async_close()